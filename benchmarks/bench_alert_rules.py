@@ -0,0 +1,90 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Benchmark for the alert rule engine: per-city queries + Python checks vs one windowed query + NumPy.
+# Runs against DATABASE_URL (local Postgres) or the default SQLite file; the tables are recreated.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 10000))
+RULE_COUNT = int(os.getenv("BENCH_RULES", 20))
+READINGS_PER_CITY = 3
+
+def make_rules(AlertRule, RULE_FIELDS):
+    rules = []
+    for i in range(RULE_COUNT):
+        field = RULE_FIELDS[i % len(RULE_FIELDS)]
+        comparator = '>' if i % 2 == 0 else '<'
+        threshold = {'temp_celsius': 30, 'humidity': 70, 'wind_speed': 12, 'pressure': 1015, 'visibility': 3000}[field]
+        rules.append(AlertRule(f"Rule {i}", field, comparator, threshold + i, 1 + i % 2, f"rule {i} fired"))
+    return rules
+
+async def main():
+    from sqlalchemy import insert
+    from sqlalchemy.future import select
+    from database import engine, SessionLocal
+    from models import Base, WeatherData
+    from service.alertRules import AlertRule, RULE_FIELDS, fetch_recent_readings, evaluate_rules
+
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    now = datetime.utcnow()
+    rows = [
+        {"city": city, "main": "Clear", "description": "bench", "temp_celsius": random.uniform(-5, 45),
+         "humidity": random.randint(10, 100), "wind_speed": random.uniform(0, 25),
+         "pressure": random.randint(990, 1040), "visibility": random.randint(500, 10000),
+         "timestamp": now - timedelta(minutes=5 * step)}
+        for city in cities for step in range(READINGS_PER_CITY)
+    ]
+    rules = make_rules(AlertRule, RULE_FIELDS)
+    depth = max(rule.window for rule in rules)
+
+    async with SessionLocal() as db:
+        for i in range(0, len(rows), 10000):
+            await db.execute(insert(WeatherData), rows[i:i + 10000])
+        await db.commit()
+
+        # Previous shape: one ORDER BY ... LIMIT query per city, then a Python check per rule
+        start = time.perf_counter()
+        fired_before = 0
+        for city in cities:
+            result = await db.execute(
+                select(WeatherData).filter(WeatherData.city == city).order_by(WeatherData.timestamp.desc()).limit(depth)
+            )
+            recent = result.scalars().all()
+            for rule in rules:
+                window = recent[:rule.window]
+                if len(window) == rule.window and all(
+                    (getattr(r, rule.field) > rule.value) if rule.comparator == '>' else (getattr(r, rule.field) < rule.value)
+                    for r in window
+                ):
+                    fired_before += 1
+        per_city_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, readings = await fetch_recent_readings(db, cities, depth)
+        query_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        triggered = evaluate_rules(rules, cities, readings)
+        eval_elapsed = time.perf_counter() - start
+
+        assert len(triggered) == fired_before, (len(triggered), fired_before)
+        print(f"{CITY_COUNT} cities x {RULE_COUNT} rules, {len(triggered)} alerts")
+        print(f"per-city queries + Python:  {per_city_elapsed:.3f}s")
+        print(f"windowed query:             {query_elapsed:.3f}s")
+        print(f"NumPy rule evaluation:      {eval_elapsed * 1000:.1f}ms")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("OPENWEATHER_API_KEY", "bench")
+
+from benchmarks.stub_openweather import start_stub_server, request_count
+
+base_url, server = start_stub_server()
+os.environ["OPENWEATHER_BASE_URL"] = base_url
+
+import fakeredis
+import redis.asyncio as aioredis
+
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 500))
+REDIS_RTT_MS = float(os.getenv("BENCH_REDIS_RTT_MS", 1))
+
+# fakeredis with a simulated network round trip, blocking (sync client) or awaiting (async client)
+class SlowSyncRedis(fakeredis.FakeStrictRedis):
+    def get(self, key):
+        time.sleep(REDIS_RTT_MS / 1000)
+        return super().get(key)
+
+    def setex(self, key, ttl, value):
+        time.sleep(REDIS_RTT_MS / 1000)
+        return super().set(key, value, ex=ttl)
+
+class SlowAsyncRedis(fakeredis.aioredis.FakeRedis):
+    async def get(self, key):
+        await asyncio.sleep(REDIS_RTT_MS / 1000)
+        return await super().get(key)
+
+    async def set(self, key, value, ex=None):
+        await asyncio.sleep(REDIS_RTT_MS / 1000)
+        return await super().set(key, value, ex=ex)
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+# Latency is measured from the moment the burst arrives, as a client would see it
+async def timed(coro, arrived):
+    await coro
+    return time.perf_counter() - arrived
+
+async def run(label, fetch):
+    request_count["total"] = 0
+    arrived = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(fetch("Delhi"), arrived) for _ in range(CONCURRENCY)))
+    print(f"{label:<34} p50={percentile(latencies, 50) * 1000:8.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:8.1f}ms upstream_calls={request_count['total']}")
+
+async def main():
+    from service import cache
+    from service.weatherFetch import REDIS_EXPIRY_TIME, fetch_weather_data, fetch_weather_from_api
+    from service.httpClient import init_http_client, close_http_client
+
+    await init_http_client()
+
+    # Previous behaviour: blocking redis client inside the handler, no coalescing of misses
+    sync_client = SlowSyncRedis(decode_responses=True)
+
+    async def blocking_fetch(city):
+        cache_key = f"weather_data_{city}"
+        cached_data = sync_client.get(cache_key)
+        if cached_data:
+            return json.loads(cached_data)
+        weather_data = await fetch_weather_from_api(city)
+        sync_client.setex(cache_key, REDIS_EXPIRY_TIME, json.dumps(weather_data))
+        return weather_data
+
+    # Same blocking pool shape as service.cache, so waiters queue instead of failing
+    cache._redis = SlowAsyncRedis(
+        decode_responses=True,
+        connection_pool_class=aioredis.BlockingConnectionPool,
+        max_connections=50,
+    )
+
+    print(f"{CONCURRENCY} concurrent requests for weather_data_Delhi, {REDIS_RTT_MS}ms Redis RTT")
+    await run("sync redis, cold", blocking_fetch)
+    await run("sync redis, warm", blocking_fetch)
+    await run("async redis + single-flight, cold", fetch_weather_data)
+    await run("async redis + single-flight, warm", fetch_weather_data)
+
+    await close_http_client()
+    server.should_exit = True
+
+if __name__ == "__main__":
+    asyncio.run(main())
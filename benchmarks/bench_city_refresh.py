@@ -0,0 +1,72 @@
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+# Simulates a day of ingest cycles over a large city catalog: flat polling of every city each cycle
+# vs the tiered refresh scheduler (hot tier + recently requested cities every cycle, cold ones hourly,
+# capped at the quota budget). Reports upstream group calls per hour, staleness per tier and the
+# per-cycle selection cost. No network or database involved.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 50000))
+HOT_TIER = int(os.getenv("BENCH_HOT_TIER", 500))
+REQUESTED_PER_CYCLE = int(os.getenv("BENCH_REQUESTED", 200))  # Distinct cities requested on demand per cycle
+HOURS = int(os.getenv("BENCH_HOURS", 24))
+
+def main():
+    from config import settings
+    from service.cityCatalog import city_catalog, CatalogCity, RefreshScheduler
+    from service.weatherFetch import ingest_budget, GROUP_BATCH_SIZE
+
+    cities = [CatalogCity(i, f"City{i}", tier='hot' if i < HOT_TIER else 'cold') for i in range(CITY_COUNT)]
+    city_catalog.replace(cities)
+    names = city_catalog.names
+    interval = settings.INGEST_INTERVAL_MINUTES * 60
+    cycles = HOURS * 3600 // interval
+    budget = ingest_budget()
+
+    scheduler = RefreshScheduler()
+    # On-demand requests follow a skewed popularity distribution over the cold tier
+    weights = [1 / (rank + 1) for rank in range(CITY_COUNT - HOT_TIER)]
+    demand_window = settings.CITY_DEMAND_WINDOW_MINUTES * 60
+    requested_at = {}
+    fetched, select_seconds, max_age = 0, 0.0, Counter()
+
+    now = time.time()
+    for _ in range(cycles):
+        for name in random.choices(names[HOT_TIER:], weights=weights, k=REQUESTED_PER_CYCLE):
+            requested_at[name] = now
+        hot = {name for name, at in requested_at.items() if now - at < demand_window}
+
+        start = time.perf_counter()
+        selected = scheduler.select_due(names, hot, budget, now=now)
+        select_seconds += time.perf_counter() - start
+        scheduler.mark_refreshed(selected, now=now)
+        fetched += len(selected)
+
+        for name in hot:
+            age = now - scheduler.last_refreshed.get(name, now - 86400)
+            max_age['requested'] = max(max_age['requested'], age)
+        now += interval
+
+    for name in names[:HOT_TIER]:
+        max_age['hot'] = max(max_age['hot'], now - interval - scheduler.last_refreshed[name])
+    cold_ages = [now - interval - scheduler.last_refreshed.get(name, 0) for name in names[HOT_TIER:]]
+
+    flat_calls_per_hour = -(-CITY_COUNT // GROUP_BATCH_SIZE) * (3600 // interval)
+    tiered_calls_per_hour = fetched / GROUP_BATCH_SIZE / HOURS
+    quota_per_hour = settings.OPENWEATHER_RATE_LIMIT_PER_MINUTE * 60
+    print(f"{CITY_COUNT} cities ({HOT_TIER} hot tier), {REQUESTED_PER_CYCLE} on-demand requests/cycle, {cycles} cycles")
+    print(f"budget per cycle: {budget} cities; quota {quota_per_hour} calls/h")
+    print(f"flat polling:   {flat_calls_per_hour:>8.0f} group calls/h")
+    print(f"tiered refresh: {tiered_calls_per_hour:>8.0f} group calls/h")
+    print(f"max age at read: hot tier {max_age['hot']:.0f}s, requested {max_age['requested']:.0f}s, cold {max(cold_ages):.0f}s")
+    print(f"select_due: {select_seconds / cycles * 1000:.1f} ms/cycle")
+
+if __name__ == "__main__":
+    main()
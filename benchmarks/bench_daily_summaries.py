@@ -0,0 +1,101 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Correctness check and benchmark for calculate_daily_summaries.
+# Runs against DATABASE_URL (local Postgres) or the default SQLite file; the tables are recreated.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 1000))
+READINGS_PER_DAY = 288  # one reading every 5 minutes
+CONDITIONS = ["Clear", "Clouds", "Haze", "Rain", "Mist"]
+
+async def previous_implementation(db, cities, today):
+    # Two queries per city with func.date() filtering, dominant condition counted in Python
+    from sqlalchemy import func
+    from sqlalchemy.future import select
+    from models import WeatherData
+
+    for city in cities:
+        result = await db.execute(
+            select(func.avg(WeatherData.temp_celsius), func.max(WeatherData.temp_celsius),
+                   func.min(WeatherData.temp_celsius), WeatherData.main)
+            .filter(WeatherData.city == city, func.date(WeatherData.timestamp) == today)
+            .group_by(WeatherData.main)
+        )
+        result.all()
+        conditions = (await db.execute(
+            select(WeatherData.main).filter(WeatherData.city == city, func.date(WeatherData.timestamp) == today)
+        )).scalars().all()
+        max(set(conditions), key=conditions.count)
+
+async def main():
+    from sqlalchemy import insert
+    from sqlalchemy.future import select
+    from database import engine, SessionLocal
+    from models import Base, WeatherData, DailySummary
+    from service import weatherSummary
+    from service.cityCatalog import city_catalog, CatalogCity
+
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    city_catalog.replace([CatalogCity(i, city) for i, city in enumerate(cities)])
+    today = datetime.utcnow().date()
+    day_start = datetime.combine(today, datetime.min.time())
+
+    rows, expected = [], {}
+    for city in cities:
+        temps = [random.uniform(-5, 45) for _ in range(READINGS_PER_DAY)]
+        # Skewed so each city has a clear winner
+        weights = [random.random() for _ in CONDITIONS]
+        conditions = random.choices(CONDITIONS, weights=weights, k=READINGS_PER_DAY)
+        counts = Counter(conditions)
+        top = max(counts.values())
+        expected[city] = (sum(temps) / len(temps), max(temps), min(temps), min(c for c in counts if counts[c] == top))
+        for step, (temp, condition) in enumerate(zip(temps, conditions)):
+            rows.append({"city": city, "main": condition, "description": "bench", "temp_celsius": temp,
+                         "timestamp": day_start + timedelta(minutes=5 * step)})
+        # Readings from yesterday must not leak into today's summary
+        rows.append({"city": city, "main": "Snow", "description": "bench", "temp_celsius": 99.0,
+                     "timestamp": day_start - timedelta(minutes=1)})
+
+    async with SessionLocal() as db:
+        for i in range(0, len(rows), 10000):
+            await db.execute(insert(WeatherData), rows[i:i + 10000])
+        await db.commit()
+
+        start = time.perf_counter()
+        await previous_implementation(db, cities, today)
+        print(f"previous (2 queries per city): {time.perf_counter() - start:.3f}s for {CITY_COUNT} cities")
+
+        start = time.perf_counter()
+        await weatherSummary.calculate_daily_summaries(db)
+        print(f"single aggregation + upsert:   {time.perf_counter() - start:.3f}s for {CITY_COUNT} cities")
+
+        # Rerun must be idempotent
+        await weatherSummary.calculate_daily_summaries(db)
+        summaries = (await db.execute(select(DailySummary))).scalars().all()
+        assert len(summaries) == CITY_COUNT, f"expected {CITY_COUNT} rows, got {len(summaries)}"
+
+        for summary in summaries:
+            avg_temp, max_temp, min_temp, dominant = expected[summary.city]
+            assert abs(summary.avg_temp - avg_temp) < 1e-6, summary.city
+            assert abs(summary.max_temp - max_temp) < 1e-9 and abs(summary.min_temp - min_temp) < 1e-9, summary.city
+            assert summary.dominant_condition == dominant, (summary.city, summary.dominant_condition, dominant)
+        print("summaries match the expected per-day values")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
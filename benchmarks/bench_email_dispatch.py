@@ -0,0 +1,43 @@
+import asyncio
+import os
+import sys
+import time
+
+# Delivery throughput of the background email dispatcher against a local aiosmtpd sink
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.update(SMTP_SERVER="127.0.0.1", SMTP_PORT="8025", SMTP_START_TLS="false",
+                  SMTP_SENDER_EMAIL="alerts@example.com", SMTP_PASSWORD="")
+
+from benchmarks.smtp_sink import start_smtp_sink
+
+SUBSCRIBERS = int(os.getenv("BENCH_SUBSCRIBERS", 5000))
+SINGLE_EMAILS = int(os.getenv("BENCH_SINGLE_EMAILS", 200))
+
+async def main():
+    from service.emailDispatcher import email_dispatcher
+
+    handler, controller = start_smtp_sink()
+    email_dispatcher.start()
+
+    start = time.perf_counter()
+    for i in range(SINGLE_EMAILS):
+        email_dispatcher.enqueue("Weather Alert", "body", [f"user{i}@example.com"])
+    enqueue_elapsed = time.perf_counter() - start
+    await email_dispatcher.queue.join()
+    print(f"{SINGLE_EMAILS} single-recipient emails: enqueue {enqueue_elapsed * 1000:.1f}ms, "
+          f"delivered in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    email_dispatcher.enqueue("Weather Alert", "body", [f"subscriber{i}@example.com" for i in range(SUBSCRIBERS)])
+    await email_dispatcher.queue.join()
+    print(f"fan-out to {SUBSCRIBERS} subscribers: {time.perf_counter() - start:.3f}s")
+
+    await email_dispatcher.stop()
+    controller.stop()
+    print(f"sink received {handler.messages} messages for {handler.recipients} recipients; stats {email_dispatcher.stats}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
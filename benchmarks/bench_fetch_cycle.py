@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+import time
+
+# Point the service layer at local stand-ins before it is imported
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("OPENWEATHER_API_KEY", "bench")
+
+from benchmarks.stub_openweather import start_stub_server
+
+base_url, server = start_stub_server()
+os.environ["OPENWEATHER_BASE_URL"] = base_url
+
+import fakeredis
+import httpx
+
+CITY_COUNTS = [int(n) for n in os.getenv("BENCH_CITY_COUNTS", "6,60,600,3000").split(",")]
+
+# Previous behaviour: a fresh AsyncClient (TCP + DNS setup) and one request per city
+async def per_city_fresh_client(cities):
+    async def fetch(city):
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{base_url}/data/2.5/weather", params={"q": city, "appid": "bench"})
+            return response.json()
+    return await asyncio.gather(*(fetch(city) for city in cities))
+
+async def pooled_group_fetch(weatherFetch, cities):
+    from service import cache
+    cache._redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return await weatherFetch.fetch_weather_data_bulk(cities)
+
+async def main():
+    from service import weatherFetch
+    from service.cityCatalog import city_catalog, CatalogCity
+    from service.httpClient import init_http_client, close_http_client
+
+    await init_http_client()
+    print(f"{'cities':>8} {'fresh client (s)':>18} {'pooled+group (s)':>18}")
+    for count in CITY_COUNTS:
+        cities = [f"City{i}" for i in range(count)]
+        city_catalog.replace([CatalogCity(i, city) for i, city in enumerate(cities)])
+
+        start = time.perf_counter()
+        await per_city_fresh_client(cities)
+        fresh = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await pooled_group_fetch(weatherFetch, cities)
+        pooled = time.perf_counter() - start
+        assert len(results) == count
+
+        print(f"{count:>8} {fresh:>18.3f} {pooled:>18.3f}")
+    await close_http_client()
+    server.should_exit = True
+
+if __name__ == "__main__":
+    asyncio.run(main())
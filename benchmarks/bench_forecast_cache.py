@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Forecast cache footprint and payload size: raw upstream JSON (previous behaviour) vs the normalized
+# per-field arrays stored as JSON and as msgpack+zstd, plus encode/decode cost and a sliced response.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("OPENWEATHER_API_KEY", "bench")
+
+from benchmarks.stub_openweather import start_stub_server
+
+base_url, server = start_stub_server()
+os.environ["OPENWEATHER_BASE_URL"] = base_url
+
+import fakeredis
+import httpx
+import redis.asyncio
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 500))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", 20))
+
+async def main():
+    from service import cache
+    from service.cache import encode_value, decode_value
+    from service.forecast import fetch_forecast_data, normalize_forecast, slice_forecast
+    from service.httpClient import close_http_client
+
+    cache._redis = fakeredis.aioredis.FakeRedis(decode_responses=True, connection_pool_class=redis.asyncio.BlockingConnectionPool)
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    async with httpx.AsyncClient() as client:
+        raw = [(await client.get(f"{base_url}/data/2.5/forecast", params={"q": city})).json() for city in cities[:20]]
+    normalized = [normalize_forecast(f"City{i}", data) for i, data in enumerate(raw)]
+
+    raw_bytes = sum(len(json.dumps(data)) for data in raw) / len(raw)
+    json_bytes = sum(len(encode_value(value)) for value in normalized) / len(normalized)
+    packed = [encode_value(value, compressed=True) for value in normalized]
+    packed_bytes = sum(len(value) for value in packed) / len(packed)
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for value in normalized:
+            encode_value(value, compressed=True)
+    encode_us = (time.perf_counter() - start) / (ROUNDS * len(normalized)) * 1e6
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for value in packed:
+            decode_value(value, compressed=True)
+    decode_us = (time.perf_counter() - start) / (ROUNDS * len(packed)) * 1e6
+
+    # End to end through the cache: one upstream load per city, then Redis-only reads
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch_forecast_data(city) for city in cities))
+    load_elapsed = time.perf_counter() - start
+    cache.local_cache._entries.clear()
+    cache.local_cache.size_bytes = 0
+    start = time.perf_counter()
+    results = await asyncio.gather(*(fetch_forecast_data(city) for city in cities))
+    redis_elapsed = time.perf_counter() - start
+    assert all(len(result['timestamps']) == len(raw[0]['list']) for result in results)
+
+    window = slice_forecast(results[0], results[0]['timestamps'][0], results[0]['timestamps'][0] + 86400, ('temp_celsius',))
+    print(f"per-city forecast, {len(raw[0]['list'])} steps")
+    print(f"raw upstream JSON:        {raw_bytes:>8.0f} bytes")
+    print(f"normalized JSON:          {json_bytes:>8.0f} bytes")
+    print(f"normalized msgpack+zstd:  {packed_bytes:>8.0f} bytes ({raw_bytes / packed_bytes:.1f}x smaller than raw)")
+    print(f"encode / decode:          {encode_us:.0f} / {decode_us:.0f} us")
+    print(f"24h temp-only response:   {len(json.dumps(window)):>8} bytes")
+    print(f"{CITY_COUNT} cities: upstream load {load_elapsed:.2f}s, Redis reads {redis_elapsed:.2f}s")
+    await close_http_client()
+    server.should_exit = True
+
+if __name__ == "__main__":
+    asyncio.run(main())
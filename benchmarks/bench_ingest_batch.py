@@ -0,0 +1,65 @@
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Run against local Postgres with DATABASE_URL=postgresql+asyncpg://...; defaults to a SQLite file
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+CITY_COUNT = int(os.getenv("BENCH_CITY_COUNT", 10000))
+BASELINE_CITY_COUNT = int(os.getenv("BENCH_BASELINE_CITY_COUNT", 1000))
+
+def make_payload(city: str):
+    return {
+        "name": city,
+        "weather": [{"main": random.choice(["Clear", "Clouds", "Haze", "Rain"]), "description": "bench"}],
+        "main": {"temp": 300.0, "feels_like": 301.0, "humidity": 50, "pressure": 1010},
+        "wind": {"speed": 3.5},
+        "visibility": 8000,
+    }
+
+async def main():
+    from sqlalchemy import delete
+    from database import engine, SessionLocal
+    from models import Base, WeatherData
+    from service.weatherFetch import parse_weather_data, store_weather_batch
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(WeatherData))
+
+    # Previous behaviour: one session and one commit per city
+    payloads = [make_payload(f"City{i}") for i in range(BASELINE_CITY_COUNT)]
+
+    async def per_city(data):
+        async with SessionLocal() as db:
+            await store_weather_batch([parse_weather_data(data)], db)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(per_city(data) for data in payloads))
+    per_city_elapsed = time.perf_counter() - start
+    print(f"per-city sessions: {BASELINE_CITY_COUNT} rows in {per_city_elapsed:.3f}s")
+
+    rows = [parse_weather_data(make_payload(f"City{i}")) for i in range(CITY_COUNT)]
+    start = time.perf_counter()
+    async with SessionLocal() as db:
+        stored = await store_weather_batch(rows, db)
+    batch_elapsed = time.perf_counter() - start
+    print(f"batched insert:    {len(stored)} rows in {batch_elapsed:.3f}s")
+
+    # A single unbindable row must only cost that row, not the whole batch
+    rows = [parse_weather_data(make_payload(f"City{i}")) for i in range(CITY_COUNT)]
+    rows[CITY_COUNT // 3]["humidity"] = object()
+    start = time.perf_counter()
+    async with SessionLocal() as db:
+        stored = await store_weather_batch(rows, db)
+    print(f"batch with 1 bad row: {len(stored)} of {len(rows)} rows in {time.perf_counter() - start:.3f}s")
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Live stream fan-out: thousands of subscribers on one worker, each following a few cities (some follow all),
+# fed through Redis pub/sub (fakeredis) by an ingest cycle. Reports memory per subscriber, publish-to-delivery
+# latency and the size of a delta cycle vs pushing full readings.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("LIVE_MAX_SUBSCRIBERS", "100000")
+
+import fakeredis
+import redis.asyncio
+
+SUBSCRIBERS = int(os.getenv("BENCH_SUBSCRIBERS", 5000))
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 1000))
+CITIES_PER_SUBSCRIBER = 3
+ALL_CITIES_SHARE = 0.01
+CYCLES = int(os.getenv("BENCH_CYCLES", 5))
+
+def reading(city, now):
+    return {"city": city, "main": random.choice(["Clear", "Clouds", "Haze"]), "description": "bench",
+            "temp_celsius": round(random.uniform(-5, 45), 1), "feels_like": round(random.uniform(-5, 45), 1),
+            "humidity": random.randint(10, 100), "wind_speed": round(random.uniform(0, 25), 1),
+            "pressure": random.randint(990, 1040), "visibility": 10000, "timestamp": now}
+
+async def main():
+    from service import cache
+    from service.liveStream import LIVE_CHANNEL, live_hub, publish_readings
+
+    cache._redis = fakeredis.aioredis.FakeRedis(decode_responses=True, connection_pool_class=redis.asyncio.BlockingConnectionPool)
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    live_hub.start()
+    # Bytes actually published on the channel, per cycle
+    published_bytes = [0]
+    pubsub = cache._redis.pubsub()
+    await pubsub.subscribe(LIVE_CHANNEL)
+
+    async def count_published():
+        async for message in pubsub.listen():
+            if message['type'] == 'message':
+                published_bytes[0] += len(message['data'])
+    counter = asyncio.create_task(count_published())
+    await asyncio.sleep(0.1)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subscribers = [
+        live_hub.subscribe(None if random.random() < ALL_CITIES_SHARE else set(random.sample(cities, CITIES_PER_SUBSCRIBER)))
+        for _ in range(SUBSCRIBERS)
+    ]
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / SUBSCRIBERS
+    tracemalloc.stop()
+
+    latencies, received = [], [0]
+    published_at = [0.0]
+
+    async def consume(subscriber):
+        while True:
+            frame = await subscriber.queue.get()
+            if frame is None:
+                return
+            received[0] += 1
+            latencies.append(time.perf_counter() - published_at[0])
+
+    consumers = [asyncio.create_task(consume(subscriber)) for subscriber in subscribers]
+    # The first cycle publishes full readings; later ones only the fields that changed
+    previous = {}
+    cycle_times = []
+    for cycle in range(CYCLES):
+        now = datetime.utcnow()
+        rows = []
+        for city in cities:
+            row = reading(city, now)
+            if city in previous and random.random() < 0.7:
+                row = {**previous[city], "temp_celsius": row["temp_celsius"], "timestamp": now}  # Most cities: only temperature moved
+            previous[city] = row
+            rows.append(row)
+        full_bytes = sum(len(json.dumps({**row, "timestamp": now.isoformat()})) for row in rows)
+        published_bytes[0] = 0
+        delivered = live_hub.stats["delivered"]
+        published_at[0] = time.perf_counter()
+        await publish_readings(rows)
+        await asyncio.sleep(0.05)  # Let the listener pick the batches up
+        while any(not subscriber.queue.empty() for subscriber in subscribers):
+            await asyncio.sleep(0.001)
+        cycle_times.append(time.perf_counter() - published_at[0])
+        print(f"cycle {cycle}: {live_hub.stats['delivered'] - delivered} frames delivered in {cycle_times[-1] * 1000:.0f} ms, "
+              f"published {published_bytes[0] / 1024:.0f} KiB (full readings: {full_bytes / 1024:.0f} KiB)")
+
+    counter.cancel()
+    await live_hub.stop()
+    await asyncio.gather(*consumers)
+    latencies.sort()
+    print(f"{SUBSCRIBERS} subscribers, {CITY_COUNT} cities, {CYCLES} ingest cycles")
+    print(f"memory per subscriber:    {per_subscriber / 1024:.2f} KiB")
+    print(f"delivery latency p50/p99: {latencies[len(latencies) // 2] * 1000:.1f} / {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"dropped slow subscribers: {live_hub.stats['dropped_subscribers']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
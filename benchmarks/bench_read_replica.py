@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Benchmark for read/write engine separation: user-facing reads (latest readings of a few cities) while an
+# ingestion burst keeps the primary's pool busy with write transactions. Runs each case in a fresh process:
+#   - shared: DATABASE_READ_URL unset, reads queue for the same pool as the writes
+#   - replica: reads go to DATABASE_READ_URL with their own pool
+# Reports read latency and pool wait per engine (db_pool_wait_seconds). Runs against DATABASE_URL and
+# BENCH_READ_URL (two local Postgres instances, or a primary used as its own replica) or, by default, an
+# SQLite file and a copy of it as the replica.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("DB_POOL_SIZE", "4")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 1000))
+WRITERS = int(os.getenv("BENCH_WRITERS", 16))  # Concurrent ingestion transactions
+WRITE_HOLD_MS = int(os.getenv("BENCH_WRITE_HOLD_MS", 50))  # Time each write transaction keeps its connection
+READERS = int(os.getenv("BENCH_READERS", 8))
+READS = int(os.getenv("BENCH_READS", 400))
+CONDITIONS = ["Clear", "Clouds", "Haze", "Rain", "Mist"]
+
+def reading(rng, city, timestamp):
+    return {"city": city, "main": rng.choice(CONDITIONS), "description": "seeded",
+            "temp_celsius": rng.uniform(-5, 45), "feels_like": rng.uniform(-5, 45), "humidity": rng.randint(10, 100),
+            "wind_speed": rng.uniform(0, 25), "pressure": rng.randint(990, 1040), "visibility": rng.randint(500, 10000),
+            "timestamp": timestamp}
+
+async def seed_database():
+    from sqlalchemy import insert
+    from database import engine
+    from models import Base, LatestWeather
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        rng = random.Random(42)
+        await conn.execute(insert(LatestWeather), [reading(rng, f"City{i}", datetime.utcnow()) for i in range(CITY_COUNT)])
+    await engine.dispose()
+
+def quantile_ms(values: list, q: int):
+    return round(statistics.quantiles(values, n=100, method="inclusive")[q - 1] * 1000, 2)
+
+def pool_wait(engine_name: str):
+    from service.metrics import DB_POOL_WAIT
+    for metric in DB_POOL_WAIT.collect():
+        samples = {sample.name: sample.value for sample in metric.samples if sample.labels.get("engine") == engine_name}
+        if samples.get("db_pool_wait_seconds_count"):
+            return round(samples["db_pool_wait_seconds_sum"] / samples["db_pool_wait_seconds_count"] * 1000, 2)
+    return None
+
+# Child process: one case, printed as JSON
+async def measure():
+    from sqlalchemy import insert, select
+    from database import ReadSessionLocal, SessionLocal
+    from models import WeatherData
+    from service.weatherFetch import get_latest_readings
+
+    rng = random.Random(7)
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    stop = asyncio.Event()
+
+    async def writer():
+        while not stop.is_set():
+            # Holds its connection for WRITE_HOLD_MS, writing only at the end (SQLite allows one writer at a time)
+            async with SessionLocal() as db:
+                await db.execute(select(1))
+                await asyncio.sleep(WRITE_HOLD_MS / 1000)
+                await db.execute(insert(WeatherData), [reading(rng, city, datetime.utcnow()) for city in rng.sample(cities, 20)])
+                await db.commit()
+
+    durations, remaining = [], [READS]
+
+    async def reader():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            async with ReadSessionLocal() as db:
+                await get_latest_readings(db, rng.sample(cities, 5))
+            durations.append(time.perf_counter() - start)
+
+    writers = [asyncio.create_task(writer()) for _ in range(WRITERS)]
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    await asyncio.gather(*(reader() for _ in range(READERS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*writers)
+    print(json.dumps({
+        "reads_per_s": round(len(durations) / elapsed, 1),
+        "p50_ms": quantile_ms(durations, 50),
+        "p99_ms": quantile_ms(durations, 99),
+        "write_pool_wait_ms": pool_wait("write"),
+        "read_pool_wait_ms": pool_wait("read"),
+    }))
+
+def run_case(read_url: str = None):
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_READ_URL"}
+    if read_url:
+        env["DATABASE_READ_URL"] = read_url
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], capture_output=True, text=True, cwd=ROOT, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    asyncio.run(seed_database())
+    read_url = os.getenv("BENCH_READ_URL")
+    if read_url is None:
+        primary = os.environ["DATABASE_URL"].split(":///", 1)[1]
+        replica = primary.replace(".db", "_replica.db")
+        shutil.copyfile(primary, replica)
+        read_url = os.environ["DATABASE_URL"].replace(primary, replica)
+
+    print(f"{READERS} readers x {READS} reads, {WRITERS} writers holding connections {WRITE_HOLD_MS} ms, "
+          f"DB_POOL_SIZE={os.environ['DB_POOL_SIZE']} DB_MAX_OVERFLOW={os.environ['DB_MAX_OVERFLOW']}")
+    print(f"  {'case':<10} {'reads/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'write wait ms':>14} {'read wait ms':>13}")
+    for name, url in (("shared", None), ("replica", read_url)):
+        result = run_case(url)
+        print(f"  {name:<10} {result['reads_per_s']:>9} {result['p50_ms']:>9} {result['p99_ms']:>9} "
+              f"{result['write_pool_wait_ms'] or '-':>14} {result['read_pool_wait_ms'] or '-':>13}")
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        asyncio.run(measure())
+    else:
+        main()
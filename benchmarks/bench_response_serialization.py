@@ -0,0 +1,100 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+# GET /api/weather throughput for BENCH_CITIES cities, in-process over ASGI (no network):
+#   - previous path: ORM objects -> dict per row with isoformat() -> FastAPI's jsonable_encoder + json
+#   - column select -> orjson bytes, per request (LATEST_SNAPSHOT_ENABLED=false)
+#   - the shared snapshot, gzip-compressed once per reload
+# Runs against DATABASE_URL (local Postgres) or the default SQLite file; the tables are recreated.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+import fakeredis
+import httpx
+import redis.asyncio
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 10000))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", 50))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 10))
+
+async def drive(client, path, encoding="identity"):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    sizes = []
+
+    async def one():
+        async with semaphore:
+            response = await client.get(path, headers={"Accept-Encoding": encoding})
+            assert response.status_code == 200
+            sizes.append(int(response.headers.get("content-length", len(response.content))))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start), sizes[0]
+
+async def main():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import insert
+    from sqlalchemy.future import select
+    from config import settings
+    from database import engine, get_db
+    from models import Base, LatestWeather
+    from service import cache
+    from service.cityCatalog import city_catalog, CatalogCity
+    from service.responses import ORJSONResponse
+    from controller import router
+
+    engine.echo = False
+    cache._redis = fakeredis.aioredis.FakeRedis(decode_responses=True, connection_pool_class=redis.asyncio.BlockingConnectionPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    city_catalog.replace([CatalogCity(i, city) for i, city in enumerate(cities)])
+    now = datetime.utcnow()
+    rows = [
+        {"city": city, "main": random.choice(["Clear", "Clouds", "Haze"]), "description": "scattered clouds",
+         "temp_celsius": random.uniform(-5, 45), "feels_like": random.uniform(-5, 45), "humidity": random.randint(10, 100),
+         "wind_speed": random.uniform(0, 25), "pressure": random.randint(990, 1040), "visibility": 10000, "timestamp": now}
+        for city in cities
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(LatestWeather), rows)
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(router, prefix="/api")
+
+    # The previous implementation of GET /api/weather, for comparison
+    legacy = FastAPI()
+    @legacy.get("/api/weather")
+    async def legacy_weather(db=Depends(get_db)):
+        result = await db.execute(select(LatestWeather).filter(LatestWeather.city.in_(city_catalog.names)))
+        return {"weather": [
+            {"city": w.city, "main": w.main, "description": w.description, "temp_celsius": w.temp_celsius,
+             "feels_like": w.feels_like, "humidity": w.humidity, "wind_speed": w.wind_speed, "pressure": w.pressure,
+             "visibility": w.visibility, "timestamp": w.timestamp.isoformat()}
+            for w in result.scalars().all()
+        ]}
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=legacy), base_url="http://bench") as client:
+        results["previous (ORM + dicts + jsonable_encoder)"] = await drive(client, "/api/weather")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        settings.LATEST_SNAPSHOT_ENABLED = False
+        results["column select + orjson"] = await drive(client, "/api/weather")
+        results["column select + orjson, gzip"] = await drive(client, "/api/weather", "gzip")
+        settings.LATEST_SNAPSHOT_ENABLED = True
+        results["shared snapshot"] = await drive(client, "/api/weather")
+        results["shared snapshot, gzip"] = await drive(client, "/api/weather", "gzip")
+
+    print(f"GET /api/weather, {CITY_COUNT} cities, {REQUESTS} requests, concurrency {CONCURRENCY}")
+    for name, (rps, size) in results.items():
+        print(f"{name:<45} {rps:>8.1f} req/s  {size / 1024:>7.0f} KiB")
+
+if __name__ == "__main__":
+    asyncio.run(main())
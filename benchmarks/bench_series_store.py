@@ -0,0 +1,104 @@
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+# Benchmark for "last 24h of city X, hourly min/max/avg": ORM objects from the database bucketed in Python
+# vs the in-memory NumPy series store. Also reports warm-up time and memory per city.
+# Runs against DATABASE_URL (local Postgres) or the default SQLite file; the tables are recreated.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 200))
+QUERIES = int(os.getenv("BENCH_QUERIES", 500))
+CONDITIONS = ["Clear", "Clouds", "Haze", "Rain", "Mist"]
+
+# Previous shape of a series read: full WeatherData rows, grouped per hour in Python
+async def orm_hourly_series(db, WeatherData, select, city, since):
+    result = await db.execute(
+        select(WeatherData).filter(WeatherData.city == city, WeatherData.timestamp >= since).order_by(WeatherData.timestamp)
+    )
+    buckets = defaultdict(list)
+    for reading in result.scalars().all():
+        buckets[reading.timestamp.replace(minute=0, second=0, microsecond=0)].append(reading)
+    return {
+        hour: {
+            'min': min(r.temp_celsius for r in readings),
+            'max': max(r.temp_celsius for r in readings),
+            'avg': sum(r.temp_celsius for r in readings) / len(readings),
+            'main': Counter(r.main for r in readings).most_common(1)[0][0],
+        }
+        for hour, readings in buckets.items()
+    }
+
+async def main():
+    from sqlalchemy import insert
+    from sqlalchemy.future import select
+    from config import settings
+    from database import engine, SessionLocal
+    from models import Base, WeatherData
+    from service.cityCatalog import city_catalog, CatalogCity
+    from service.seriesStore import series_store, series_capacity, warm_series_store, query_series
+
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    city_catalog.replace([CatalogCity(i, city) for i, city in enumerate(cities)])
+    now = datetime.utcnow()
+    readings = series_capacity()
+    rows = [
+        {"city": city, "main": random.choice(CONDITIONS), "description": "bench", "temp_celsius": random.uniform(-5, 45),
+         "feels_like": random.uniform(-5, 45), "humidity": random.randint(10, 100), "wind_speed": random.uniform(0, 25),
+         "pressure": random.randint(990, 1040), "visibility": random.randint(500, 10000),
+         "timestamp": now - timedelta(minutes=settings.INGEST_INTERVAL_MINUTES * step)}
+        for city in cities for step in range(readings)
+    ]
+    async with SessionLocal() as db:
+        for i in range(0, len(rows), 10000):
+            await db.execute(insert(WeatherData), rows[i:i + 10000])
+        await db.commit()
+
+    start = time.perf_counter()
+    await warm_series_store()
+    warm_elapsed = time.perf_counter() - start
+    stats = series_store.stats()
+
+    since, until = now - timedelta(hours=24), now + timedelta(minutes=1)
+    picks = [random.choice(cities) for _ in range(QUERIES)]
+    async with SessionLocal() as db:
+        start = time.perf_counter()
+        for city in picks:
+            await orm_hourly_series(db, WeatherData, select, city, since)
+        orm_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for city in picks:
+        query_series(series_store.series[city], city, since, until, 60, ('temp_celsius',))
+    store_elapsed = time.perf_counter() - start
+
+    # Spot check: same hourly aggregates both ways
+    city = picks[0]
+    async with SessionLocal() as db:
+        expected = await orm_hourly_series(db, WeatherData, select, city, since)
+    result = query_series(series_store.series[city], city, since, until, 60, ('temp_celsius',))
+    for hour, bucket_min, bucket_max in zip(result['timestamps'], result['temp_celsius']['min'], result['temp_celsius']['max']):
+        bucket = expected[datetime.fromisoformat(hour)]
+        assert abs(bucket['min'] - bucket_min) < 0.01 and abs(bucket['max'] - bucket_max) < 0.01
+
+    print(f"{CITY_COUNT} cities x {readings} readings ({settings.SERIES_RETENTION_DAYS} days at {settings.INGEST_INTERVAL_MINUTES} min)")
+    print(f"warm-up from database:     {warm_elapsed:.2f}s")
+    print(f"memory per city:           {stats['bytes_per_city'] / 1024:.1f} KiB ({stats['bytes'] / 1024 / 1024:.1f} MiB total)")
+    print(f"24h hourly series, ORM:    {orm_elapsed / QUERIES * 1000:.2f} ms/query")
+    print(f"24h hourly series, store:  {store_elapsed / QUERIES * 1000:.3f} ms/query")
+    print("hourly aggregates match")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Multi-process check of sharded ingestion: N worker processes claim cities each interval against
+# one Redis (BENCH_REDIS_URL, or an in-process fakeredis TCP server), one worker is killed midway,
+# and every interval is checked for cities claimed twice or not at all.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORKERS = int(os.getenv("BENCH_WORKERS", 4))
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 1000))
+INTERVAL_SECONDS = 1
+CYCLES = int(os.getenv("BENCH_CYCLES", 12))
+WORKER_TTL_SECONDS = 3
+
+def worker(redis_url, results):
+    os.environ.update(
+        DATABASE_URL="sqlite+aiosqlite:////tmp/weather_bench.db", REDIS_HOST=redis_url, REDIS_PORT="6379",
+        INGEST_SHARDING_ENABLED="true", INGEST_WORKER_TTL_SECONDS=str(WORKER_TTL_SECONDS),
+    )
+    from config import settings
+    settings.INGEST_INTERVAL_MINUTES = INTERVAL_SECONDS / 60
+    # Enough quota for every city to be due each interval, so a missing city means a sharding gap
+    settings.OPENWEATHER_RATE_LIMIT_PER_MINUTE = CITY_COUNT * WORKERS * 60
+    from service.cityCatalog import refresh_scheduler
+    from service.ingestSharding import owned_city_shard, claim_cities, WORKER_ID
+    from service.weatherFetch import ingest_budget
+
+    async def run():
+        cities = [f"City{i}" for i in range(CITY_COUNT)]
+        for _ in range(CYCLES):
+            # Claim shortly after each interval boundary, like a jittered scheduler would
+            await asyncio.sleep(INTERVAL_SECONDS - time.time() % INTERVAL_SECONDS + 0.05)
+            slot = int(time.time() // INTERVAL_SECONDS)
+            # Same path as scheduled_fetch_weather: ring shard -> due within the budget -> claim
+            owned, worker_count = await owned_city_shard(cities, {})
+            due = refresh_scheduler.select_due(owned, set(owned), ingest_budget(worker_count))
+            claimed = await claim_cities(due)
+            refresh_scheduler.mark_refreshed(claimed)
+            results.put((WORKER_ID, slot, claimed))
+
+    asyncio.run(run())
+
+def main():
+    redis_url = os.getenv("BENCH_REDIS_URL")
+    if not redis_url:
+        from fakeredis import TcpFakeServer
+        server = TcpFakeServer(("127.0.0.1", 6391), server_type="redis")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        redis_url = "redis://127.0.0.1:6391/0"
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(redis_url, results)) for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+
+    time.sleep(CYCLES * INTERVAL_SECONDS / 2)
+    processes[0].kill()
+    print(f"killed one of {WORKERS} workers after ~{CYCLES // 2} intervals")
+
+    # Drain results while the survivors run; a child can't exit until its queued data is read
+    by_slot = defaultdict(Counter)
+    workers_by_slot = defaultdict(set)
+    while any(process.is_alive() for process in processes[1:]) or not results.empty():
+        try:
+            worker_id, slot, claimed = results.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        by_slot[slot].update(claimed)
+        workers_by_slot[slot].add(worker_id)
+
+    for slot in sorted(by_slot):
+        counts = by_slot[slot]
+        duplicates = sum(1 for n in counts.values() if n > 1)
+        print(f"slot {slot}: {len(workers_by_slot[slot])} workers, {len(counts)}/{CITY_COUNT} cities claimed, {duplicates} duplicates")
+
+if __name__ == "__main__":
+    main()
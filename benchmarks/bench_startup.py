@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Benchmark for worker startup, each sample in a fresh interpreter:
+#   - `import main`: what a bare import costs (no app, engine, Redis or scheduler is created)
+#   - time to ready: import, build the app and run the lifespan startup (partitions, city catalog, cache
+#     warmup) until the worker would accept requests, with the per-phase breakdown from main.startup_stats
+# Runs against DATABASE_URL (local Postgres) or the default SQLite file, seeded with BENCH_CITIES cities,
+# and an in-process fakeredis.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["SCHEDULER_ENABLED"] = "false"
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 1000))
+HOURS = int(os.getenv("BENCH_HOURS", 6))
+SAMPLES = int(os.getenv("BENCH_SAMPLES", 5))
+CONDITIONS = ["Clear", "Clouds", "Haze", "Rain", "Mist"]
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+async def seed_database():
+    from sqlalchemy import insert
+    from database import engine
+    from models import Base, City, WeatherData, LatestWeather
+    from config import settings
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    rng = random.Random(42)
+    now = datetime.utcnow().replace(microsecond=0)
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+
+    def reading(city, timestamp):
+        return {"city": city, "main": rng.choice(CONDITIONS), "description": "seeded",
+                "temp_celsius": rng.uniform(-5, 45), "feels_like": rng.uniform(-5, 45), "humidity": rng.randint(10, 100),
+                "wind_speed": rng.uniform(0, 25), "pressure": rng.randint(990, 1040), "visibility": rng.randint(500, 10000),
+                "timestamp": timestamp}
+
+    steps = int(HOURS * 60 / settings.INGEST_INTERVAL_MINUTES)
+    async with engine.begin() as conn:
+        await conn.execute(insert(City), [
+            {"id": i, "name": city, "country": "XX", "lat": 0.0, "lon": 0.0, "tier": "hot", "updated_at": now}
+            for i, city in enumerate(cities)
+        ])
+        await conn.execute(insert(WeatherData), [
+            reading(city, now - timedelta(minutes=settings.INGEST_INTERVAL_MINUTES * step))
+            for step in range(steps, 0, -1) for city in cities
+        ])
+        await conn.execute(insert(LatestWeather), [reading(city, now) for city in cities])
+    await engine.dispose()
+
+# Child process: time from the first import to the end of the lifespan startup
+async def measure_ready():
+    import fakeredis
+    import redis.asyncio
+    from service import cache
+    cache._redis = fakeredis.aioredis.FakeRedis(decode_responses=True, connection_pool_class=redis.asyncio.BlockingConnectionPool)
+
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter() - start
+    app = main.create_app()
+    built = time.perf_counter() - start - imported
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter() - start
+    print(json.dumps({"import": imported, "create_app": built, "ready": ready, "phases": main.startup_stats}))
+
+def run_child(args: list):
+    result = subprocess.run([sys.executable, *args], capture_output=True, text=True, cwd=ROOT, env=os.environ)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return result.stdout.strip().splitlines()[-1]
+
+def main():
+    asyncio.run(seed_database())
+    print(f"Seeded {CITY_COUNT} cities, {HOURS}h of readings; {SAMPLES} samples each, fresh interpreter per sample")
+
+    imports = [float(run_child(["-c", IMPORT_SNIPPET])) for _ in range(SAMPLES)]
+    print(f"  import main                 median {statistics.median(imports) * 1000:8.1f} ms  "
+          f"(min {min(imports) * 1000:.1f}, max {max(imports) * 1000:.1f})")
+
+    samples = [json.loads(run_child([os.path.abspath(__file__), "--child"])) for _ in range(SAMPLES)]
+    for key, label in (("import", "import main (with fakeredis)"), ("create_app", "create_app()"), ("ready", "time to ready")):
+        values = [sample[key] for sample in samples]
+        print(f"  {label:<27} median {statistics.median(values) * 1000:8.1f} ms")
+    print("  lifespan phases (median ms):")
+    for phase in samples[0]["phases"]:
+        print(f"    {phase:<25} {statistics.median(sample['phases'].get(phase, 0) for sample in samples) * 1000:8.1f}")
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        asyncio.run(measure_ready())
+    else:
+        main()
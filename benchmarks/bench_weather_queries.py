@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+import time
+
+# Postgres only. Point DATABASE_URL at a scratch database: weather_data is dropped and re-seeded.
+#   BENCH_CITIES=1000 BENCH_DAYS=365 python benchmarks/bench_weather_queries.py
+# A full year at 5-minute resolution for 1000 cities is ~105M rows; start with fewer days.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("REDIS_HOST", "redis://localhost:6379/0")
+os.environ.setdefault("REDIS_PORT", "6379")
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 1000))
+DAYS = int(os.getenv("BENCH_DAYS", 30))
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations", "001_partition_weather_data.sql")
+
+QUERIES = {
+    "latest reading per city (GET /api/weather)": """
+        SELECT w.* FROM weather_data w
+        JOIN (SELECT city, max(timestamp) AS latest_timestamp FROM weather_data
+              WHERE city = ANY(:cities) GROUP BY city) latest
+          ON w.city = latest.city AND w.timestamp = latest.latest_timestamp
+    """,
+    "last 2 readings for one city (check_alerts)": """
+        SELECT * FROM weather_data WHERE city = :city ORDER BY timestamp DESC LIMIT 2
+    """,
+    "today's aggregates for one city (daily summary)": """
+        SELECT avg(temp_celsius), max(temp_celsius), min(temp_celsius), main FROM weather_data
+        WHERE city = :city AND timestamp >= current_date AND timestamp < current_date + 1
+        GROUP BY main
+    """,
+}
+
+async def main():
+    from sqlalchemy import text
+    from database import engine, SessionLocal
+    from models import Base
+    from service.partitions import ensure_weather_partitions
+
+    # Plain table from the models, then converted by the partitioning migration
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS weather_data CASCADE"))
+        await conn.run_sync(Base.metadata.create_all)
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.execute(open(MIGRATION).read())
+
+    async with SessionLocal() as db:
+        # Partitions for the whole seeded range, plus the upcoming ones
+        await db.execute(text(f"""
+            DO $$
+            DECLARE m DATE := date_trunc('month', now() - interval '{DAYS} days');
+            BEGIN
+                WHILE m <= date_trunc('month', now()) LOOP
+                    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF weather_data FOR VALUES FROM (%L) TO (%L)',
+                                   'weather_data_p' || to_char(m, 'YYYY_MM'), m, m + interval '1 month');
+                    m := m + interval '1 month';
+                END LOOP;
+            END $$;
+        """))
+        await db.commit()
+        await ensure_weather_partitions(db)
+
+        start = time.perf_counter()
+        await db.execute(text(f"""
+            INSERT INTO weather_data (city, main, description, temp_celsius, feels_like, humidity,
+                                      wind_speed, pressure, visibility, timestamp)
+            SELECT 'City' || c, (ARRAY['Clear','Clouds','Haze','Rain'])[1 + (c + extract(epoch FROM ts)::int / 300) % 4],
+                   'bench', 20 + random() * 20, 20 + random() * 20, (random() * 100)::int,
+                   random() * 20, 990 + (random() * 50)::int, (random() * 10000)::int, ts
+            FROM generate_series(0, {CITY_COUNT - 1}) c,
+                 generate_series(now() - interval '{DAYS} days', now(), interval '5 minutes') ts
+        """))
+        await db.commit()
+        await db.execute(text("ANALYZE weather_data"))
+        print(f"seeded {CITY_COUNT} cities x {DAYS} days in {time.perf_counter() - start:.1f}s")
+
+        params = {"cities": [f"City{i}" for i in range(CITY_COUNT)], "city": "City7"}
+        for label, sql in QUERIES.items():
+            plan = await db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+            timings = []
+            for _ in range(5):
+                start = time.perf_counter()
+                await db.execute(text(sql), params)
+                timings.append(time.perf_counter() - start)
+            print(f"\n== {label}: best {min(timings) * 1000:.1f}ms of 5")
+            print("\n".join(row[0] for row in plan.all()))
+
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+# End-to-end benchmark suite. Starts the real FastAPI app (uvicorn, on this event loop) against local stand-ins:
+#   - OpenWeatherMap: benchmarks/stub_openweather.py (STUB_LATENCY_MS, STUB_ERROR_RATE)
+#   - Redis: BENCH_REDIS_URL if set, otherwise an in-process fakeredis
+#   - Database: DATABASE_URL (local Postgres) or the default SQLite file; the tables are recreated
+#   - SMTP: benchmarks/smtp_sink.py
+# seeds BENCH_CITIES cities with BENCH_DAYS of readings, runs each scheduled job, then drives each endpoint
+# over HTTP at --concurrency, and reports throughput, p50/p95/p99 latency and process memory. Results are
+# written as JSON; --compare prints the change against an earlier results file.
+#   python benchmarks/run_suite.py --requests 300 --compare benchmarks/results/baseline.json
+# Client, server and stub share one process (and the GIL), so numbers are for comparing runs on the
+# same machine, not absolute capacity.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:////tmp/weather_bench.db")
+os.environ.setdefault("REDIS_HOST", os.getenv("BENCH_REDIS_URL", "redis://localhost:6379/0"))
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("OPENWEATHER_API_KEY", "bench")
+os.environ.setdefault("OPENWEATHER_RATE_LIMIT_PER_MINUTE", "600000")  # The stub has no quota
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.update(SCHEDULER_ENABLED="false",  # Jobs are run by the suite, one at a time
+                  SMTP_SERVER="127.0.0.1", SMTP_PORT="8025", SMTP_START_TLS="false",
+                  SMTP_SENDER_EMAIL="alerts@example.com", SMTP_PASSWORD="")
+
+from benchmarks.stub_openweather import start_stub_server
+from benchmarks.smtp_sink import start_smtp_sink
+
+stub_url, stub_server = start_stub_server()
+os.environ["OPENWEATHER_BASE_URL"] = stub_url
+os.environ["OPENWEATHER_HISTORY_URL"] = stub_url
+
+import httpx
+import redis.asyncio
+import uvicorn
+
+CITY_COUNT = int(os.getenv("BENCH_CITIES", 1000))
+DAYS = float(os.getenv("BENCH_DAYS", 1))
+SUBSCRIBED_SHARE = 0.1  # Cities with alert subscribers
+SUBSCRIBERS_PER_CITY = 5
+APP_PORT = int(os.getenv("BENCH_PORT", 8766))
+SEED = int(os.getenv("BENCH_SEED", 42))
+CONDITIONS = ["Clear", "Clouds", "Haze", "Rain", "Mist"]
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def summarize(durations: list, elapsed: float, errors: int, rss_before: float):
+    durations = sorted(durations)
+    quantiles = statistics.quantiles(durations, n=100, method="inclusive") if len(durations) > 1 else durations * 99
+    return {
+        "count": len(durations),
+        "errors": errors,
+        "throughput": round(len(durations) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(statistics.fmean(durations) * 1000, 2),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "max_ms": round(durations[-1] * 1000, 2),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+    }
+
+async def seed_database(rng: random.Random):
+    from sqlalchemy import insert
+    from database import engine
+    from models import Base, City, WeatherData, LatestWeather, Alert, AlertSubscription
+    from config import settings
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    now = datetime.utcnow().replace(microsecond=0)
+    cities = [f"City{i}" for i in range(CITY_COUNT)]
+    steps = int(DAYS * 24 * 60 / settings.INGEST_INTERVAL_MINUTES)
+
+    def reading(city, timestamp):
+        return {"city": city, "main": rng.choice(CONDITIONS), "description": "seeded",
+                "temp_celsius": round(rng.uniform(-5, 45), 2), "feels_like": round(rng.uniform(-5, 45), 2),
+                "humidity": rng.randint(10, 100), "wind_speed": round(rng.uniform(0, 25), 2),
+                "pressure": rng.randint(990, 1040), "visibility": rng.randint(500, 10000), "timestamp": timestamp}
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(City), [
+            {"id": i, "name": city, "country": "XX", "lat": 0.0, "lon": 0.0, "tier": "hot", "updated_at": now}
+            for i, city in enumerate(cities)
+        ])
+        batch = []
+        for step in range(steps, 0, -1):
+            timestamp = now - timedelta(minutes=settings.INGEST_INTERVAL_MINUTES * step)
+            batch.extend(reading(city, timestamp) for city in cities)
+            if len(batch) >= 20000:
+                await conn.execute(insert(WeatherData), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(WeatherData), batch)
+        await conn.execute(insert(LatestWeather), [reading(city, now) for city in cities])
+        await conn.execute(insert(Alert), [
+            {"city": city, "alert_type": "High Temperature", "alert_message": "seeded", "timestamp": now - timedelta(hours=1)}
+            for city in cities
+        ])
+        subscribed = cities[:max(1, int(CITY_COUNT * SUBSCRIBED_SHARE))]
+        await conn.execute(insert(AlertSubscription), [
+            {"city": city, "email": f"user{n}@{city.lower()}.example.com", "created_at": now}
+            for city in subscribed for n in range(SUBSCRIBERS_PER_CITY)
+        ])
+    return cities, steps * CITY_COUNT
+
+# Requests per endpoint scenario: (name, method, path, params) factories drawing a random city
+def endpoint_scenarios(cities: list, rng: random.Random):
+    def city():
+        return rng.choice(cities)
+
+    def history_window():
+        end = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=rng.randint(0, 30))
+        return {"start": (end - timedelta(days=1)).isoformat(), "end": end.isoformat()}
+
+    return {
+        "GET /api/weather": lambda: ("GET", "/api/weather", None),
+        "GET /api/weather/{city}": lambda: ("GET", f"/api/weather/{city()}", None),
+        "GET /api/weather/daily-summary/{city}": lambda: ("GET", f"/api/weather/daily-summary/{city()}", None),
+        "GET /api/weather/hourly-summary/{city}": lambda: ("GET", f"/api/weather/hourly-summary/{city()}", None),
+        "GET /api/weather/series/{city}": lambda: ("GET", f"/api/weather/series/{city()}", {"hours": 24, "bucket_minutes": 60}),
+        "GET /api/weather/historical/{city}": lambda: ("GET", f"/api/weather/historical/{city()}", history_window()),
+        "GET /api/weather/forecast/{city}": lambda: ("GET", f"/api/weather/forecast/{city()}", None),
+        "GET /api/weather/latest-alert/{city}": lambda: ("GET", f"/api/weather/latest-alert/{city()}", None),
+        "GET /api/weather/alert-states/{city}": lambda: ("GET", f"/api/weather/alert-states/{city()}", None),
+        "POST /api/weather/check-alerts": lambda: ("POST", "/api/weather/check-alerts", None),
+        "POST /api/weather/subscriptions": lambda: ("POST", "/api/weather/subscriptions",
+                                                    {"city": city(), "email": f"bench{rng.randrange(10 ** 9)}@example.com"}),
+        "POST /api/weather/send-alert-email": lambda: ("POST", "/api/weather/send-alert-email",
+                                                       {"city": city(), "email": "bench@example.com"}),
+        "GET /metrics": lambda: ("GET", "/metrics", None),
+    }
+
+# Scenarios that are whole-table operations get fewer requests
+REQUEST_SHARE = {"GET /api/weather": 0.2, "POST /api/weather/check-alerts": 0.05}
+
+async def drive_endpoint(client: httpx.AsyncClient, make_request, requests: int, concurrency: int):
+    durations, errors, remaining = [], 0, [requests]
+    rss_before = rss_mb()
+
+    async def worker():
+        nonlocal errors
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            method, path, params = make_request()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(durations, time.perf_counter() - start, errors, rss_before)
+
+async def run_job(job, runs: int):
+    durations, errors = [], 0
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    for _ in range(runs):
+        job_start = time.perf_counter()
+        try:
+            await job()
+        except Exception as e:
+            errors += 1
+            print(f"  job failed: {e}")
+        durations.append(time.perf_counter() - job_start)
+    result = summarize(durations, time.perf_counter() - start, errors, rss_before)
+    result.pop("throughput")
+    return result
+
+def job_scenarios(smtp_handler):
+    from database import SessionLocal
+    from service.weatherFetch import scheduled_fetch_weather
+    from service.weatherSummary import calculate_daily_summaries, schedule_daily_summaries
+    from service.partitions import maintain_weather_partitions
+    from service.cityCatalog import reload_city_catalog, city_catalog
+    from service.seriesStore import warm_series_store
+    from service.emailDispatcher import email_dispatcher
+
+    async def daily_summaries_today():
+        async with SessionLocal() as db:
+            await calculate_daily_summaries(db)
+
+    # One alert email per subscribed city, timed until the SMTP sink has accepted all of them
+    async def email_dispatch():
+        expected = smtp_handler.messages + len(city_catalog.names[:max(1, int(CITY_COUNT * SUBSCRIBED_SHARE))])
+        for city in city_catalog.names[:max(1, int(CITY_COUNT * SUBSCRIBED_SHARE))]:
+            email_dispatcher.enqueue(f"Weather Alert for {city}", "benchmark", [f"user{n}@example.com" for n in range(SUBSCRIBERS_PER_CITY)])
+        await email_dispatcher.queue.join()
+        if smtp_handler.messages < expected:
+            raise RuntimeError(f"sink received {smtp_handler.messages} of {expected} messages")
+
+    return {
+        "scheduled_fetch_weather": scheduled_fetch_weather,
+        "calculate_daily_summaries": daily_summaries_today,
+        "schedule_daily_summaries": schedule_daily_summaries,
+        "maintain_weather_partitions": maintain_weather_partitions,
+        "reload_city_catalog": reload_city_catalog,
+        "warm_series_store": warm_series_store,
+        "email_dispatch": email_dispatch,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_results(title: str, results: dict, baseline: dict = None):
+    print(f"\n{title}")
+    print(f"  {'scenario':<42} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rss MB':>8}")
+    for name, result in results.items():
+        line = (f"  {name:<42} {result.get('throughput') or '':>9} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+                f"{result['p99_ms']:>9} {result['errors']:>7} {result['rss_mb']:>8}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            changes = []
+            if result.get("throughput") and previous.get("throughput"):
+                changes.append(f"req/s {(result['throughput'] / previous['throughput'] - 1) * 100:+.0f}%")
+            if previous["p95_ms"]:
+                changes.append(f"p95 {(result['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}%")
+            line += "   " + ", ".join(changes)
+        print(line)
+
+async def main(args):
+    from service import cache
+    from service.cityCatalog import reload_city_catalog
+    from main import app
+
+    rng = random.Random(SEED)
+    if not os.getenv("BENCH_REDIS_URL"):
+        import fakeredis
+        cache._redis = fakeredis.aioredis.FakeRedis(decode_responses=True, connection_pool_class=redis.asyncio.BlockingConnectionPool)
+    smtp_handler, smtp_controller = start_smtp_sink()
+
+    start = time.perf_counter()
+    cities, readings = await seed_database(rng)
+    seed_elapsed = time.perf_counter() - start
+    print(f"Seeded {CITY_COUNT} cities, {readings} readings in {seed_elapsed:.1f}s")
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=APP_PORT, log_level="warning", lifespan="on"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    await reload_city_catalog()
+
+    only = set(args.only.split(",")) if args.only else None
+    jobs, endpoints = {}, {}
+    for name, job in job_scenarios(smtp_handler).items():
+        if only is None or name in only:
+            print(f"job {name} ...")
+            jobs[name] = await run_job(job, args.job_runs)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=60) as client:
+        for name, make_request in endpoint_scenarios(cities, rng).items():
+            if only is None or name in only:
+                print(f"endpoint {name} ...")
+                requests = max(args.concurrency, int(args.requests * REQUEST_SHARE.get(name, 1)))
+                endpoints[name] = await drive_endpoint(client, make_request, requests, args.concurrency)
+
+    server.should_exit = True
+    await server_task
+    smtp_controller.stop()
+    stub_server.should_exit = True
+
+    results = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git_commit": git_commit(),
+            "database": os.environ["DATABASE_URL"].split("://")[0],
+            "redis": "redis" if os.getenv("BENCH_REDIS_URL") else "fakeredis",
+            "cities": CITY_COUNT,
+            "days": DAYS,
+            "readings": readings,
+            "seed_seconds": round(seed_elapsed, 1),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "job_runs": args.job_runs,
+            "stub_latency_ms": float(os.getenv("STUB_LATENCY_MS", 50)),
+            "stub_error_rate": float(os.getenv("STUB_ERROR_RATE", 0)),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "jobs": jobs,
+        "endpoints": endpoints,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results("Jobs", jobs, (baseline or {}).get("jobs"))
+    print_results("Endpoints", endpoints, (baseline or {}).get("endpoints"))
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         f"suite-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the end-to-end benchmark suite against local stand-ins")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--job-runs", type=int, default=3, help="Runs per scheduled job")
+    parser.add_argument("--only", help="Comma-separated scenario names (jobs and/or endpoints) to run")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/suite-<utc time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    asyncio.run(main(parser.parse_args()))
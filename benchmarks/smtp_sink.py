@@ -0,0 +1,18 @@
+from aiosmtpd.controller import Controller
+
+# Local SMTP stand-in that accepts and counts messages (no TLS, no auth)
+class CountingHandler:
+    def __init__(self):
+        self.messages = 0
+        self.recipients = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        self.recipients += len(envelope.rcpt_tos)
+        return '250 OK'
+
+def start_smtp_sink(host: str = "127.0.0.1", port: int = 8025):
+    handler = CountingHandler()
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+    return handler, controller
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+
+# Local stand-in for the OpenWeatherMap endpoints used by the service layer.
+# STUB_LATENCY_MS adds a fixed delay per request, STUB_ERROR_RATE makes that fraction return 500.
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", 50))
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", 0))
+
+app = FastAPI()
+request_count = {"total": 0}
+
+def city_id(name: str):
+    return abs(hash(name)) % 10_000_000
+
+def make_current(city: str, ident: int):
+    return {
+        "id": ident,
+        "name": city,
+        "weather": [{"main": random.choice(["Clear", "Clouds", "Haze", "Rain"]), "description": "stub"}],
+        "main": {
+            "temp": 273.15 + random.uniform(5, 45),
+            "feels_like": 273.15 + random.uniform(5, 45),
+            "humidity": random.randint(10, 100),
+            "pressure": random.randint(990, 1040),
+        },
+        "wind": {"speed": random.uniform(0, 25)},
+        "visibility": random.randint(500, 10000),
+        "dt": int(time.time()),
+    }
+
+async def simulate_upstream():
+    request_count["total"] += 1
+    if STUB_LATENCY_MS:
+        await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    if STUB_ERROR_RATE and random.random() < STUB_ERROR_RATE:
+        raise HTTPException(status_code=500, detail="stub error")
+
+@app.get("/data/2.5/weather")
+async def weather(q: str = None, id: int = None):
+    await simulate_upstream()
+    return make_current(q or f"City{id}", id if id is not None else city_id(q))
+
+@app.get("/data/2.5/group")
+async def group(id: str = Query(...)):
+    await simulate_upstream()
+    ids = [int(i) for i in id.split(",")]
+    if len(ids) > 20:
+        raise HTTPException(status_code=400, detail="too many ids")
+    items = [make_current(f"City{i}", i) for i in ids]
+    return {"cnt": len(items), "list": items}
+
+@app.get("/data/2.5/forecast")
+async def forecast(q: str = None, id: int = None):
+    await simulate_upstream()
+    now = int(time.time()) // 10800 * 10800
+    entries = []
+    for step in range(40):
+        item = make_current(q or f"City{id}", id or 0)
+        entries.append({"dt": now + step * 10800, "main": item["main"], "weather": item["weather"], "wind": item["wind"], "visibility": item["visibility"]})
+    return {"cnt": len(entries), "list": entries, "city": {"name": q, "id": id}}
+
+@app.get("/data/2.5/history/city")
+async def history(q: str = None, id: int = None, start: int = None, end: int = None):
+    await simulate_upstream()
+    end = end or int(time.time())
+    start = start or end - 86400
+    entries = []
+    for ts in range(start // 3600 * 3600, end, 3600):
+        item = make_current(q or f"City{id}", id or 0)
+        entries.append({"dt": ts, "main": item["main"], "weather": item["weather"], "wind": item["wind"], "visibility": item["visibility"]})
+    return {"cnt": len(entries), "list": entries, "city_id": id}
+
+# Run the stub in a background thread and return the base URL once it accepts connections
+def start_stub_server(host: str = "127.0.0.1", port: int = 8765):
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://{host}:{port}", server
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("STUB_PORT", 8765)))
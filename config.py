@@ -5,12 +5,79 @@ load_dotenv()
 
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    DATABASE_READ_URL: str = os.getenv("DATABASE_READ_URL")  # Read replica for read-only endpoints; the primary when unset
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 20))  # Persistent connections per engine and worker
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", os.getenv("DB_POOL_SIZE", 20)))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))  # Extra connections opened under bursts, closed when returned
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 10))  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Replace connections older than this (seconds)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Check connections on checkout (survives failovers)
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))  # asyncpg prepared statements cached per connection; 0 disables
+    SQL_ECHO: bool = os.getenv("SQL_ECHO", "false").lower() == "true"  # Log every SQL statement (development)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" (one object per line) or "text"
     REDIS_URL: str = os.getenv("REDIS_HOST")
-    REDIS_PORT: int = int(os.getenv("REDIS_PORT"))
+    REDIS_PORT: int = int(os.getenv("REDIS_PORT", 6379))
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    LOCAL_CACHE_MAX_BYTES: int = int(os.getenv("LOCAL_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    CACHE_STALE_TTL: int = int(os.getenv("CACHE_STALE_TTL", 300))  # How long an expired entry may still be served while refreshing
     OPENWEATHER_API_KEY: str = os.getenv("OPENWEATHER_API_KEY")
+    OPENWEATHER_BASE_URL: str = os.getenv("OPENWEATHER_BASE_URL", "http://pro.openweathermap.org")
+    OPENWEATHER_HISTORY_URL: str = os.getenv("OPENWEATHER_HISTORY_URL", "http://history.openweathermap.org")
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_MAX_CONCURRENCY: int = int(os.getenv("HTTP_MAX_CONCURRENCY", 50))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", 10))  # Seconds per upstream request
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", 3))
+    HTTP_RETRY_BACKOFF: float = float(os.getenv("HTTP_RETRY_BACKOFF", 0.5))  # Base seconds, doubled per attempt
+    OPENWEATHER_RATE_LIMIT_PER_MINUTE: int = int(os.getenv("OPENWEATHER_RATE_LIMIT_PER_MINUTE", 3000))  # Plan quota; enforced per process, split across live workers only with INGEST_SHARDING_ENABLED
+    RATE_LIMIT_MAX_WAIT: float = float(os.getenv("RATE_LIMIT_MAX_WAIT", 30))  # Longer quota waits are dropped
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_RESET_SECONDS: float = float(os.getenv("CIRCUIT_RESET_SECONDS", 30))
+    LATEST_SNAPSHOT_ENABLED: bool = os.getenv("LATEST_SNAPSHOT_ENABLED", "true").lower() == "true"
+    LATEST_SNAPSHOT_MAX_AGE: int = int(os.getenv("LATEST_SNAPSHOT_MAX_AGE", 30))
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))  # Smaller responses are sent uncompressed
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", 6))
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", 5))
+    LIVE_QUEUE_SIZE: int = int(os.getenv("LIVE_QUEUE_SIZE", 100))  # Pending events per live subscriber before it is dropped
+    LIVE_MAX_SUBSCRIBERS: int = int(os.getenv("LIVE_MAX_SUBSCRIBERS", 10000))  # Per worker
+    LIVE_HEARTBEAT_SECONDS: int = int(os.getenv("LIVE_HEARTBEAT_SECONDS", 15))
+    SERIES_STORE_ENABLED: bool = os.getenv("SERIES_STORE_ENABLED", "true").lower() == "true"
+    SERIES_RETENTION_DAYS: int = int(os.getenv("SERIES_RETENTION_DAYS", 2))  # Recent readings kept in memory per city
+    FORECAST_ISSUE_HOURS: int = int(os.getenv("FORECAST_ISSUE_HOURS", 3))  # Upstream forecast update cycle
+    FORECAST_ISSUE_DELAY_MINUTES: int = int(os.getenv("FORECAST_ISSUE_DELAY_MINUTES", 10))  # Lag before a new run is published
+    HISTORY_CHUNK_DAYS: int = int(os.getenv("HISTORY_CHUNK_DAYS", 7))  # Longest span the history API returns per call
+    HISTORY_REFRESH_MINUTES: int = int(os.getenv("HISTORY_REFRESH_MINUTES", 60))
+    HISTORY_MAX_RANGE_DAYS: int = int(os.getenv("HISTORY_MAX_RANGE_DAYS", 366))
+    HISTORY_BACKFILL_CONCURRENCY: int = int(os.getenv("HISTORY_BACKFILL_CONCURRENCY", 8))
+    ALERT_LOOKBACK_MINUTES: int = int(os.getenv("ALERT_LOOKBACK_MINUTES", 60))  # Readings older than this are ignored by alert rules
+    ALERT_SUPPRESSION_MINUTES: int = int(os.getenv("ALERT_SUPPRESSION_MINUTES", 60))  # Quiet period before a resolved alert may reopen
+    INGEST_INTERVAL_MINUTES: int = int(os.getenv("INGEST_INTERVAL_MINUTES", 5))
+    INGEST_SHARDING_ENABLED: bool = os.getenv("INGEST_SHARDING_ENABLED", "false").lower() == "true"  # Set when running several workers/replicas
+    INGEST_WORKER_TTL_SECONDS: int = int(os.getenv("INGEST_WORKER_TTL_SECONDS", 45))
+    INGEST_HEARTBEAT_SECONDS: int = int(os.getenv("INGEST_HEARTBEAT_SECONDS", 15))
+    INGEST_QUOTA_SHARE: float = float(os.getenv("INGEST_QUOTA_SHARE", 0.5))  # Fraction of the upstream quota scheduled ingestion may use
+    CITY_CATALOG_RELOAD_SECONDS: int = int(os.getenv("CITY_CATALOG_RELOAD_SECONDS", 60))
+    CITY_COLD_REFRESH_MINUTES: int = int(os.getenv("CITY_COLD_REFRESH_MINUTES", 60))
+    CITY_DEMAND_WINDOW_MINUTES: int = int(os.getenv("CITY_DEMAND_WINDOW_MINUTES", 30))  # A city requested within this window is refreshed as hot
+    STARTUP_BUDGET_SECONDS: float = float(os.getenv("STARTUP_BUDGET_SECONDS", 10))  # Warmup is cut short to stay within it
+    STARTUP_WARMUP_CITIES: int = int(os.getenv("STARTUP_WARMUP_CITIES", 100))  # Top cities whose caches are warmed before ready
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"  # False for API-only workers
+    JOB_JITTER_SECONDS: int = int(os.getenv("JOB_JITTER_SECONDS", 10))
+    JOB_MISFIRE_GRACE_SECONDS: int = int(os.getenv("JOB_MISFIRE_GRACE_SECONDS", 300))  # Late runs within this window still execute once
+    WEATHER_RETENTION_DAYS: int = int(os.getenv("WEATHER_RETENTION_DAYS", 365))
+    ROLLUP_RETENTION_DAYS: int = int(os.getenv("ROLLUP_RETENTION_DAYS", 14))  # Hourly/daily rollups kept; above the 7-day summary catch-up
+    WEATHER_PARTITIONS_AHEAD: int = int(os.getenv("WEATHER_PARTITIONS_AHEAD", 2))
     SMTP_SERVER: str = os.getenv("SMTP_SERVER")
-    SMTP_PORT: int = os.getenv("SMTP_PORT")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", 587))
     SMTP_SENDER_EMAIL: str = os.getenv("SMTP_SENDER_EMAIL")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD")
+    SMTP_START_TLS: bool = os.getenv("SMTP_START_TLS", "true").lower() == "true"
+    SMTP_TIMEOUT: float = float(os.getenv("SMTP_TIMEOUT", 30))
+    SMTP_WORKERS: int = int(os.getenv("SMTP_WORKERS", 2))  # Persistent SMTP connections
+    SMTP_BATCH_SIZE: int = int(os.getenv("SMTP_BATCH_SIZE", 50))  # Recipients per envelope
+    SMTP_MAX_RETRIES: int = int(os.getenv("SMTP_MAX_RETRIES", 5))
+    SMTP_RETRY_BACKOFF: float = float(os.getenv("SMTP_RETRY_BACKOFF", 2))  # Seconds, doubled per attempt
+    SMTP_QUEUE_SIZE: int = int(os.getenv("SMTP_QUEUE_SIZE", 10000))
 
 settings = Settings()
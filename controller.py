@@ -1,87 +1,146 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import datetime
-from database import get_db
-from service.alerts import check_alerts, fetch_latest_alert, send_email_alert
-from service.weatherFetch import fetch_weather_data, CITIES, get_weather_data_from_db
-from service.weatherSummary import calculate_daily_summaries
-from service.forecast import fetch_forecast_data
+from datetime import datetime, timedelta, timezone
+from database import ReadSessionLocal, get_db, get_read_db
+from service.alerts import check_alerts, fetch_latest_alert, send_email_alert, subscribe_to_alerts, unsubscribe_from_alerts
+from service.alertState import get_alert_states
+from service.weatherFetch import fetch_weather_data, get_latest_readings
+from service.cityCatalog import city_catalog, record_demand, catalog_stats
+from service.seriesStore import SERIES_FIELDS, epoch_seconds, get_city_series, query_series, series_store
+from service.weatherSummary import get_daily_summary_row
+from service.rollups import get_daily_rollup, get_hourly_rollups
+from service.forecast import FORECAST_FIELDS, fetch_forecast_data, slice_forecast
 from service.historicalData import fetch_historical_weather_data
-from models import DailySummary
+from service.cache import cache_stats, single_flight
+from service.httpClient import UpstreamUnavailable, get_upstream_stats
+from service.jobRunner import job_runner
+from service.latestSnapshot import latest_snapshot
+from service.liveStream import live_hub
+from service.responses import dumps, encoded_response, json_response
+from config import settings
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
 router = APIRouter()
 
-# Get current weather for a single city
+# Naive UTC datetime for a query parameter: aware values are converted, naive ones are taken as UTC
+def as_utc(value: datetime):
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+# Get current weather for a single city, by name or OpenWeatherMap city ID.
+# Requests for catalog cities mark them hot, so ingestion refreshes them every cycle.
 @router.get("/weather/{city}")
 async def get_weather(city: str):
+    catalog_city = city_catalog.lookup(city)
+    if catalog_city is not None:
+        city = catalog_city.name
+        await record_demand(catalog_city)
     try:
         weather_data = await fetch_weather_data(city)
         return weather_data
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # API endpoint to fetch and store weather data
 @router.get("/weather")
-async def get_weather_data(user_pref_celsius: bool = True, db: AsyncSession = Depends(get_db)):
-    all_weather_data = []
-    
-    # Fetch weather data from the database
-    weather_data_records = await get_weather_data_from_db(db, CITIES)
-    
-    for weather_data in weather_data_records:
-        # Assuming you have a method to convert data into the desired format
-        processed_data = {
-            "city": weather_data.city,
-            "main": weather_data.main,
-            "description": weather_data.description,
-            "temp_celsius": weather_data.temp_celsius,
-            "feels_like": weather_data.feels_like,
-            "humidity": weather_data.humidity,
-            "wind_speed": weather_data.wind_speed,
-            "pressure": weather_data.pressure,
-            "visibility": weather_data.visibility,
-            "timestamp": weather_data.timestamp.isoformat()  # Convert to string format if needed
-        }
-        all_weather_data.append(processed_data)
-
-    return {"weather": all_weather_data}
+async def get_weather_data(request: Request, user_pref_celsius: bool = True, db: AsyncSession = Depends(get_read_db)):
+    if not settings.LATEST_SNAPSHOT_ENABLED:
+        return await json_response(request, {"weather": await get_latest_readings(db, city_catalog.names)})
+
+    # Serve the shared snapshot, reloading it (once across concurrent requests) when stale
+    if not latest_snapshot.is_fresh():
+        async def reload_snapshot():
+            latest_snapshot.update({"weather": await get_latest_readings(db, city_catalog.names)})
+        await single_flight("latest_weather_snapshot", reload_snapshot)
+
+    headers = {"ETag": latest_snapshot.etag}
+    if request.headers.get("if-none-match") == latest_snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return await encoded_response(request, latest_snapshot.body, headers, latest_snapshot.encoded)
 
 @router.get("/weather/daily-summary/{city}")
-async def get_daily_summary(city: str, db: AsyncSession = Depends(get_db)):
+async def get_daily_summary(city: str, db: AsyncSession = Depends(get_read_db)):
     today = datetime.utcnow().date()
-    result = await db.execute(
-        select(DailySummary).filter(DailySummary.city == city, DailySummary.date == today)
-    )
-    summary = result.scalars().first()  # Get the first result
 
-    if not summary:
-        # No need to wrap in a new transaction; use the existing one.
-        await calculate_daily_summaries(db)  # Pass the existing session
-        result = await db.execute(
-            select(DailySummary).filter(DailySummary.city == city, DailySummary.date == today)
-        )
-        summary = result.scalars().first()
+    # Running aggregates for the day so far, kept up to date at ingest
+    live_summary = await get_daily_rollup(db, city, today)
+    if live_summary:
+        return live_summary
 
+    # Nothing ingested today for this city (or no such city): nothing to recompute either
+    summary = await get_daily_summary_row(db, city, today)
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"No daily summary for {city} today")
     return summary
 
+# Hour-by-hour aggregates for today
+@router.get("/weather/hourly-summary/{city}")
+async def get_hourly_summary(city: str, db: AsyncSession = Depends(get_read_db)):
+    return {"city": city, "hours": await get_hourly_rollups(db, city, datetime.utcnow().date())}
+
+
+# Recent readings of a catalog city from the in-memory series store, raw (bucket_minutes=0) or downsampled
+# to min/max/avg per bucket; `fields` is a comma-separated subset of the reading columns
+@router.get("/weather/series/{city}")
+async def get_weather_series(request: Request, city: str, hours: int = Query(24, ge=1), bucket_minutes: int = Query(60, ge=0),
+                             fields: str = Query(None), db: AsyncSession = Depends(get_read_db)):
+    catalog_city = city_catalog.lookup(city)
+    if catalog_city is None:
+        raise HTTPException(status_code=404, detail=f"Unknown city {city}")
+    selected = tuple(fields.split(',')) if fields else SERIES_FIELDS
+    unknown = [field for field in selected if field not in SERIES_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}, expected a subset of {list(SERIES_FIELDS)}")
+
+    until = datetime.utcnow()
+    hours = min(hours, settings.SERIES_RETENTION_DAYS * 24)
+    series = await get_city_series(db, catalog_city.name)
+    return await json_response(request, query_series(series, catalog_city.name, until - timedelta(hours=hours), until, bucket_minutes, selected))
 
-# Get historical weather data for a city
+# Hourly history for a city between start and end (default: the last 24 hours), served from the local archive;
+# only days not archived yet are fetched from the history API
 @router.get("/weather/historical/{city}")
-async def get_historical_weather(city: str):
+async def get_historical_weather(request: Request, city: str, start: datetime = Query(None), end: datetime = Query(None), db: AsyncSession = Depends(get_db)):
+    end = as_utc(end) or datetime.utcnow()
+    start = as_utc(start) or end - timedelta(hours=24)
+    if start >= end or end - start > timedelta(days=settings.HISTORY_MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"start must be before end and at most {settings.HISTORY_MAX_RANGE_DAYS} days apart")
+    catalog_city = city_catalog.lookup(city)
+    if catalog_city is not None:
+        city = catalog_city.name
     try:
-        historical_data = await fetch_historical_weather_data(city)
-        return historical_data
+        historical_data = await fetch_historical_weather_data(db, city, start, end)
+        return await json_response(request, historical_data)
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Get weather forecast for a city
+# 3-hourly forecast for a city, optionally limited to [start, end) and a comma-separated subset of fields
 @router.get("/weather/forecast/{city}")
-async def get_weather_forecast(city: str):
+async def get_weather_forecast(request: Request, city: str, start: datetime = Query(None), end: datetime = Query(None), fields: str = Query(None)):
+    selected = tuple(fields.split(',')) if fields else FORECAST_FIELDS
+    unknown = [field for field in selected if field not in FORECAST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}, expected a subset of {list(FORECAST_FIELDS)}")
+    catalog_city = city_catalog.lookup(city)
+    if catalog_city is not None:
+        city = catalog_city.name
     try:
         forecast_data = await fetch_forecast_data(city)
-        return forecast_data
+        return await json_response(request, slice_forecast(
+            forecast_data,
+            epoch_seconds(as_utc(start)) if start else None,
+            epoch_seconds(as_utc(end)) if end else None,
+            selected,
+        ))
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -97,7 +156,7 @@ async def check_weather_alerts(background_tasks: BackgroundTasks, db: AsyncSessi
 
 # Fetch the latest alert signal of specified city
 @router.get("/weather/latest-alert/{city}")
-async def get_latest_alert(city: str, db: AsyncSession = Depends(get_db)):
+async def get_latest_alert(city: str, db: AsyncSession = Depends(get_read_db)):
     try:
         # Fetch the latest alert for the specified city
         latest_alert = await fetch_latest_alert(db, city)
@@ -107,6 +166,11 @@ async def get_latest_alert(city: str, db: AsyncSession = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Current open/ongoing/resolved state of each alert type for a city
+@router.get("/weather/alert-states/{city}")
+async def get_city_alert_states(city: str):
+    return {"city": city, "states": await get_alert_states(city)}
+
 # Mail sending query
 @router.post("/weather/send-alert-email")
 async def send_alert_email(city: str = Query(...), email: str = Query(...), db: AsyncSession = Depends(get_db)):
@@ -116,4 +180,139 @@ async def send_alert_email(city: str = Query(...), email: str = Query(...), db:
             raise HTTPException(status_code=500, detail=result["error"])
         return {"message": result["message"]}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Subscribe an email address to alert notifications for a city
+@router.post("/weather/subscriptions")
+async def create_subscription(city: str = Query(...), email: str = Query(...), db: AsyncSession = Depends(get_db)):
+    return await subscribe_to_alerts(city, email, db)
+
+@router.delete("/weather/subscriptions")
+async def delete_subscription(city: str = Query(...), email: str = Query(...), db: AsyncSession = Depends(get_db)):
+    return await unsubscribe_from_alerts(city, email, db)
+
+# In-process cache hit/miss/eviction counters per key prefix
+@router.get("/cache/stats")
+async def get_cache_stats():
+    return cache_stats()
+
+# Upstream request/retry/drop counters, circuit state and the current adaptive rate
+@router.get("/upstream/stats")
+async def get_upstream_metrics():
+    return get_upstream_stats()
+
+# Catalog names for a list of city names/IDs; unknown ones are dropped
+def resolve_cities(cities: list):
+    resolved = (city_catalog.lookup(str(city)) for city in cities)
+    return {catalog_city.name for catalog_city in resolved if catalog_city is not None}
+
+# Full readings for a new live subscriber (all cities when None). Cities this worker hasn't had an event
+# for yet are loaded from latest_weather, with a short-lived session rather than one held for the stream.
+async def live_snapshot(cities: set = None):
+    missing = live_hub.unseeded(set(city_catalog.names) if cities is None else cities)
+    if missing:
+        async with ReadSessionLocal() as db:
+            live_hub.seed(await get_latest_readings(db, list(missing)))
+    return live_hub.snapshot(cities)
+
+async def sse_events(subscriber, snapshot: list):
+    yield f"event: snapshot\ndata: {dumps(snapshot).decode()}\n\n"
+    while True:
+        try:
+            frame = await asyncio.wait_for(subscriber.queue.get(), settings.LIVE_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            yield ": ping\n\n"  # Keeps proxies from closing an idle stream
+            continue
+        if frame is None:
+            return
+        yield f"event: {frame[0]}\ndata: {frame[1]}\n\n"
+
+# SSE response that releases its subscriber however it ends, including a client gone before the body started
+# (a generator that never started doesn't run its finally)
+class LiveStreamResponse(StreamingResponse):
+    def __init__(self, subscriber, snapshot: list):
+        super().__init__(sse_events(subscriber, snapshot), media_type="text/event-stream",
+                         headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        self.subscriber = subscriber
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            live_hub.unsubscribe(self.subscriber)
+
+# Server-Sent Events stream of reading deltas and new alerts for a comma-separated list of cities
+# (names or IDs; all cities when omitted), starting with a snapshot of their current readings.
+# Without a city filter, events arrive as 'batch' events holding a list of reading/alert events.
+@router.get("/stream/weather")
+async def stream_weather(cities: str = Query(None)):
+    selected = resolve_cities(cities.split(',')) if cities else None
+    if selected is not None and not selected:
+        raise HTTPException(status_code=400, detail="No known cities to subscribe to")
+    try:
+        subscriber = live_hub.subscribe(selected)
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    # Subscribed before the snapshot so no delta falls in between; released again if the snapshot fails
+    try:
+        snapshot = await live_snapshot(selected)
+    except Exception:
+        live_hub.unsubscribe(subscriber)
+        raise
+    return LiveStreamResponse(subscriber, snapshot)
+
+# WebSocket variant with a changing subscription: the client sends {"subscribe": [...]} / {"unsubscribe": [...]}
+# and gets a snapshot for newly added cities, then their reading deltas and alerts
+@router.websocket("/stream/ws")
+async def stream_weather_ws(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        subscriber = live_hub.subscribe(set())
+    except OverflowError as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            added = resolve_cities(message.get('subscribe', []))
+            live_hub.update_subscription(subscriber, added, resolve_cities(message.get('unsubscribe', [])))
+            if added:
+                await websocket.send_text(dumps({'type': 'snapshot', 'readings': await live_snapshot(added)}).decode())
+
+    async def send():
+        while True:
+            frame = await subscriber.queue.get()
+            if frame is None:
+                await websocket.close()
+                return
+            await websocket.send_text(frame[1])
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        live_hub.unsubscribe(subscriber)
+
+# Connected live subscribers and events delivered by this worker
+@router.get("/stream/stats")
+async def get_stream_stats():
+    return {**live_hub.stats, 'cities_followed': len(live_hub.by_city)}
+
+# Cities, readings and memory held by the in-memory series store
+@router.get("/series/stats")
+async def get_series_stats():
+    return series_store.stats()
+
+# Catalog size and the last ingest cycle's due/selected/deferred city counts
+@router.get("/cities/stats")
+async def get_city_stats():
+    return catalog_stats()
+
+# Per-job run counts, durations, skipped overlaps and missed runs
+@router.get("/scheduler/jobs")
+async def get_scheduler_jobs():
+    return job_runner.job_stats()
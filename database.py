@@ -1,16 +1,64 @@
+from sqlalchemy import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
+from service.metrics import instrument_engine
 
-# Create the async engine
-engine = create_async_engine(settings.DATABASE_URL, pool_size=20, echo=True)
+# Async engines, created on first use (first session, or `database.engine`), so importing this module
+# needs neither DATABASE_URL nor the database driver. The app disposes them on shutdown.
+# 'write' is the primary (DATABASE_URL); 'read' is the replica (DATABASE_READ_URL) used by read-only
+# endpoints and bulk reads, with its own pool so ingestion bursts on the primary don't starve them.
+# Without DATABASE_READ_URL reads go to the primary engine.
+_engines = {}
+_sessionmaker = sessionmaker(class_=AsyncSession, expire_on_commit=False)
 
-# Create the async session
-SessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+def _create_engine(url: str, pool_size: int):
+    connect_args = {}
+    if make_url(url).get_driver_name() == 'asyncpg':
+        # Statements prepared once per connection and reused (SQLAlchemy's asyncpg adapter, default 100)
+        connect_args['prepared_statement_cache_size'] = settings.DB_STATEMENT_CACHE_SIZE
+    # SQL statements are logged through the app's logging (SQL_ECHO), not echo=True
+    return create_async_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+def get_engine(role: str = 'write'):
+    if role == 'read' and not settings.DATABASE_READ_URL:
+        role = 'write'
+    engine = _engines.get(role)
+    if engine is None:
+        if role == 'read':
+            engine = _create_engine(settings.DATABASE_READ_URL, settings.DB_READ_POOL_SIZE)
+        else:
+            engine = _create_engine(settings.DATABASE_URL, settings.DB_POOL_SIZE)
+        instrument_engine(engine, role)
+        _engines[role] = engine
+    return engine
+
+async def dispose_engines():
+    for engine in list(_engines.values()):
+        await engine.dispose()
+    _engines.clear()
+
+# `from database import engine` keeps working, and creates the primary engine at that point
+def __getattr__(name):
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Create an async session bound to the primary
+def SessionLocal() -> AsyncSession:
+    return _sessionmaker(bind=get_engine())
+
+# Create an async session bound to the read replica, for reads that tolerate replication lag
+def ReadSessionLocal() -> AsyncSession:
+    return _sessionmaker(bind=get_engine('read'))
 
 Base = declarative_base()
 
@@ -18,3 +66,25 @@ Base = declarative_base()
 async def get_db() -> AsyncSession:
     async with SessionLocal() as session:
         yield session  # This line yields the session, which is compatible with AsyncSession
+
+# Dependency for read-only endpoints: a session on the read replica
+async def get_read_db() -> AsyncSession:
+    async with ReadSessionLocal() as session:
+        yield session
+
+# Postgres drivers cap a statement at 32767 bind parameters, so city IN (...) filters over the whole
+# catalog are run in chunks of this many names
+IN_LIST_CHUNK_SIZE = 10000
+
+def in_chunks(items, size: int = IN_LIST_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# Dialect-specific INSERT with ON CONFLICT support (Postgres in production, SQLite for local benchmarks)
+def upsert_insert(db: AsyncSession, model):
+    if db.bind.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
@@ -1,44 +1,150 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.background import BackgroundScheduler
+from config import settings
+from database import dispose_engines
+from service.logConfig import setup_logging
 from service.weatherFetch import scheduled_fetch_weather
 from service.weatherSummary import schedule_daily_summaries
+from service.partitions import maintain_weather_partitions
+from service.rollups import purge_expired_rollups
+from service.httpClient import init_http_client, close_http_client
+from service.cache import close_redis
+from service.emailDispatcher import email_dispatcher
+from service.liveStream import live_hub
+from service.responses import ORJSONResponse
+from service.metrics import STARTUP_SECONDS, MetricsMiddleware, metrics_response
+from service.warmup import warm_caches
+from service.jobRunner import job_runner
+from service.ingestSharding import heartbeat, leader_only
+from service.cityCatalog import reload_city_catalog
+from service.seriesStore import warm_series_store
 from controller import router as weather_router
 
+logger = logging.getLogger(__name__)
 
-app = FastAPI(
-    title="Weather Monitoring System",
-    description="Real-time weather monitoring API using FastAPI and PostgreSQL",
-    version="1.0.0"
-)
+# Background jobs, run on the app's event loop by the job runner
+def setup_weather_scheduled_jobs():
+    # Fetch weather data every 5 minutes, starting right away to catch up after a restart
+    job_runner.add_job(scheduled_fetch_weather, 'interval', minutes=settings.INGEST_INTERVAL_MINUTES,
+                       jitter=settings.JOB_JITTER_SECONDS, run_on_start=True)
+    # Singleton jobs: in sharded mode only the leader worker runs them.
+    # Day close (UTC), also run on start; each run finalizes any recent day closed while no worker was running
+    job_runner.add_job(leader_only(schedule_daily_summaries), 'cron', hour=0, minute=5, run_on_start=True)
+    job_runner.add_job(leader_only(maintain_weather_partitions), 'interval', hours=24, jitter=settings.JOB_JITTER_SECONDS)
+    job_runner.add_job(leader_only(purge_expired_rollups), 'cron', hour=1, minute=0)
+    # Load recent readings into the in-memory series store once, in the background after startup
+    if settings.SERIES_STORE_ENABLED:
+        job_runner.add_job(warm_series_store, 'date')
+    # Pick up city catalog changes without a restart
+    job_runner.add_job(reload_city_catalog, 'interval', seconds=settings.CITY_CATALOG_RELOAD_SECONDS)
+    if settings.INGEST_SHARDING_ENABLED:
+        job_runner.add_job(heartbeat, 'interval', seconds=settings.INGEST_HEARTBEAT_SECONDS, run_on_start=True)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins (for development, limit in production)
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Seconds spent in each startup phase of this worker, plus the total
+startup_stats = {}
 
-scheduler = BackgroundScheduler()
+# Application lifespan: open shared resources, warm caches, and release everything on shutdown.
+# The worker only reports ready once this yields, so every startup phase runs within what is left of
+# STARTUP_BUDGET_SECONDS. A phase that runs out of time or fails is logged and skipped: the scheduled
+# jobs retry partitions and the city catalog, and caches fill on demand.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
 
-# Background job to fetch weather data every 5 minutes
-def setup_weather_scheduled_jobs():
-    scheduler.add_job(scheduled_fetch_weather, 'interval', minutes=5)
-    scheduler.add_job(schedule_daily_summaries, 'interval', hours=24)
-    scheduler.start()
+    async def phase(name, step):
+        start = time.perf_counter()
+        await step()
+        startup_stats[name] = round(time.perf_counter() - start, 3)
+
+    async def bounded_phase(name, step):
+        remaining = settings.STARTUP_BUDGET_SECONDS - (time.perf_counter() - started)
+        try:
+            await asyncio.wait_for(phase(name, step), timeout=max(remaining, 0.001))
+        except asyncio.TimeoutError:
+            logger.warning(f"Startup phase {name} cut short after {max(remaining, 0):.1f}s (STARTUP_BUDGET_SECONDS)")
+        except Exception as e:
+            logger.error(f"Startup phase {name} failed: {e}")
+
+    async def start_background_tasks():
+        email_dispatcher.start()
+        live_hub.start()
+        if settings.SCHEDULER_ENABLED:
+            job_runner.start()
 
-app.include_router(weather_router, prefix="/api")
+    await phase('http_client', init_http_client)
+    await bounded_phase('partitions', lambda: maintain_weather_partitions(drop_expired=False))
+    await bounded_phase('city_catalog', reload_city_catalog)
+    await bounded_phase('warmup', warm_caches)
+    await phase('background_tasks', start_background_tasks)
 
-# Application startup event to initiate background tasks
-@app.on_event("startup")
-def startup_event():
+    startup_stats['total'] = round(time.perf_counter() - started, 3)
+    for name, seconds in startup_stats.items():
+        STARTUP_SECONDS.labels(name).set(seconds)
+    log = logger.warning if startup_stats['total'] > settings.STARTUP_BUDGET_SECONDS else logger.info
+    log(f"Startup took {startup_stats['total']:.2f}s (budget {settings.STARTUP_BUDGET_SECONDS}s)", extra={'phases': startup_stats})
+    yield
+    job_runner.shutdown()
+    await live_hub.stop()
+    await email_dispatcher.stop()
+    await close_http_client()
+    await close_redis()
+    await dispose_engines()
+
+# App factory: `uvicorn main:create_app --factory`, or `uvicorn main:app`. Building the app registers jobs and
+# routes only; the engine, Redis pool, HTTP client and scheduler are opened by the lifespan or on first use.
+def create_app():
+    setup_logging()
     setup_weather_scheduled_jobs()
 
-@app.on_event("shutdown")
-def shutdown_event():
-    scheduler.shutdown()
+    app = FastAPI(
+        title="Weather Monitoring System",
+        description="Real-time weather monitoring API using FastAPI and PostgreSQL",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins (for development, limit in production)
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Per-route latency histograms, labelled by route template
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(weather_router, prefix="/api")
+
+    # Prometheus scrape endpoint for this worker
+    @app.get("/metrics")
+    def metrics():
+        body, content_type = metrics_response()
+        return Response(content=body, media_type=content_type)
+
+    # Time spent in each startup phase
+    @app.get("/startup/stats")
+    def get_startup_stats():
+        return {**startup_stats, 'budget': settings.STARTUP_BUDGET_SECONDS}
+
+    @app.get("/")
+    def root():
+        return {"message": "Weather Monitoring API is running!"}
+
+    return app
+
+# `main.app` is built on first access, so importing this module has no side effects
+_app = None
 
-@app.get("/")
-def root():
-    return {"message": "Weather Monitoring API is running!"}
+def __getattr__(name):
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
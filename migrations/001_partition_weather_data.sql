@@ -0,0 +1,65 @@
+-- Convert weather_data into a table range-partitioned by month on timestamp,
+-- with a composite (city, timestamp DESC) index serving the latest-reading,
+-- alert and daily-summary queries.
+--
+-- Run once against Postgres 12+:  psql "$DATABASE_URL" -f migrations/001_partition_weather_data.sql
+-- Afterwards service/partitions.py creates upcoming partitions and drops expired ones.
+
+BEGIN;
+
+ALTER TABLE weather_data RENAME TO weather_data_legacy;
+ALTER TABLE weather_data_legacy RENAME CONSTRAINT weather_data_pkey TO weather_data_legacy_pkey;
+ALTER INDEX IF EXISTS ix_weather_data_city RENAME TO ix_weather_data_legacy_city;
+ALTER INDEX IF EXISTS ix_weather_data_id RENAME TO ix_weather_data_legacy_id;
+ALTER INDEX IF EXISTS ix_weather_data_city_timestamp RENAME TO ix_weather_data_legacy_city_timestamp;
+
+-- Reuse the existing id sequence so ids keep increasing across the conversion
+CREATE TABLE weather_data (
+    id INTEGER NOT NULL DEFAULT nextval('weather_data_id_seq'),
+    city VARCHAR,
+    main VARCHAR,
+    description VARCHAR,
+    temp_celsius FLOAT,
+    feels_like FLOAT,
+    humidity INTEGER,
+    wind_speed FLOAT,
+    pressure INTEGER,
+    visibility INTEGER,
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE INDEX ix_weather_data_city_timestamp ON weather_data (city, timestamp DESC);
+
+-- One partition per month from the oldest existing reading up to two months ahead
+DO $$
+DECLARE
+    month_start DATE := date_trunc('month', COALESCE((SELECT min(timestamp) FROM weather_data_legacy), now()));
+    last_month DATE := date_trunc('month', now() + interval '2 months');
+BEGIN
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF weather_data FOR VALUES FROM (%L) TO (%L)',
+            'weather_data_p' || to_char(month_start, 'YYYY_MM'),
+            month_start,
+            month_start + interval '1 month'
+        );
+        month_start := month_start + interval '1 month';
+    END LOOP;
+END $$;
+
+INSERT INTO weather_data (id, city, main, description, temp_celsius, feels_like, humidity,
+                          wind_speed, pressure, visibility, timestamp)
+SELECT id, city, main, description, temp_celsius, feels_like, humidity,
+       wind_speed, pressure, visibility, timestamp
+FROM weather_data_legacy
+WHERE timestamp IS NOT NULL;
+
+ALTER SEQUENCE weather_data_id_seq OWNED BY weather_data.id;
+SELECT setval('weather_data_id_seq', COALESCE((SELECT max(id) FROM weather_data), 0) + 1, false);
+
+DROP TABLE weather_data_legacy;
+
+COMMIT;
+
+ANALYZE weather_data;
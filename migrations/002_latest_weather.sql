@@ -0,0 +1,31 @@
+-- Latest reading per city, maintained by the ingestion path (service/weatherFetch.py::upsert_latest_weather)
+-- so GET /api/weather no longer scans weather_data history.
+--
+-- psql "$DATABASE_URL" -f migrations/002_latest_weather.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS latest_weather (
+    city VARCHAR PRIMARY KEY,
+    main VARCHAR,
+    description VARCHAR,
+    temp_celsius FLOAT,
+    feels_like FLOAT,
+    humidity INTEGER,
+    wind_speed FLOAT,
+    pressure INTEGER,
+    visibility INTEGER,
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL
+);
+
+-- Backfill from existing history; the (city, timestamp DESC) index serves DISTINCT ON
+INSERT INTO latest_weather (city, main, description, temp_celsius, feels_like, humidity,
+                            wind_speed, pressure, visibility, timestamp)
+SELECT DISTINCT ON (city) city, main, description, temp_celsius, feels_like, humidity,
+       wind_speed, pressure, visibility, timestamp
+FROM weather_data
+WHERE city IS NOT NULL
+ORDER BY city, timestamp DESC
+ON CONFLICT (city) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- One daily_summary row per (city, date), so calculate_daily_summaries can upsert idempotently.
+--
+-- psql "$DATABASE_URL" -f migrations/003_daily_summary_unique.sql
+
+BEGIN;
+
+-- Earlier runs inserted a new row each time; keep the most recent one per (city, date)
+DELETE FROM daily_summary older
+USING daily_summary newer
+WHERE older.city = newer.city
+  AND older.date = newer.date
+  AND older.id < newer.id;
+
+ALTER TABLE daily_summary ADD CONSTRAINT uq_daily_summary_city_date UNIQUE (city, date);
+
+COMMIT;
@@ -0,0 +1,27 @@
+-- Running hourly/daily aggregates maintained at ingest (service/rollups.py::apply_rollups).
+--
+-- psql "$DATABASE_URL" -f migrations/004_weather_rollups.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS weather_rollup (
+    city VARCHAR NOT NULL,
+    granularity VARCHAR NOT NULL,
+    period_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    readings INTEGER NOT NULL,
+    temp_sum FLOAT NOT NULL,
+    temp_min FLOAT NOT NULL,
+    temp_max FLOAT NOT NULL,
+    PRIMARY KEY (city, granularity, period_start)
+);
+
+CREATE TABLE IF NOT EXISTS weather_rollup_condition (
+    city VARCHAR NOT NULL,
+    granularity VARCHAR NOT NULL,
+    period_start TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    main VARCHAR NOT NULL,
+    readings INTEGER NOT NULL,
+    PRIMARY KEY (city, granularity, period_start, main)
+);
+
+COMMIT;
@@ -0,0 +1,5 @@
+-- Serves fetch_latest_alert (WHERE city = ? ORDER BY timestamp DESC LIMIT 1) without scanning the alert table.
+--
+-- psql "$DATABASE_URL" -f migrations/005_alert_city_timestamp_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alert_city_timestamp ON alert (city, timestamp DESC);
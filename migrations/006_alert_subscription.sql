@@ -0,0 +1,17 @@
+-- Email subscribers per city, notified by service/alerts.py::notify_subscribers when an alert opens.
+--
+-- psql "$DATABASE_URL" -f migrations/006_alert_subscription.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS alert_subscription (
+    id SERIAL PRIMARY KEY,
+    city VARCHAR NOT NULL,
+    email VARCHAR NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    CONSTRAINT uq_alert_subscription_city_email UNIQUE (city, email)
+);
+
+CREATE INDEX IF NOT EXISTS ix_alert_subscription_city ON alert_subscription (city);
+
+COMMIT;
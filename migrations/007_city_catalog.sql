@@ -0,0 +1,28 @@
+-- City catalog loaded by service/cityCatalog.py, replacing the hardcoded CITIES list.
+-- Seeded with the original six cities as hot; bulk-load more with
+--   python -m service.cityCatalog city.list.json
+--
+-- psql "$DATABASE_URL" -f migrations/007_city_catalog.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS city (
+    id INTEGER PRIMARY KEY,  -- OpenWeatherMap city ID
+    name VARCHAR NOT NULL UNIQUE,
+    country VARCHAR,
+    lat DOUBLE PRECISION,
+    lon DOUBLE PRECISION,
+    tier VARCHAR NOT NULL DEFAULT 'cold',
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+);
+
+INSERT INTO city (id, name, country, lat, lon, tier) VALUES
+    (1273294, 'Delhi', 'IN', 28.6667, 77.2167, 'hot'),
+    (1275339, 'Mumbai', 'IN', 19.0144, 72.8479, 'hot'),
+    (1264527, 'Chennai', 'IN', 13.0878, 80.2785, 'hot'),
+    (1277333, 'Bengaluru', 'IN', 12.9762, 77.6033, 'hot'),
+    (1275004, 'Kolkata', 'IN', 22.5697, 88.3697, 'hot'),
+    (1269843, 'Hyderabad', 'IN', 17.3840, 78.4564, 'hot')
+ON CONFLICT (id) DO NOTHING;
+
+COMMIT;
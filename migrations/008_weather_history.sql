@@ -0,0 +1,29 @@
+-- Local archive of the OpenWeatherMap history API, filled by service/historicalData.py.
+-- Bulk backfill: python -m service.historicalData --days 90
+--
+-- psql "$DATABASE_URL" -f migrations/008_weather_history.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS weather_history (
+    city VARCHAR NOT NULL,
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    main VARCHAR,
+    description VARCHAR,
+    temp_celsius FLOAT,
+    feels_like FLOAT,
+    humidity INTEGER,
+    wind_speed FLOAT,
+    pressure INTEGER,
+    visibility INTEGER,
+    PRIMARY KEY (city, timestamp)
+);
+
+CREATE TABLE IF NOT EXISTS weather_history_coverage (
+    city VARCHAR NOT NULL,
+    day DATE NOT NULL,
+    fetched_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (city, day)
+);
+
+COMMIT;
@@ -1,13 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime
 
 Base = declarative_base()
 
+# In Postgres this table is range-partitioned by month on timestamp with primary key (id, timestamp);
+# see migrations/001_partition_weather_data.sql and service/partitions.py
 class WeatherData(Base):
     __tablename__ = 'weather_data'
+    __table_args__ = (
+        Index('ix_weather_data_city_timestamp', 'city', 'timestamp', postgresql_ops={'timestamp': 'DESC'}),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    city = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    city = Column(String)  # Covered by the (city, timestamp DESC) index
     main = Column(String)  # Main weather condition (e.g., "Haze")
     description = Column(String)  # Detailed description (e.g., "haze")
     temp_celsius = Column(Float)  # Temperature in Celsius
@@ -16,10 +22,28 @@ class WeatherData(Base):
     wind_speed = Column(Float)  # Wind speed
     pressure = Column(Integer)  # Atmospheric pressure
     visibility = Column(Integer)  # Visibility in meters
-    timestamp = Column(DateTime)
+    timestamp = Column(DateTime, nullable=False)
+
+# Latest reading per city, upserted at ingest so reads don't scan weather_data history
+class LatestWeather(Base):
+    __tablename__ = 'latest_weather'
+
+    city = Column(String, primary_key=True)
+    main = Column(String)
+    description = Column(String)
+    temp_celsius = Column(Float)
+    feels_like = Column(Float)
+    humidity = Column(Integer)
+    wind_speed = Column(Float)
+    pressure = Column(Integer)
+    visibility = Column(Integer)
+    timestamp = Column(DateTime, nullable=False)
 
 class DailySummary(Base):
     __tablename__ = 'daily_summary'
+    __table_args__ = (
+        UniqueConstraint('city', 'date', name='uq_daily_summary_city_date'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     city = Column(String, index=True)
@@ -29,11 +53,87 @@ class DailySummary(Base):
     min_temp = Column(Float)
     dominant_condition = Column(String)
 
+# Running aggregates per (city, hour) and (city, day), updated as each reading is ingested
+class WeatherRollup(Base):
+    __tablename__ = 'weather_rollup'
+
+    city = Column(String, primary_key=True)
+    granularity = Column(String, primary_key=True)  # "hour" or "day"
+    period_start = Column(DateTime, primary_key=True)
+    readings = Column(Integer, nullable=False)
+    temp_sum = Column(Float, nullable=False)
+    temp_min = Column(Float, nullable=False)
+    temp_max = Column(Float, nullable=False)
+
+# Per-condition reading counts for each rollup period, used to find the dominant condition
+class WeatherRollupCondition(Base):
+    __tablename__ = 'weather_rollup_condition'
+
+    city = Column(String, primary_key=True)
+    granularity = Column(String, primary_key=True)
+    period_start = Column(DateTime, primary_key=True)
+    main = Column(String, primary_key=True)
+    readings = Column(Integer, nullable=False)
+
 class Alert(Base):
     __tablename__ = 'alert'
+    __table_args__ = (
+        Index('ix_alert_city_timestamp', 'city', 'timestamp', postgresql_ops={'timestamp': 'DESC'}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     city = Column(String)
     alert_type = Column(String)
     alert_message = Column(String)
     timestamp = Column(DateTime)
+
+# Email subscribers notified whenever a new alert opens for their city
+class AlertSubscription(Base):
+    __tablename__ = 'alert_subscription'
+    __table_args__ = (
+        UniqueConstraint('city', 'email', name='uq_alert_subscription_city_email'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    city = Column(String, nullable=False, index=True)
+    email = Column(String, nullable=False)
+    created_at = Column(DateTime)
+
+# Hourly readings from the OpenWeatherMap history API. History never changes, so it is fetched once and
+# served from here; see service/historicalData.py
+class WeatherHistory(Base):
+    __tablename__ = 'weather_history'
+
+    city = Column(String, primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    main = Column(String)
+    description = Column(String)
+    temp_celsius = Column(Float)
+    feels_like = Column(Float)
+    humidity = Column(Integer)
+    wind_speed = Column(Float)
+    pressure = Column(Integer)
+    visibility = Column(Integer)
+
+# Which (city, day) history has been fetched and when; a day fetched after it ended is complete,
+# the current day is refetched once its fetch is older than HISTORY_REFRESH_MINUTES
+class WeatherHistoryCoverage(Base):
+    __tablename__ = 'weather_history_coverage'
+
+    city = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    fetched_at = Column(DateTime, nullable=False)
+
+# Cities tracked by ingestion, keyed by OpenWeatherMap city ID. `name` is the key readings are stored under,
+# so it must be unique (disambiguate duplicates, e.g. "Hyderabad, PK"). Bump updated_at on every change so
+# running workers pick it up (service/cityCatalog.py::reload_city_catalog).
+class City(Base):
+    __tablename__ = 'city'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False, unique=True)
+    country = Column(String)
+    lat = Column(Float)
+    lon = Column(Float)
+    tier = Column(String, nullable=False, default='cold')  # "hot": refreshed every ingest cycle, "cold": every CITY_COLD_REFRESH_MINUTES
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
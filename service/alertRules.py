@@ -0,0 +1,92 @@
+import operator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models import WeatherData
+from config import settings
+from database import in_chunks
+from service.lazyImport import lazy_import
+
+np = lazy_import('numpy')  # Loaded on the first alert check
+
+# Reading columns the rules can test, in the order of the last axis of the readings array
+RULE_FIELDS = ('temp_celsius', 'humidity', 'wind_speed', 'pressure', 'visibility')
+
+# Applied to NumPy arrays, these are the elementwise ufuncs (np.greater, ...)
+COMPARATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+# A declarative threshold: fires when `field <comparator> value` holds for the `window` most recent readings
+@dataclass(frozen=True)
+class AlertRule:
+    alert_type: str
+    field: str
+    comparator: str
+    value: float
+    window: int = 1
+    message: str = ''
+
+# The built-in rule set, parameterised by the thresholds exposed on POST /api/weather/check-alerts
+def default_rules(temp_threshold=35.0, humidity_threshold=80, pressure_threshold_min=1000, pressure_threshold_max=1030, wind_threshold=15, visibility_threshold=1000):
+    return [
+        AlertRule("High Temperature", 'temp_celsius', '>', temp_threshold, 2, f"Temperature exceeded {temp_threshold}°C"),
+        AlertRule("Very Cold", 'temp_celsius', '<', 0.0, 1, "Temperature dropped below freezing"),
+        AlertRule("High Humidity", 'humidity', '>', humidity_threshold, 1, f"Humidity exceeded {humidity_threshold}%"),
+        AlertRule("Very Strong Winds", 'wind_speed', '>', wind_threshold, 1, f"Wind Speed exceeded {wind_threshold}%"),
+        AlertRule("Very High Pressure", 'pressure', '>', pressure_threshold_max, 1, f"Pressure exceeded {pressure_threshold_max}%"),
+        AlertRule("Very Low Pressure", 'pressure', '<', pressure_threshold_min, 1, f"Pressure below {pressure_threshold_min}%"),
+        AlertRule("Very Low Visibility", 'visibility', '<', visibility_threshold, 1, f"Visibility below {visibility_threshold}%"),
+    ]
+
+# Fetch the last `depth` readings of every city with one windowed query (per IN_LIST_CHUNK_SIZE cities).
+# Returns (cities, readings) where readings[c, k, f] is field f of city c's k-th most recent reading (NaN if absent).
+async def fetch_recent_readings(db: AsyncSession, cities: list, depth: int):
+    columns = [getattr(WeatherData, field) for field in RULE_FIELDS]
+    since = datetime.utcnow() - timedelta(minutes=settings.ALERT_LOOKBACK_MINUTES)
+    rows = []
+    for names in in_chunks(cities):
+        ranked = (
+            select(
+                WeatherData.city,
+                *columns,
+                func.row_number().over(partition_by=WeatherData.city, order_by=WeatherData.timestamp.desc()).label('recency'),
+            )
+            .filter(WeatherData.city.in_(names), WeatherData.timestamp >= since)
+            .subquery()
+        )
+        result = await db.execute(select(ranked).filter(ranked.c.recency <= depth))
+        rows.extend(result.all())
+
+    readings = np.full((len(cities), depth, len(RULE_FIELDS)), np.nan)
+    if rows:
+        city_index = {city: i for i, city in enumerate(cities)}
+        city_positions = np.fromiter((city_index[row[0]] for row in rows), dtype=np.intp, count=len(rows))
+        recency = np.fromiter((row[-1] - 1 for row in rows), dtype=np.intp, count=len(rows))
+        readings[city_positions, recency] = np.array([row[1:-1] for row in rows], dtype=float)
+    return cities, readings
+
+# Evaluate every rule against every city at once; returns (city, rule) pairs that fired
+def evaluate_rules(rules: list, cities: list, readings):
+    triggered = []
+    for rule in rules:
+        values = readings[:, :rule.window, RULE_FIELDS.index(rule.field)]
+        # NaN (missing reading) compares False, so a city needs `window` readings to fire
+        matched = COMPARATORS[rule.comparator](values, rule.value).all(axis=1)
+        triggered.extend((cities[i], rule) for i in np.flatnonzero(matched))
+    return triggered
+
+# (city, rule) pairs with all `window` readings present: only these may change an alert's state, so a city
+# whose readings stopped (ingestion stall, cold-tier gap) keeps its alerts as they are instead of resolving them
+def evaluated_rules(rules: list, cities: list, readings):
+    evaluated = []
+    for rule in rules:
+        values = readings[:, :rule.window, RULE_FIELDS.index(rule.field)]
+        complete = ~np.isnan(values).any(axis=1)
+        evaluated.extend((cities[i], rule) for i in np.flatnonzero(complete))
+    return evaluated
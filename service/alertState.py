@@ -0,0 +1,115 @@
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from config import settings
+from service.cache import get_redis
+
+# Alert lifecycle per (city, alert_type), shared by all workers through Redis:
+#   open     -> first trigger, persisted as an Alert row
+#   ongoing  -> still triggering, not persisted again
+#   resolved -> stopped triggering; re-triggering within the suppression window goes back to
+#               ongoing silently, after it a new open (and Alert row) starts
+# States are kept in one hash per city (field: alert type), plus a set of the cities that have any,
+# so a per-city read is one small HGETALL and an evaluation round only reads the cities it can change.
+ALERT_STATE_PREFIX = 'alert_state:'
+ALERT_STATE_CITIES = 'alert_state_cities'
+ALERT_STATE_LOCK = 'alert_state_lock'
+LEGACY_ALERT_STATE_KEY = 'alert_state'  # Single hash of "city|alert_type" fields used before
+
+def state_key(city: str):
+    return f"{ALERT_STATE_PREFIX}{city}"
+
+def state_field(city: str, alert_type: str):
+    return f"{city}|{alert_type}"
+
+# Move states from the single legacy hash into the per-city hashes (once, under the state lock)
+async def migrate_legacy_states(redis):
+    legacy = await redis.hgetall(LEGACY_ALERT_STATE_KEY)
+    if not legacy:
+        return
+    by_city = defaultdict(dict)
+    for field, value in legacy.items():
+        city, alert_type = field.split('|', 1)
+        by_city[city][alert_type] = value
+    async with redis.pipeline(transaction=True) as pipe:
+        for city, fields in by_city.items():
+            pipe.hset(state_key(city), mapping=fields)
+        pipe.sadd(ALERT_STATE_CITIES, *by_city)
+        pipe.delete(LEGACY_ALERT_STATE_KEY)
+        await pipe.execute()
+
+# Stored states of the given cities, keyed by (city, alert_type)
+async def read_states(redis, cities: list):
+    async with redis.pipeline(transaction=False) as pipe:
+        for city in cities:
+            pipe.hgetall(state_key(city))
+        results = await pipe.execute()
+    return {
+        (city, alert_type): json.loads(value)
+        for city, fields in zip(cities, results) for alert_type, value in fields.items()
+    }
+
+# Apply one evaluation round to the stored states and return the (city, rule) pairs that newly opened.
+# Only (city, rule) pairs in `evaluated` can resolve. `persist(opened)` stores the new alerts before any
+# state is written, so if it fails the states stay as they were and the next round opens them again.
+async def apply_alert_transitions(evaluated: list, triggered: list, persist, now: datetime = None):
+    now = now or datetime.utcnow()
+    suppression = timedelta(minutes=settings.ALERT_SUPPRESSION_MINUTES)
+    evaluated = {(city, rule.alert_type) for city, rule in evaluated}
+    fired = {(city, rule.alert_type): (city, rule) for city, rule in triggered}
+
+    redis = get_redis()
+    async with redis.lock(ALERT_STATE_LOCK, timeout=30, blocking_timeout=30):
+        await migrate_legacy_states(redis)
+        # Cities whose states this round can change: those that fired, and those with states and readings
+        evaluated_cities = {city for city, _ in evaluated}
+        stored_cities = {city for city in await redis.smembers(ALERT_STATE_CITIES) if city in evaluated_cities}
+        states = await read_states(redis, list(stored_cities | {city for city, _ in fired}))
+        updates, removals, opened = defaultdict(dict), defaultdict(list), []
+
+        for (city, alert_type), (_, rule) in fired.items():
+            state = states.get((city, alert_type))
+            if state is None or (
+                state['status'] == 'resolved'
+                and now - datetime.fromisoformat(state['resolved_at']) >= suppression
+            ):
+                updates[city][alert_type] = {'status': 'open', 'opened_at': now.isoformat(), 'last_seen': now.isoformat()}
+                opened.append((city, rule))
+            else:
+                updates[city][alert_type] = {**state, 'status': 'ongoing', 'last_seen': now.isoformat()}
+
+        for (city, alert_type), state in states.items():
+            if (city, alert_type) in fired or (city, alert_type) not in evaluated:
+                continue
+            if state['status'] != 'resolved':
+                updates[city][alert_type] = {**state, 'status': 'resolved', 'resolved_at': now.isoformat()}
+            elif now - datetime.fromisoformat(state['resolved_at']) >= suppression:
+                removals[city].append(alert_type)
+
+        if opened:
+            await persist(opened)
+
+        # Cities left without any state are dropped from the index
+        emptied = [
+            city for city, alert_types in removals.items()
+            if city not in updates and len(alert_types) == sum(1 for stored_city, _ in states if stored_city == city)
+        ]
+        async with redis.pipeline(transaction=True) as pipe:
+            for city, fields in updates.items():
+                pipe.hset(state_key(city), mapping={alert_type: json.dumps(state) for alert_type, state in fields.items()})
+            for city, alert_types in removals.items():
+                pipe.hdel(state_key(city), *alert_types)
+            if updates:
+                pipe.sadd(ALERT_STATE_CITIES, *updates)
+            if emptied:
+                pipe.srem(ALERT_STATE_CITIES, *emptied)
+            await pipe.execute()
+
+    return opened
+
+# States keyed by "city|alert_type", for one city or (city=None) all of them
+async def get_alert_states(city: str = None):
+    redis = get_redis()
+    cities = [city] if city is not None else list(await redis.smembers(ALERT_STATE_CITIES))
+    states = await read_states(redis, cities)
+    return {state_field(city, alert_type): state for (city, alert_type), state in states.items()}
@@ -1,70 +1,77 @@
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import smtplib
+import asyncio
+import logging
+from sqlalchemy import insert, delete
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from models import WeatherData, Alert
+from models import Alert, AlertSubscription
 from fastapi import BackgroundTasks
 from datetime import datetime
 from schema import AlertSchema
-from service.weatherFetch import CITIES
-from database import SessionLocal
-from config import settings
-
-# Checking the thresholds for alerts asynchronously
-async def check_alerts(db: AsyncSession, background_tasks: BackgroundTasks, temp_threshold=35.0, humidity_threshold=80, pressure_threshold_min=1000, pressure_threshold_max=1030, wind_threshold=15, visibility_threshold=1000):
-    low_temp = 0.0  # Example lower bound for very cold weather
-    for city in CITIES:
-        query = (
-            select(WeatherData)
-            .filter(WeatherData.city == city)
-            .order_by(WeatherData.timestamp.desc())
-            .limit(2)
+from service.cityCatalog import city_catalog
+from service.alertRules import default_rules, fetch_recent_readings, evaluate_rules, evaluated_rules
+from service.alertState import apply_alert_transitions
+from service.emailDispatcher import email_dispatcher
+from service.liveStream import publish_alerts
+from database import SessionLocal, in_chunks, upsert_insert
+
+logger = logging.getLogger(__name__)
+
+# Checking the thresholds for alerts asynchronously: one windowed query, all rules evaluated across all cities at once
+async def check_alerts(db: AsyncSession, background_tasks: BackgroundTasks, temp_threshold=35.0, humidity_threshold=80, pressure_threshold_min=1000, pressure_threshold_max=1030, wind_threshold=15, visibility_threshold=1000, rules=None):
+    rules = rules or default_rules(temp_threshold, humidity_threshold, pressure_threshold_min, pressure_threshold_max, wind_threshold, visibility_threshold)
+    cities, readings = await fetch_recent_readings(db, city_catalog.names, max(rule.window for rule in rules))
+
+    # Only alerts that newly opened are persisted; ongoing and suppressed ones just update their state
+    now = datetime.utcnow()
+    alerts = []
+
+    async def persist(opened):
+        alerts.extend(
+            {'city': city, 'alert_type': rule.alert_type, 'alert_message': rule.message, 'timestamp': now}
+            for city, rule in opened
         )
-        result = await db.execute(query)  # Asynchronously execute the query
-        recent_data = result.scalars().all()
-
-        if len(recent_data) >= 2:
-            if recent_data[0].temp_celsius > temp_threshold and recent_data[1].temp_celsius > temp_threshold:
-                background_tasks.add_task(create_alert, city, "High Temperature", f"Temperature exceeded {temp_threshold}°C", db)
-            if recent_data[0].temp_celsius < low_temp:
-                background_tasks.add_task(create_alert, city, "Very Cold", "Temperature dropped below freezing", db)
-            if recent_data[0].humidity > humidity_threshold:
-                background_tasks.add_task(create_alert, city, "High Humidity", f"Humidity exceeded {humidity_threshold}%", db)
-            if recent_data[0].wind_speed > wind_threshold:
-                background_tasks.add_task(create_alert, city, "Very Strong Winds", f"Wind Speed exceeded {wind_threshold}%", db)
-            if recent_data[0].pressure > pressure_threshold_max:
-                background_tasks.add_task(create_alert, city, "Very High Pressure", f"Pressure exceeded {pressure_threshold_max}%", db)
-            if recent_data[0].pressure < pressure_threshold_min:
-                background_tasks.add_task(create_alert, city, "Very Low Pressure", f"Pressure below {pressure_threshold_min}%", db)
-            if recent_data[0].visibility < visibility_threshold:
-                background_tasks.add_task(create_alert, city, "Very Low Visibility", f"Visibility below {pressure_threshold_min}%", db)
-
-# Helper function to create alerts
-async def create_alert(city: str, alert_type: str, alert_message: str, db: AsyncSession):
-    alert = Alert(
-        city=city,
-        alert_type=alert_type,
-        alert_message=alert_message,
-        timestamp=datetime.utcnow()
+        await create_alerts(alerts, db)
+
+    await apply_alert_transitions(
+        evaluated_rules(rules, cities, readings), evaluate_rules(rules, cities, readings), persist, now,
     )
-    db.add(alert)
-    await db.commit()
+    if alerts:
+        background_tasks.add_task(announce_alerts, alerts)
+    return alerts
+
+# Store a batch of alerts in one transaction; raises (after rolling back) so their states aren't opened
+async def create_alerts(alerts: list, db: AsyncSession):
+    try:
+        await db.execute(insert(Alert), alerts)
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Error creating alerts: {e}")
+        await db.rollback()
+        raise
+
+# Push stored alerts to live subscribers and email subscribers (own session, as it runs after the response)
+async def announce_alerts(alerts: list):
+    await publish_alerts(alerts)
+    async with SessionLocal() as db:
+        try:
+            await notify_subscribers(alerts, db)
+        except Exception as e:
+            logger.error(f"Error notifying alert subscribers: {e}")
 
 
 async def fetch_latest_alert(db: AsyncSession, city: str):
     try:
         stmt = (
-            select(Alert)
+            select(Alert.city, Alert.alert_type, Alert.alert_message, Alert.timestamp)
             .filter(Alert.city == city)
             .order_by(Alert.timestamp.desc())
             .limit(1)
         )
         result = await db.execute(stmt)
-        latest_alert = result.scalars().first()
+        latest_alert = result.first()
 
         if latest_alert:
-            return AlertSchema.from_orm(latest_alert)  # Serialize to Pydantic model
+            return dict(latest_alert._mapping)
         else:
             return {"message": f"No alerts found for city: {city}"}
     except Exception as e:
@@ -72,48 +79,64 @@ async def fetch_latest_alert(db: AsyncSession, city: str):
 
     
 
-async def send_email_alert(city: str, recipient_email: str, db: AsyncSession):
-    # Fetch the latest alert for the given city
-    latest_alert = await fetch_latest_alert(db, city)
-    
-    if "message" in latest_alert:
-        return {"error": f"No alerts found for {city}"}
-
-    #content
-    subject = f"Weather Alert for {city}: {latest_alert.alert_type}"
+# Subject and body of the notification for one alert
+def build_alert_email(city: str, alert):
+    subject = f"Weather Alert for {city}: {alert.alert_type}"
     body = f"""
     Hello,
 
     There is a new weather alert for {city}:
     
-    Alert Type: {latest_alert.alert_type}
-    Alert Message: {latest_alert.alert_message}
-    Timestamp: {latest_alert.timestamp}
+    Alert Type: {alert.alert_type}
+    Alert Message: {alert.alert_message}
+    Timestamp: {alert.timestamp}
 
     Please take necessary precautions.
 
     Best regards,
     Weather Monitoring System
     """
+    return subject, body
 
-    # Create a multipart email
-    message = MIMEMultipart()
-    message["From"] = settings.SMTP_SENDER_EMAIL
-    message["To"] = recipient_email
-    message["Subject"] = subject
-
+# Queue the latest alert for one recipient; delivery happens in the background dispatcher
+async def send_email_alert(city: str, recipient_email: str, db: AsyncSession):
+    # Fetch the latest alert for the given city
+    latest_alert = await fetch_latest_alert(db, city)
     
-    message.attach(MIMEText(body, "plain"))
+    if "message" in latest_alert:
+        return {"error": f"No alerts found for {city}"}
 
-    # Connect to the SMTP server and send the email
+    subject, body = build_alert_email(city, AlertSchema(**latest_alert))
     try:
-        with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_SENDER_EMAIL, settings.SMTP_PASSWORD)
-            server.sendmail(settings.SMTP_SENDER_EMAIL, recipient_email, message.as_string())
-
-        return {"message": f"Alert email sent successfully to {recipient_email}."}
-    except Exception as e:
-        return {"error": str(e)}
-
+        email_dispatcher.enqueue(subject, body, [recipient_email])
+        return {"message": f"Alert email queued for delivery to {recipient_email}."}
+    except asyncio.QueueFull:
+        return {"error": "Email queue is full, please retry later."}
+
+# Fan out newly created alerts to every subscriber of the affected cities
+async def notify_subscribers(alerts: list, db: AsyncSession):
+    subscribers = {}
+    for cities in in_chunks({alert['city'] for alert in alerts}):
+        result = await db.execute(select(AlertSubscription.city, AlertSubscription.email).filter(AlertSubscription.city.in_(cities)))
+        for city, email in result.all():
+            subscribers.setdefault(city, []).append(email)
+
+    for alert in alerts:
+        recipients = subscribers.get(alert['city'])
+        if recipients:
+            subject, body = build_alert_email(alert['city'], AlertSchema(**alert))
+            try:
+                email_dispatcher.enqueue(subject, body, recipients)
+            except asyncio.QueueFull:
+                logger.warning(f"Email queue full, dropped notification for {alert['city']}: {alert['alert_type']}")
+
+async def subscribe_to_alerts(city: str, email: str, db: AsyncSession):
+    stmt = upsert_insert(db, AlertSubscription).values(city=city, email=email, created_at=datetime.utcnow())
+    await db.execute(stmt.on_conflict_do_nothing(index_elements=[AlertSubscription.city, AlertSubscription.email]))
+    await db.commit()
+    return {"message": f"{email} subscribed to alerts for {city}."}
 
+async def unsubscribe_from_alerts(city: str, email: str, db: AsyncSession):
+    await db.execute(delete(AlertSubscription).filter(AlertSubscription.city == city, AlertSubscription.email == email))
+    await db.commit()
+    return {"message": f"{email} unsubscribed from alerts for {city}."}
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+import httpx
+import msgpack
+import redis.asyncio as aioredis
+import zstandard
+from fastapi import HTTPException
+from redis.client import NEVER_DECODE
+from config import settings
+from service.httpClient import RETRYABLE_STATUS_CODES, UpstreamUnavailable
+from service.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Key families tracked separately in the cache counters
+CACHE_PREFIXES = ('weather_data_', 'forecast_data_v2_')
+
+def key_prefix(key: str):
+    for prefix in CACHE_PREFIXES:
+        if key.startswith(prefix):
+            return prefix
+    return 'other'
+
+# In-process L1 cache of already-parsed values: LRU, bounded by the serialized size of its entries.
+# Entries are fresh until their TTL, then served stale (while one refresh runs) until stale_until.
+# Expired entries stay until LRU eviction so they can still be served while upstream is down.
+class LocalCache:
+    def __init__(self, max_bytes: int, stale_ttl: int):
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.size_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, fresh_until, stale_until)
+        self.stats = defaultdict(lambda: {'hits': 0, 'stale_hits': 0, 'stale_if_error': 0, 'redis_hits': 0, 'misses': 0, 'evictions': 0})
+
+    # Returns (value, is_fresh), or None when the key is absent or past its stale window
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, _, fresh_until, stale_until = entry
+        now = time.monotonic()
+        if now >= stale_until:
+            return None
+        self._entries.move_to_end(key)
+        return value, now < fresh_until
+
+    # Last known value regardless of age, for serving while the loader is failing
+    def get_any(self, key: str):
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value, size: int, ttl: float):
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = (value, size, now + ttl, now + ttl + self.stale_ttl)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= evicted[1]
+            self.stats[key_prefix(evicted_key)]['evictions'] += 1
+
+    def record(self, key: str, outcome: str):
+        prefix = key_prefix(key)
+        self.stats[prefix][outcome] += 1
+        CACHE_REQUESTS.labels(prefix, outcome).inc()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+
+local_cache = LocalCache(settings.LOCAL_CACHE_MAX_BYTES, settings.CACHE_STALE_TTL)
+
+# Shared async Redis client backed by a connection pool, created on first use
+_redis = None
+
+# In-flight loads keyed by cache key, so concurrent misses share a single upstream call
+_inflight = {}
+
+# Background stale-while-revalidate refreshes, referenced so they aren't garbage collected mid-run
+_refreshes = set()
+
+def get_redis():
+    global _redis
+    if _redis is None:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=True,
+        )
+        _redis = aioredis.Redis(connection_pool=pool)
+    return _redis
+
+async def close_redis():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+    _redis = None
+
+# Values are stored as JSON text, or with compressed=True as zstd-compressed msgpack,
+# read back as raw bytes through the same (decoding) client
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+def encode_value(value, compressed: bool = False):
+    if compressed:
+        return _compressor.compress(msgpack.packb(value))
+    return json.dumps(value)
+
+def decode_value(data, compressed: bool = False):
+    if compressed:
+        return msgpack.unpackb(_decompressor.decompress(data))
+    return json.loads(data)
+
+def cache_stats():
+    return {
+        'local': {'entries': len(local_cache._entries), 'size_bytes': local_cache.size_bytes, 'max_bytes': local_cache.max_bytes},
+        'prefixes': {prefix: dict(counters) for prefix, counters in local_cache.stats.items()},
+    }
+
+# Read-through L1 then Redis; a Redis hit is promoted to L1 for its remaining TTL
+async def cache_get(key: str, compressed: bool = False):
+    entry = local_cache.get(key)
+    if entry is not None and entry[1]:
+        local_cache.record(key, 'hits')
+        return entry[0]
+
+    async with get_redis().pipeline(transaction=False) as pipe:
+        if compressed:
+            pipe.execute_command('GET', key, **{NEVER_DECODE: True})
+        else:
+            pipe.get(key)
+        pipe.ttl(key)
+        cached_data, remaining_ttl = await pipe.execute()
+    if not cached_data:
+        return None
+
+    value = decode_value(cached_data, compressed)
+    if remaining_ttl > 0:
+        local_cache.set(key, value, len(cached_data), remaining_ttl)
+    local_cache.record(key, 'redis_hits')
+    return value
+
+async def cache_set(key: str, ttl: int, value, compressed: bool = False):
+    serialized = encode_value(value, compressed)
+    local_cache.set(key, value, len(serialized), ttl)
+    await get_redis().set(key, serialized, ex=ttl)
+
+# Read many keys in one round trip; missing keys come back as None
+async def cache_get_many(keys: list):
+    if not keys:
+        return []
+    cached_values = await get_redis().mget(keys)
+    for key, cached_data in zip(keys, cached_values):
+        CACHE_REQUESTS.labels(key_prefix(key), 'redis_hits' if cached_data else 'misses').inc()
+    return [json.loads(cached_data) if cached_data else None for cached_data in cached_values]
+
+async def cache_set_many(items: dict, ttl: int):
+    if not items:
+        return
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for key, value in items.items():
+            serialized = json.dumps(value)
+            local_cache.set(key, value, len(serialized), ttl)
+            pipe.set(key, serialized, ex=ttl)
+        await pipe.execute()
+
+# Run loader at most once per key at a time; every concurrent caller awaits the same result
+async def single_flight(key: str, loader):
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(loader())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield so a cancelled caller doesn't cancel the load for everyone else
+    return await asyncio.shield(task)
+
+async def _refresh(key: str, load_and_store):
+    try:
+        await single_flight(key, load_and_store)
+    except Exception as e:
+        logger.error(f"Error refreshing cache key {key}: {e}")
+
+# Return the cached value for key, loading and caching it through single_flight on a miss.
+# A stale L1 entry is returned immediately while a single background refresh reloads it (from Redis when
+# another worker has refreshed it already, otherwise through the loader).
+async def get_or_load(key: str, ttl: int, loader, compressed: bool = False):
+    async def load_and_store():
+        value = await loader()
+        await cache_set(key, ttl, value, compressed)
+        return value
+
+    # Another worker may already have refreshed the key in Redis; only go upstream when none has
+    async def reload():
+        value = await cache_get(key, compressed)
+        if value is not None:
+            return value
+        return await load_and_store()
+
+    entry = local_cache.get(key)
+    if entry is not None and not entry[1]:
+        local_cache.record(key, 'stale_hits')
+        if key not in _inflight:
+            refresh = asyncio.ensure_future(_refresh(key, reload))
+            _refreshes.add(refresh)
+            refresh.add_done_callback(_refreshes.discard)
+        return entry[0]
+
+    cached_data = await cache_get(key, compressed)
+    if cached_data is not None:
+        return cached_data
+
+    local_cache.record(key, 'misses')
+    try:
+        return await single_flight(key, load_and_store)
+    except Exception as e:
+        if not is_upstream_failure(e):
+            raise
+        # Stale-if-error: an expired entry beats no answer while upstream is down or shedding load
+        last_known = local_cache.get_any(key)
+        if last_known is None:
+            raise
+        local_cache.record(key, 'stale_if_error')
+        return last_known
+
+def is_upstream_failure(error: Exception):
+    if isinstance(error, HTTPException):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (UpstreamUnavailable, httpx.TransportError))
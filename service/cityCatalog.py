@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.future import select
+from config import settings
+from database import SessionLocal, upsert_insert
+from models import City
+from service.cache import get_redis
+from service.logConfig import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DEMAND_KEY = 'city_demand'  # Sorted set: city name -> last time it was requested
+DEMAND_WRITE_INTERVAL = 60  # Per worker, record a city's demand at most this often
+
+@dataclass(frozen=True)
+class CatalogCity:
+    id: int
+    name: str
+    country: str = None
+    lat: float = None
+    lon: float = None
+    tier: str = 'cold'
+
+# Built-in catalog, used until the city table exists and has rows (same seed as migrations/007_city_catalog.sql)
+DEFAULT_CITIES = [
+    CatalogCity(1273294, 'Delhi', 'IN', 28.6667, 77.2167, 'hot'),
+    CatalogCity(1275339, 'Mumbai', 'IN', 19.0144, 72.8479, 'hot'),
+    CatalogCity(1264527, 'Chennai', 'IN', 13.0878, 80.2785, 'hot'),
+    CatalogCity(1277333, 'Bengaluru', 'IN', 12.9762, 77.6033, 'hot'),
+    CatalogCity(1275004, 'Kolkata', 'IN', 22.5697, 88.3697, 'hot'),
+    CatalogCity(1269843, 'Hyderabad', 'IN', 17.3840, 78.4564, 'hot'),
+]
+
+# In-memory copy of the city table. Lookups are dict reads; reload() swaps in a new copy when the table changed.
+class CityCatalog:
+    def __init__(self, cities: list):
+        self.version = None
+        self.replace(cities)
+
+    def replace(self, cities: list):
+        self.cities = list(cities)
+        self.names = [city.name for city in self.cities]
+        self.ids = {city.name: city.id for city in self.cities}
+        self.by_id = {city.id: city for city in self.cities}
+        self.by_name = {city.name.lower(): city for city in self.cities}
+
+    # Resolve a path parameter: an OpenWeatherMap city ID or a (case-insensitive) catalog name
+    def lookup(self, city: str):
+        if city.isdigit():
+            return self.by_id.get(int(city))
+        return self.by_name.get(city.lower())
+
+    def id_for(self, name: str):
+        return self.ids.get(name)
+
+    # Reload from the city table if its row count or last update changed; an empty table keeps the current cities
+    async def reload(self):
+        async with SessionLocal() as db:
+            result = await db.execute(select(func.count(City.id), func.max(City.updated_at)))
+            version = tuple(result.one())
+            if version == self.version:
+                return False
+            self.version = version
+            if version[0] == 0:
+                return False
+            result = await db.execute(select(City))
+            rows = result.scalars().all()
+        self.replace([CatalogCity(row.id, row.name, row.country, row.lat, row.lon, row.tier) for row in rows])
+        return True
+
+city_catalog = CityCatalog(DEFAULT_CITIES)
+
+async def reload_city_catalog():
+    try:
+        if await city_catalog.reload():
+            logger.info(f"Loaded {len(city_catalog.cities)} cities into the catalog")
+    except Exception as e:
+        logger.error(f"Error reloading city catalog, keeping {len(city_catalog.cities)} cities: {e}")
+
+# Demand tracking: on-demand reads mark a city hot for CITY_DEMAND_WINDOW_MINUTES, shared across workers via Redis
+_demand_recorded = {}
+
+async def record_demand(city: CatalogCity):
+    now = time.time()
+    if now - _demand_recorded.get(city.name, 0) < DEMAND_WRITE_INTERVAL:
+        return
+    _demand_recorded[city.name] = now
+    try:
+        await get_redis().zadd(DEMAND_KEY, {city.name: now})
+    except Exception as e:
+        logger.error(f"Error recording demand for {city.name}: {e}")
+
+async def demanded_cities():
+    cutoff = time.time() - settings.CITY_DEMAND_WINDOW_MINUTES * 60
+    async with get_redis().pipeline(transaction=False) as pipe:
+        pipe.zremrangebyscore(DEMAND_KEY, '-inf', cutoff)
+        pipe.zrange(DEMAND_KEY, 0, -1)
+        _, names = await pipe.execute()
+    return set(names)
+
+# Picks which cities to refresh each ingest cycle. Hot cities (tier "hot" or recently requested) are due every
+# cycle, cold ones every CITY_COLD_REFRESH_MINUTES. When more are due than the quota budget allows, hot cities go
+# first, then the most overdue; the rest stay due and are picked up by the following cycles.
+class RefreshScheduler:
+    def __init__(self):
+        self.last_refreshed = {}  # city name -> epoch seconds of its last successful fetch
+        self.stats = {'due': 0, 'selected': 0, 'deferred': 0, 'hot': 0}
+
+    def select_due(self, cities: list, hot: set, budget: int, now: float = None):
+        now = now or time.time()
+        hot_interval = settings.INGEST_INTERVAL_MINUTES * 60
+        cold_interval = settings.CITY_COLD_REFRESH_MINUTES * 60
+        # Half a cycle of slack, so a jittered run doesn't push a city to the cycle after
+        horizon = now + hot_interval / 2
+
+        candidates, hot_count = [], 0
+        for name in cities:
+            entry = city_catalog.by_name.get(name.lower())
+            is_hot = name in hot or (entry is not None and entry.tier == 'hot')
+            due_at = self.last_refreshed.get(name, 0) + (hot_interval if is_hot else cold_interval)
+            if due_at <= horizon:
+                candidates.append((0 if is_hot else 1, due_at, name))
+                hot_count += is_hot
+
+        selected = [name for _, _, name in heapq.nsmallest(budget, candidates)]
+        self.stats = {'due': len(candidates), 'selected': len(selected), 'deferred': len(candidates) - len(selected), 'hot': hot_count}
+        return selected
+
+    def mark_refreshed(self, names, now: float = None):
+        now = now or time.time()
+        for name in names:
+            self.last_refreshed[name] = now
+
+refresh_scheduler = RefreshScheduler()
+
+def catalog_stats():
+    return {
+        'cities': len(city_catalog.cities),
+        'hot_tier': sum(city.tier == 'hot' for city in city_catalog.cities),
+        'last_cycle': refresh_scheduler.stats,
+    }
+
+# Bulk-load an OpenWeatherMap city list (city.list.json) into the city table as cold cities.
+# Duplicate names get the country appended; anything still ambiguous is skipped.
+async def import_city_list(path: str, tier: str = 'cold'):
+    with open(path) as f:
+        entries = json.load(f)
+
+    seen, rows = set(city.name.lower() for city in city_catalog.cities), []
+    for entry in entries:
+        name = entry['name']
+        if name.lower() in seen:
+            name = f"{name}, {entry.get('country')}"
+            if name.lower() in seen:
+                continue
+        seen.add(name.lower())
+        coord = entry.get('coord', {})
+        rows.append({'id': entry['id'], 'name': name, 'country': entry.get('country'), 'lat': coord.get('lat'),
+                     'lon': coord.get('lon'), 'tier': tier, 'updated_at': datetime.utcnow()})
+
+    async with SessionLocal() as db:
+        for i in range(0, len(rows), 5000):
+            stmt = upsert_insert(db, City).on_conflict_do_nothing()
+            await db.execute(stmt, rows[i:i + 5000])
+        await db.commit()
+    return len(rows)
+
+if __name__ == '__main__':
+    setup_logging()
+
+    async def main():
+        await reload_city_catalog()
+        count = await import_city_list(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else 'cold')
+        logger.info(f"Imported {count} cities")
+    asyncio.run(main())
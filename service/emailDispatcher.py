@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+import aiosmtplib
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# One outgoing email; recipients beyond SMTP_BATCH_SIZE are split into several envelopes on the same connection
+@dataclass
+class EmailJob:
+    subject: str
+    body: str
+    recipients: list
+    attempts: int = 0
+    sent_batches: int = field(default=0)
+
+def build_message(job: EmailJob, recipients: list):
+    message = MIMEMultipart()
+    message["From"] = settings.SMTP_SENDER_EMAIL
+    # A single recipient is addressed directly; fan-out batches go out as undisclosed (envelope-only) recipients
+    message["To"] = recipients[0] if len(recipients) == 1 else settings.SMTP_SENDER_EMAIL
+    message["Subject"] = job.subject
+    message.attach(MIMEText(job.body, "plain"))
+    return message
+
+# Background email delivery: an async queue drained by a few workers, each holding one
+# persistent authenticated SMTP connection, with retry and exponential backoff per job
+class EmailDispatcher:
+    def __init__(self, workers: int, batch_size: int, max_retries: int, queue_size: int):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    # Let queued mail drain for up to `timeout` seconds, then stop the workers
+    async def stop(self, timeout: float = 10):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Email dispatcher stopped with {self.queue.qsize()} emails still queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Raises asyncio.QueueFull when the backlog is at SMTP_QUEUE_SIZE, so callers can report it
+    def enqueue(self, subject: str, body: str, recipients: list):
+        if not recipients:
+            return
+        self.queue.put_nowait(EmailJob(subject, body, list(recipients)))
+        self.stats['queued'] += 1
+
+    async def _connect(self):
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.SMTP_SERVER,
+            port=settings.SMTP_PORT,
+            start_tls=settings.SMTP_START_TLS,
+            timeout=settings.SMTP_TIMEOUT,
+        )
+        await smtp.connect()
+        if settings.SMTP_PASSWORD:
+            try:
+                await smtp.login(settings.SMTP_SENDER_EMAIL, settings.SMTP_PASSWORD)
+            except aiosmtplib.SMTPException:
+                smtp.close()
+                raise
+        return smtp
+
+    async def _send(self, smtp, job: EmailJob):
+        batches = [job.recipients[i:i + self.batch_size] for i in range(0, len(job.recipients), self.batch_size)]
+        # Batches already accepted in an earlier attempt are not re-sent
+        for recipients in batches[job.sent_batches:]:
+            await smtp.send_message(build_message(job, recipients), sender=settings.SMTP_SENDER_EMAIL, recipients=recipients)
+            job.sent_batches += 1
+
+    async def _worker(self):
+        smtp = None
+        try:
+            while True:
+                job = await self.queue.get()
+                try:
+                    while True:
+                        try:
+                            if smtp is None or not smtp.is_connected:
+                                smtp = await self._connect()
+                            await self._send(smtp, job)
+                            self.stats['sent'] += 1
+                            break
+                        except (aiosmtplib.SMTPException, OSError) as e:
+                            # Drop the connection, closing its transport so a failure doesn't leak it
+                            if smtp is not None and smtp.is_connected:
+                                smtp.close()
+                            smtp = None
+                            job.attempts += 1
+                            if job.attempts > self.max_retries:
+                                self.stats['failed'] += 1
+                                logger.warning(f"Giving up on email '{job.subject}' after {job.attempts} attempts: {e}")
+                                break
+                            self.stats['retried'] += 1
+                            await asyncio.sleep(settings.SMTP_RETRY_BACKOFF * 2 ** (job.attempts - 1) * random.uniform(0.5, 1.5))
+                finally:
+                    self.queue.task_done()
+        finally:
+            if smtp is not None and smtp.is_connected:
+                smtp.close()
+
+email_dispatcher = EmailDispatcher(
+    workers=settings.SMTP_WORKERS,
+    batch_size=settings.SMTP_BATCH_SIZE,
+    max_retries=settings.SMTP_MAX_RETRIES,
+    queue_size=settings.SMTP_QUEUE_SIZE,
+)
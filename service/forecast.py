@@ -1,21 +1,66 @@
-import httpx
-import json
+import bisect
+import time
+from datetime import datetime
+from fastapi import HTTPException
 from config import settings
-from service.weatherFetch import REDIS_EXPIRY_TIME, redis_client
+from service.httpClient import upstream_get
+from service.cache import get_or_load
+from service.cityCatalog import city_catalog
 
-# Fetch weather forecast data
+# Per-step forecast columns kept in the normalized form, in addition to `timestamps` and `main`
+FORECAST_FIELDS = ('temp_celsius', 'feels_like', 'humidity', 'wind_speed', 'pressure', 'visibility', 'pop', 'rain_3h')
+FORECAST_STEP_SECONDS = 3 * 3600
+# Cache key prefix of the normalized, compressed form; versioned so entries in an older format aren't decoded as it
+FORECAST_CACHE_PREFIX = 'forecast_data_v2_'
+
+# Forecasts only change when upstream issues a new run, so cache entries expire shortly after the next one
+def forecast_ttl(now: float = None):
+    now = now or time.time()
+    cycle = settings.FORECAST_ISSUE_HOURS * 3600
+    delay = settings.FORECAST_ISSUE_DELAY_MINUTES * 60
+    next_issue = ((now - delay) // cycle + 1) * cycle + delay
+    return max(60, int(next_issue - now))
+
+# Fetch the normalized forecast, cached (compressed) until the next upstream issuance
 async def fetch_forecast_data(city: str):
-    cache_key = f"forecast_data_{city}"
-    cached_data = redis_client.get(cache_key)
-    
-    if cached_data:
-        return json.loads(cached_data)
-    
-    url = f'http://pro.openweathermap.org/data/2.5/forecast?q={city}&appid={settings.OPENWEATHER_API_KEY}'
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        forecast_data = response.json()
+    cache_key = f"{FORECAST_CACHE_PREFIX}{city}"
+    return await get_or_load(cache_key, forecast_ttl(), lambda: fetch_forecast_from_api(city), compressed=True)
+
+async def fetch_forecast_from_api(city: str):
+    url = f'{settings.OPENWEATHER_BASE_URL}/data/2.5/forecast'
+    city_id = city_catalog.id_for(city)
+    params = {'id': city_id} if city_id is not None else {'q': city}
+    response = await upstream_get(url, params={**params, 'appid': settings.OPENWEATHER_API_KEY})
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Error fetching forecast data from OpenWeatherMap.")
+    return normalize_forecast(city, response.json())
+
+# Turn the upstream list of 3-hourly entries into one array per field (epoch seconds for timestamps)
+def normalize_forecast(city: str, data: dict):
+    entries = data.get('list', [])
+    return {
+        'city': city,
+        'fetched_at': int(time.time()),
+        'timestamps': [entry['dt'] for entry in entries],
+        'main': [entry['weather'][0]['main'] for entry in entries],
+        'temp_celsius': [round(entry['main']['temp'] - 273.15, 2) for entry in entries],
+        'feels_like': [round(entry['main']['feels_like'] - 273.15, 2) for entry in entries],
+        'humidity': [entry['main'].get('humidity') for entry in entries],
+        'wind_speed': [entry.get('wind', {}).get('speed') for entry in entries],
+        'pressure': [entry['main'].get('pressure') for entry in entries],
+        'visibility': [entry.get('visibility') for entry in entries],
+        'pop': [entry.get('pop', 0) for entry in entries],  # Probability of precipitation
+        'rain_3h': [entry.get('rain', {}).get('3h', 0) for entry in entries],
+    }
 
-        # Cache the forecast data
-        redis_client.setex(cache_key, REDIS_EXPIRY_TIME, json.dumps(forecast_data))
-        return forecast_data
+# The part of a normalized forecast with start <= timestamp < end, limited to the requested fields
+def slice_forecast(forecast: dict, start: int = None, end: int = None, fields: tuple = FORECAST_FIELDS):
+    timestamps = forecast['timestamps']
+    lo = bisect.bisect_left(timestamps, start) if start is not None else 0
+    hi = bisect.bisect_left(timestamps, end) if end is not None else len(timestamps)
+    return {
+        'city': forecast['city'],
+        'step_hours': FORECAST_STEP_SECONDS // 3600,
+        'timestamps': [datetime.utcfromtimestamp(ts).isoformat() for ts in timestamps[lo:hi]],
+        **{field: forecast[field][lo:hi] for field in ('main', *fields)},
+    }
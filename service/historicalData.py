@@ -1,22 +1,183 @@
-import httpx
-from sqlalchemy import func
-import json
+import argparse
+import asyncio
+import logging
+from datetime import datetime, time, timedelta
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 from config import settings
-from service.weatherFetch import REDIS_EXPIRY_TIME, redis_client
-
-# Fetch historical weather data from OpenWeatherMap
-async def fetch_historical_weather_data(city: str):
-    cache_key = f"historical_data_{city}"
-    cached_data = redis_client.get(cache_key)
-    
-    if cached_data:
-        return json.loads(cached_data)
-    
-    url = f'http://history.openweathermap.org/data/2.5/history/city?q={city}&appid={settings.OPENWEATHER_API_KEY}'
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        historical_data = response.json()
-
-        # Cache the historical weather data
-        redis_client.setex(cache_key, REDIS_EXPIRY_TIME, json.dumps(historical_data))
-        return historical_data
+from database import SessionLocal, upsert_insert
+from models import WeatherHistory, WeatherHistoryCoverage
+from service.cityCatalog import city_catalog, reload_city_catalog
+from service.httpClient import upstream_get
+from service.logConfig import setup_logging
+from service.weatherFetch import parse_weather_data
+from service.seriesStore import epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+# History is archived locally (weather_history) and tracked per (city, day) in weather_history_coverage,
+# so each day is requested upstream once; only the current day is refetched, at most every HISTORY_REFRESH_MINUTES.
+# Days are always fetched whole, so coverage never records a partially fetched day.
+
+HISTORY_COLUMNS = ('main', 'description', 'temp_celsius', 'feels_like', 'humidity', 'wind_speed', 'pressure', 'visibility')
+
+def day_start(day):
+    return datetime.combine(day, time.min)
+
+def is_covered(day, fetched_at: datetime, now: datetime):
+    settle = timedelta(minutes=settings.HISTORY_REFRESH_MINUTES)
+    return fetched_at >= day_start(day) + timedelta(days=1) + settle or now - fetched_at < settle
+
+# Contiguous runs of days in [start, end] not yet covered, split into spans the history API accepts
+async def missing_history_ranges(db: AsyncSession, city: str, start: datetime, end: datetime):
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(WeatherHistoryCoverage.day, WeatherHistoryCoverage.fetched_at)
+        .filter(WeatherHistoryCoverage.city == city,
+                WeatherHistoryCoverage.day >= start.date(), WeatherHistoryCoverage.day <= end.date())
+    )
+    covered = {day for day, fetched_at in result.all() if is_covered(day, fetched_at, now)}
+
+    ranges, run = [], []
+    day, last_day = start.date(), (min(end, now) - timedelta(microseconds=1)).date()
+    while day <= last_day:
+        if day not in covered:
+            run.append(day)
+        if run and (day in covered or len(run) == settings.HISTORY_CHUNK_DAYS or day == last_day):
+            ranges.append((day_start(run[0]), min(day_start(run[-1]) + timedelta(days=1), now)))
+            run = []
+        day += timedelta(days=1)
+    return ranges
+
+async def fetch_history_from_api(city: str, start: datetime, end: datetime):
+    url = f'{settings.OPENWEATHER_HISTORY_URL}/data/2.5/history/city'
+    city_id = city_catalog.id_for(city)
+    params = {
+        **({'id': city_id} if city_id is not None else {'q': city}),
+        'type': 'hour',
+        'start': epoch_seconds(start),
+        'end': epoch_seconds(end),
+        'appid': settings.OPENWEATHER_API_KEY,
+    }
+    response = await upstream_get(url, params=params)
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Error fetching historical data from OpenWeatherMap.")
+    return response.json()
+
+def parse_history_item(city: str, item: dict):
+    row = parse_weather_data(item, city=city)
+    row['timestamp'] = datetime.utcfromtimestamp(item['dt'])
+    return row
+
+# Archive one fetched span and mark its days covered; runs in the caller's transaction
+async def store_history(db: AsyncSession, city: str, start: datetime, end: datetime, rows: list):
+    if rows:
+        stmt = upsert_insert(db, WeatherHistory)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WeatherHistory.city, WeatherHistory.timestamp],
+            set_={column: stmt.excluded[column] for column in HISTORY_COLUMNS},
+        )
+        await db.execute(stmt, rows)
+
+    fetched_at = datetime.utcnow()
+    days, day = [], start.date()
+    while day_start(day) < end:
+        days.append(day)
+        day += timedelta(days=1)
+    stmt = upsert_insert(db, WeatherHistoryCoverage)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WeatherHistoryCoverage.city, WeatherHistoryCoverage.day],
+        set_={'fetched_at': stmt.excluded.fetched_at},
+    )
+    await db.execute(stmt, [{'city': city, 'day': day, 'fetched_at': fetched_at} for day in days])
+
+# Fetch whatever part of [start, end] isn't archived yet. Spans are fetched concurrently (through
+# `semaphore` when given) and written in one transaction. Returns (spans fetched, spans failed).
+async def ensure_history(db: AsyncSession, city: str, start: datetime, end: datetime, semaphore: asyncio.Semaphore = None):
+    missing = await missing_history_ranges(db, city, start, end)
+    if not missing:
+        return 0, 0
+
+    async def fetch(span_start, span_end):
+        if semaphore is None:
+            return await fetch_history_from_api(city, span_start, span_end)
+        async with semaphore:
+            return await fetch_history_from_api(city, span_start, span_end)
+
+    results = await asyncio.gather(*(fetch(span_start, span_end) for span_start, span_end in missing), return_exceptions=True)
+    failed = 0
+    try:
+        for (span_start, span_end), result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching history for {city} {span_start:%Y-%m-%d}..{span_end:%Y-%m-%d}: {result}")
+                failed += 1
+                continue
+            rows = [parse_history_item(city, item) for item in result.get('list', [])]
+            await store_history(db, city, span_start, span_end, rows)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return len(missing) - failed, failed
+
+async def get_history(db: AsyncSession, city: str, start: datetime, end: datetime):
+    result = await db.execute(
+        select(WeatherHistory.timestamp, *(getattr(WeatherHistory, column) for column in HISTORY_COLUMNS))
+        .filter(WeatherHistory.city == city, WeatherHistory.timestamp >= start, WeatherHistory.timestamp < end)
+        .order_by(WeatherHistory.timestamp)
+    )
+    return [
+        {'timestamp': row[0].isoformat(), **dict(zip(HISTORY_COLUMNS, row[1:]))}
+        for row in result.all()
+    ]
+
+# Hourly history for a city between start and end, served from the archive after filling any gaps upstream.
+# If some spans could not be fetched, what the archive has is returned with complete=False.
+async def fetch_historical_weather_data(db: AsyncSession, city: str, start: datetime, end: datetime):
+    _, failed = await ensure_history(db, city, start, end)
+    return {
+        'city': city,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'complete': failed == 0,
+        'readings': await get_history(db, city, start, end),
+    }
+
+# Bulk backfill: python -m service.historicalData --days 90 [--cities Delhi,Mumbai] [--concurrency 8].
+# At most `concurrency` cities hold a session and at most `concurrency` history requests are in flight.
+async def backfill(cities: list, start: datetime, end: datetime, concurrency: int):
+    requests = asyncio.Semaphore(concurrency)
+    sessions = asyncio.Semaphore(concurrency)
+    totals = {'cities': 0, 'fetched': 0, 'failed': 0}
+
+    async def backfill_city(city):
+        async with sessions, SessionLocal() as db:
+            try:
+                fetched, failed = await ensure_history(db, city, start, end, requests)
+            except Exception as e:
+                logger.error(f"Error backfilling history for {city}: {e}")
+                fetched, failed = 0, 1
+        totals['cities'] += 1
+        totals['fetched'] += fetched
+        totals['failed'] += failed
+        if totals['cities'] % 100 == 0 or totals['cities'] == len(cities):
+            logger.info(f"Backfilled {totals['cities']}/{len(cities)} cities: {totals}")
+
+    await asyncio.gather(*(backfill_city(city) for city in cities))
+    return totals
+
+if __name__ == '__main__':
+    setup_logging()
+    parser = argparse.ArgumentParser(description="Backfill the local weather history archive")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--cities', help="Comma-separated city names (default: the whole catalog)")
+    parser.add_argument('--concurrency', type=int, default=settings.HISTORY_BACKFILL_CONCURRENCY)
+    args = parser.parse_args()
+
+    async def main():
+        await reload_city_catalog()
+        cities = args.cities.split(',') if args.cities else city_catalog.names
+        end = datetime.utcnow()
+        await backfill(cities, end - timedelta(days=args.days), end, args.concurrency)
+    asyncio.run(main())
@@ -0,0 +1,192 @@
+import asyncio
+import random
+import time
+import httpx
+from config import settings
+from service.metrics import UPSTREAM_REJECTED, observe_upstream
+
+# HTTP/2 is only negotiated when the optional `h2` package is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Raised instead of calling upstream when the circuit is open or the quota wait would be too long
+class UpstreamUnavailable(Exception):
+    pass
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Token bucket for the plan's per-minute quota. The rate adapts AIMD-style: halved on a 429,
+# then recovered one request/minute per success up to this process's share of the quota.
+# The bucket is per process: in sharded mode the heartbeat sets the share to 1/N of the quota with
+# N live workers, so the cluster as a whole stays within the plan.
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.quota_rate = per_minute / 60
+        self.max_rate = self.quota_rate
+        self.rate = self.max_rate
+        self.tokens = per_minute / 60  # Allow up to one second's worth of burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Waits in FIFO order for a token; raises UpstreamUnavailable if the wait would exceed max_wait
+    async def acquire(self, max_wait: float):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                if wait > max_wait:
+                    raise UpstreamUnavailable(f"Upstream quota exhausted, next slot in {wait:.1f}s")
+                upstream_stats['queued'] += 1
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+
+    # Limit this process to 1/worker_count of the quota; the current (possibly throttled) rate scales along
+    def set_worker_count(self, worker_count: int):
+        max_rate = self.quota_rate / max(1, worker_count)
+        self.rate = self.rate * max_rate / self.max_rate
+        self.max_rate = max_rate
+
+    def throttle(self):
+        self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def recover(self):
+        self.rate = min(self.max_rate, self.rate + 1 / 60)
+
+# Opens after `failure_threshold` consecutive failures; after `reset_timeout` one trial request
+# is let through (half-open) and its outcome closes or re-opens the circuit. A trial that never
+# reports back (cancelled, dropped by the limiter) is given up on after another reset_timeout.
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def before_request(self):
+        state = self.state
+        if state == 'closed':
+            return
+        now = time.monotonic()
+        trial_pending = self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout
+        if state == 'open' or trial_pending:
+            raise UpstreamUnavailable("Upstream circuit is open")
+        self.trial_started_at = now
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_started_at = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+# Application-lifetime pooled client, owned by the FastAPI lifespan
+_client = None
+_semaphore = None
+
+rate_limiter = TokenBucket(settings.OPENWEATHER_RATE_LIMIT_PER_MINUTE)
+circuit_breaker = CircuitBreaker(settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_SECONDS)
+upstream_stats = {'requests': 0, 'queued': 0, 'dropped': 0, 'retried': 0, 'failures': 0, 'throttled': 0}
+
+def get_upstream_stats():
+    return {
+        **upstream_stats,
+        'circuit_state': circuit_breaker.state,
+        'rate_per_minute': round(rate_limiter.rate * 60, 1),
+        'in_flight': settings.HTTP_MAX_CONCURRENCY - _semaphore._value if _semaphore is not None else 0,
+    }
+
+# Create the shared client (idempotent, so scripts can use it without the app)
+async def init_http_client():
+    global _client, _semaphore
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        _semaphore = asyncio.Semaphore(settings.HTTP_MAX_CONCURRENCY)
+    return _client
+
+async def close_http_client():
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _semaphore = None
+
+def retry_delay(attempt: int, response=None):
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    # Full jitter exponential backoff
+    return random.uniform(0, settings.HTTP_RETRY_BACKOFF * 2 ** attempt)
+
+# GET through the shared keep-alive pool: quota-limited, bounded to HTTP_MAX_CONCURRENCY in flight,
+# retried with jittered backoff on 429/5xx/transport errors, and short-circuited while upstream is failing.
+# Non-retryable error responses (and the last retryable one) are returned for the caller to handle.
+async def upstream_get(url: str, params: dict = None):
+    client = await init_http_client()
+    attempt = 0
+    while True:
+        try:
+            circuit_breaker.before_request()
+            await rate_limiter.acquire(settings.RATE_LIMIT_MAX_WAIT)
+        except UpstreamUnavailable:
+            upstream_stats['dropped'] += 1
+            UPSTREAM_REJECTED.labels('circuit_open' if circuit_breaker.state == 'open' else 'quota_wait').inc()
+            raise
+
+        upstream_stats['requests'] += 1
+        response, error = None, None
+        try:
+            async with _semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, params=params)
+                finally:
+                    observe_upstream(url, response.status_code if response is not None else 'error', time.perf_counter() - start)
+        except httpx.TransportError as e:
+            error = e
+
+        if error is None and response.status_code not in RETRYABLE_STATUS_CODES:
+            circuit_breaker.record_success()
+            rate_limiter.recover()
+            return response
+
+        upstream_stats['failures'] += 1
+        circuit_breaker.record_failure()
+        if response is not None and response.status_code == 429:
+            upstream_stats['throttled'] += 1
+            rate_limiter.throttle()
+
+        if attempt >= settings.HTTP_MAX_RETRIES or circuit_breaker.state == 'open':
+            if error is not None:
+                raise error
+            return response
+
+        upstream_stats['retried'] += 1
+        await asyncio.sleep(retry_delay(attempt, response))
+        attempt += 1
@@ -0,0 +1,92 @@
+import bisect
+import functools
+import hashlib
+import os
+import socket
+import time
+import uuid
+from config import settings
+from service.cache import get_redis
+from service.httpClient import rate_limiter
+
+# Coordinated ingestion across workers/replicas:
+#  - every worker heartbeats into a Redis sorted set; members older than the TTL are considered dead
+#  - cities are assigned to live workers by a consistent-hash ring, so a join/leave only moves ~1/N of them
+#  - before fetching, a worker claims each city for the current interval with SET NX, so a city is
+#    fetched exactly once per interval even while workers disagree about membership during a rebalance
+#  - one worker holds a renewable leader lease and runs the singleton jobs
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+WORKERS_KEY = 'ingest_workers'
+LEADER_KEY = 'ingest_leader'
+VIRTUAL_NODES = 64
+
+def hash_position(value: str):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+class HashRing:
+    def __init__(self, workers: list, virtual_nodes: int = VIRTUAL_NODES):
+        points = sorted(
+            (hash_position(f"{worker}#{replica}"), worker)
+            for worker in workers for replica in range(virtual_nodes)
+        )
+        self._positions = [position for position, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    def owner(self, key: str):
+        if not self._workers:
+            return None
+        index = bisect.bisect(self._positions, hash_position(key)) % len(self._positions)
+        return self._workers[index]
+
+# Renew this worker's membership (and leader lease if held), drop workers whose heartbeat expired
+# and rescale this worker's upstream rate limit to the live worker count
+async def heartbeat():
+    redis = get_redis()
+    now = time.time()
+    ttl = settings.INGEST_WORKER_TTL_SECONDS
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.zadd(WORKERS_KEY, {WORKER_ID: now})
+        pipe.zremrangebyscore(WORKERS_KEY, '-inf', now - ttl)
+        # Take the leader lease if it is free, or extend it if we already hold it
+        pipe.set(LEADER_KEY, WORKER_ID, nx=True, ex=ttl)
+        pipe.get(LEADER_KEY)
+        pipe.zcard(WORKERS_KEY)
+        _, _, _, leader, worker_count = await pipe.execute()
+    if leader == WORKER_ID:
+        await redis.expire(LEADER_KEY, ttl)
+    # The upstream quota is per API key, so each live worker gets an equal share of it
+    rate_limiter.set_worker_count(worker_count)
+
+async def live_workers():
+    return await get_redis().zrangebyscore(WORKERS_KEY, time.time() - settings.INGEST_WORKER_TTL_SECONDS, '+inf')
+
+async def is_leader():
+    return await get_redis().get(LEADER_KEY) == WORKER_ID
+
+# Cities this worker owns on the consistent-hash ring, and the number of live workers sharing them
+async def owned_city_shard(cities: list, city_keys: dict):
+    await heartbeat()
+    workers = await live_workers() or [WORKER_ID]
+    ring = HashRing(workers)
+    return [city for city in cities if ring.owner(str(city_keys.get(city, city))) == WORKER_ID], len(workers)
+
+# Claim cities for the current interval; returns those no other worker has claimed already
+async def claim_cities(cities: list):
+    if not cities:
+        return []
+    interval = max(1, int(settings.INGEST_INTERVAL_MINUTES * 60))
+    slot = int(time.time() // interval)
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for city in cities:
+            pipe.set(f"ingest_claim:{city}:{slot}", WORKER_ID, nx=True, ex=interval * 2)
+        claimed = await pipe.execute()
+    return [city for city, won in zip(cities, claimed) if won]
+
+# Wrap a scheduled job so that, in sharded mode, only the current leader runs it
+def leader_only(func):
+    @functools.wraps(func)
+    async def wrapper():
+        if settings.INGEST_SHARDING_ENABLED and not await is_leader():
+            return
+        await func()
+    return wrapper
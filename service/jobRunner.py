@@ -0,0 +1,90 @@
+import logging
+import time
+from datetime import datetime
+from config import settings
+from service.metrics import JOB_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Single async-native job runner: jobs are coroutines awaited on the application's event loop.
+# Each job runs at most one instance at a time (an overlapping run is skipped and counted),
+# missed runs within the grace period are coalesced into one catch-up run, and every run is timed.
+class JobRunner:
+    def __init__(self):
+        self.scheduler = None
+        self.stats = {}
+        self._jobs = []
+
+    # Register a job before start(); `run_on_start` also runs it once right after startup
+    def add_job(self, func, trigger: str, name: str = None, jitter: int = None, run_on_start: bool = False, **trigger_args):
+        name = name or func.__name__
+        self._jobs = [job for job in self._jobs if job[2] != name]  # Registering a name again replaces it
+        self._jobs.append((func, trigger, name, jitter, run_on_start, trigger_args))
+        self.stats[name] = {
+            'runs': 0, 'failures': 0, 'skipped': 0, 'missed': 0,
+            'last_started': None, 'last_duration': None, 'max_duration': 0.0, 'total_duration': 0.0,
+        }
+
+    async def _run(self, name: str, func):
+        stats = self.stats[name]
+        stats['last_started'] = datetime.utcnow().isoformat()
+        start = time.perf_counter()
+        outcome = 'success'
+        try:
+            await func()
+        except Exception as e:
+            outcome = 'failure'
+            stats['failures'] += 1
+            logger.error(f"Error in scheduled job {name}: {e}")
+        finally:
+            duration = time.perf_counter() - start
+            JOB_DURATION.labels(name, outcome).observe(duration)
+            stats['runs'] += 1
+            stats['last_duration'] = duration
+            stats['total_duration'] += duration
+            stats['max_duration'] = max(stats['max_duration'], duration)
+
+    def _on_event(self, event):
+        from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+        stats = self.stats.get(event.job_id)
+        if stats is not None:
+            stats['skipped' if event.code == EVENT_JOB_MAX_INSTANCES else 'missed'] += 1
+
+    # Must be called from the running event loop (the FastAPI lifespan)
+    def start(self):
+        # APScheduler is only imported by workers that run jobs
+        from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        self.scheduler = AsyncIOScheduler(
+            timezone='UTC',
+            job_defaults={
+                'max_instances': 1,
+                'coalesce': True,
+                'misfire_grace_time': settings.JOB_MISFIRE_GRACE_SECONDS,
+            },
+        )
+        self.scheduler.add_listener(self._on_event, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+        for func, trigger, name, jitter, run_on_start, trigger_args in self._jobs:
+            job_args = {'next_run_time': datetime.now(self.scheduler.timezone)} if run_on_start else {}
+            if jitter is not None:
+                job_args['jitter'] = jitter  # Not accepted by the one-shot 'date' trigger
+            self.scheduler.add_job(self._run, trigger, args=(name, func), id=name, name=name, **trigger_args, **job_args)
+        self.scheduler.start()
+
+    def shutdown(self):
+        if self.scheduler is not None and self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        self.scheduler = None
+
+    def job_stats(self):
+        jobs = {}
+        for name, stats in self.stats.items():
+            job = self.scheduler.get_job(name) if self.scheduler is not None else None
+            jobs[name] = {
+                **stats,
+                'average_duration': stats['total_duration'] / stats['runs'] if stats['runs'] else None,
+                'next_run_time': job.next_run_time.isoformat() if job and job.next_run_time else None,
+            }
+        return jobs
+
+job_runner = JobRunner()
@@ -0,0 +1,29 @@
+import hashlib
+import time
+from config import settings
+from service.responses import dumps
+
+# Serialized GET /api/weather payload shared by all requests in this worker, with a content ETag
+# and its compressed forms (filled on first use per encoding).
+# Ingestion invalidates it; other workers pick up new readings once it is older than max_age.
+class LatestWeatherSnapshot:
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self.body = None
+        self.etag = None
+        self.encoded = {}
+        self.loaded_at = 0.0
+
+    def is_fresh(self):
+        return self.body is not None and time.monotonic() - self.loaded_at < self.max_age
+
+    def update(self, payload: dict):
+        self.body = dumps(payload)
+        self.encoded = {}
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+        self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self.loaded_at = 0.0
+
+latest_snapshot = LatestWeatherSnapshot(settings.LATEST_SNAPSHOT_MAX_AGE)
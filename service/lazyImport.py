@@ -0,0 +1,17 @@
+import importlib.util
+import sys
+
+# Import a module whose code only runs on first attribute access. Used for heavy optional subsystems
+# (e.g. numpy for the series store), so importing the service layer, CLIs and workers that never use
+# them stays fast.
+def lazy_import(name: str):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
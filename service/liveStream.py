@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from config import settings
+from service.cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Live push channel. Ingestion and alert creation publish events to one Redis pub/sub channel; every
+# worker runs a LiveHub that listens on it and fans each event out to its own SSE/WebSocket subscribers,
+# filtered by city. Readings are published as deltas: only the fields that changed since the city's
+# previous reading (cities with no change are skipped), and new subscribers first get a full snapshot.
+LIVE_CHANNEL = 'weather_updates'
+PUBLISH_BATCH_SIZE = 500  # Events per pub/sub message
+READING_FIELDS = ('main', 'description', 'temp_celsius', 'feels_like', 'humidity', 'wind_speed', 'pressure', 'visibility')
+
+# One connected client: a bounded queue of (event type, JSON text) frames for the cities it follows (None = all)
+class Subscriber:
+    def __init__(self, cities: set = None):
+        self.cities = cities
+        self.queue = asyncio.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+        self.closed = False
+
+class LiveHub:
+    def __init__(self):
+        self.by_city = defaultdict(set)
+        self.all_cities = set()
+        self.state = {}  # city -> latest full reading, kept up to date from the deltas
+        self._seeded = set()  # Cities already looked up in the database for a snapshot
+        self.stats = {'subscribers': 0, 'events': 0, 'delivered': 0, 'dropped_subscribers': 0}
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for subscriber in list(self.all_cities) + [s for subs in self.by_city.values() for s in subs]:
+            self._close(subscriber)
+
+    # Raises OverflowError when LIVE_MAX_SUBSCRIBERS clients are already connected to this worker
+    def subscribe(self, cities: set = None):
+        if self.stats['subscribers'] >= settings.LIVE_MAX_SUBSCRIBERS:
+            raise OverflowError("Too many live subscribers")
+        subscriber = Subscriber(cities)
+        if cities is None:
+            self.all_cities.add(subscriber)
+        else:
+            for city in cities:
+                self.by_city[city].add(subscriber)
+        self.stats['subscribers'] += 1
+        return subscriber
+
+    def update_subscription(self, subscriber: Subscriber, add: set = (), remove: set = ()):
+        if subscriber.cities is None:
+            return
+        for city in add:
+            self.by_city[city].add(subscriber)
+        for city in remove:
+            self._discard(city, subscriber)
+        subscriber.cities = (subscriber.cities | set(add)) - set(remove)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self.all_cities:
+            self.all_cities.discard(subscriber)
+        for city in subscriber.cities or ():
+            self._discard(city, subscriber)
+        if not subscriber.closed:
+            subscriber.closed = True
+            self.stats['subscribers'] -= 1
+
+    def _discard(self, city: str, subscriber: Subscriber):
+        subscribers = self.by_city.get(city)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.by_city[city]
+
+    # Disconnect a subscriber: drop its backlog and wake its stream with the end-of-stream marker
+    def _close(self, subscriber: Subscriber):
+        self.unsubscribe(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    # Current full readings for the given cities (all when None); cities not seen yet are left out
+    def snapshot(self, cities: set = None):
+        if cities is None:
+            return list(self.state.values())
+        return [self.state[city] for city in cities if city in self.state]
+
+    # Cities whose state has to come from the database before a snapshot; each is only reported once
+    def unseeded(self, cities: set):
+        missing = {city for city in cities if city not in self.state and city not in self._seeded}
+        self._seeded |= missing
+        return missing
+
+    def seed(self, readings: list):
+        for reading in readings:
+            self.state.setdefault(reading['city'], reading)
+
+    # Dispatch one pub/sub message (a JSON list of events). Each event is serialized once and the same
+    # frame is queued for every subscriber following its city; subscribers following all cities get the
+    # whole message as one 'batch' frame, so a full ingest cycle doesn't overrun their queue.
+    # A subscriber whose queue is full is too slow to keep up and gets disconnected (it can reconnect
+    # and start again from a snapshot) rather than holding up everyone else.
+    def dispatch(self, data: str):
+        events = json.loads(data)
+        for event in events:
+            city = event['city']
+            if event['type'] == 'reading':
+                self.state[city] = {**self.state.get(city, {'city': city}), **event['changes']}
+            self.stats['events'] += 1
+            subscribers = self.by_city.get(city)
+            if subscribers:
+                self._deliver(list(subscribers), (event['type'], json.dumps(event)))
+        self._deliver(list(self.all_cities), ('batch', data))
+
+    def _deliver(self, subscribers: list, frame: tuple):
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(frame)
+                self.stats['delivered'] += 1
+            except asyncio.QueueFull:
+                self.stats['dropped_subscribers'] += 1
+                self._close(subscriber)
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis().pubsub()
+                await pubsub.subscribe(LIVE_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self.dispatch(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Live stream listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+
+live_hub = LiveHub()
+
+# Last published reading per city, to publish only what changed (per publishing worker)
+_last_published = {}
+
+def reading_event(row: dict):
+    reading = {field: round(row[field], 2) if isinstance(row[field], float) else row[field] for field in READING_FIELDS}
+    previous = _last_published.get(row['city'])
+    _last_published[row['city']] = reading
+    changes = {field: value for field, value in reading.items() if previous is None or previous[field] != value}
+    if not changes:
+        return None
+    return {'type': 'reading', 'city': row['city'], 'changes': {**changes, 'timestamp': row['timestamp'].isoformat()}}
+
+async def publish_events(events: list):
+    if not events:
+        return
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for i in range(0, len(events), PUBLISH_BATCH_SIZE):
+            pipe.publish(LIVE_CHANNEL, json.dumps(events[i:i + PUBLISH_BATCH_SIZE]))
+        await pipe.execute()
+
+# Publish an ingest cycle's readings (as deltas) to every worker's subscribers
+async def publish_readings(rows: list):
+    try:
+        await publish_events([event for event in map(reading_event, rows) if event is not None])
+    except Exception as e:
+        logger.error(f"Error publishing live readings: {e}")
+
+async def publish_alerts(alerts: list):
+    try:
+        await publish_events([
+            {'type': 'alert', 'city': alert['city'], 'alert_type': alert['alert_type'],
+             'alert_message': alert['alert_message'], 'timestamp': alert['timestamp'].isoformat()}
+            for alert in alerts
+        ])
+    except Exception as e:
+        logger.error(f"Error publishing live alerts: {e}")
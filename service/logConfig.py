@@ -0,0 +1,59 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from config import settings
+
+# Application logging. Records are put on an in-memory queue by the calling code (cheap and non-blocking on
+# the event loop) and formatted and written to stdout by a listener thread. LOG_FORMAT=json emits one JSON
+# object per line, with any `extra={...}` fields included. SQL statement logging (SQL_ECHO) goes through
+# the same queue instead of SQLAlchemy's synchronous echo handler.
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+_listener = None
+
+def setup_logging():
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL)
+    logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO if settings.SQL_ECHO else logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)  # One INFO line per upstream request otherwise
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+# Flush queued records and stop the writer thread
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
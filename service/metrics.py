@@ -0,0 +1,125 @@
+import time
+from urllib.parse import urlsplit
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event, exc
+
+# Prometheus metrics for this worker, served at GET /metrics. With several workers each one is scraped
+# separately (or aggregated by the scraper); nothing here is shared through Redis.
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to the start of the response, per route', ('method', 'route', 'status'),
+)
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds', 'OpenWeatherMap call latency, per endpoint and status', ('endpoint', 'status'),
+)
+UPSTREAM_REJECTED = Counter(
+    'upstream_rejected_total', 'Upstream calls not made (circuit open or quota wait too long)', ('reason',),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups per key family and outcome', ('prefix', 'outcome'),
+)
+DB_QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds', 'Statement execution time, per engine and statement type', ('engine', 'statement'),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently checked out of the pool', ('engine',))
+DB_POOL_SIZE = Gauge('db_pool_size', 'Configured pool size (excluding overflow)', ('engine',))
+DB_POOL_OVERFLOW = Gauge('db_pool_overflow', 'Overflow connections currently open', ('engine',))
+DB_POOL_WAIT = Histogram(
+    'db_pool_wait_seconds', 'Time to get a connection from the pool (waiting for a free one, or opening one)', ('engine',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Checkouts that gave up after DB_POOL_TIMEOUT', ('engine',))
+JOB_DURATION = Histogram(
+    'job_duration_seconds', 'Scheduled job run time, per job and outcome', ('job', 'outcome'),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+STARTUP_SECONDS = Gauge('app_startup_seconds', 'Time spent in each startup phase of this worker', ('phase',))
+
+def observe_upstream(url: str, status, duration: float):
+    UPSTREAM_LATENCY.labels(urlsplit(url).path, str(status)).observe(duration)
+
+# Time every statement the engine runs (cursor-level events, so ORM and Core alike), time each pool
+# checkout and expose the pool's checkout state, read at scrape time. `name` labels the engine (write/read).
+def instrument_engine(engine, name: str = 'write'):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        DB_QUERY_LATENCY.labels(name, statement.lstrip().split(None, 1)[0].upper()).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, 'handle_error')
+    def handle_error(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    pool = sync_engine.pool
+    if hasattr(pool, 'checkedout'):
+        DB_POOL_CHECKED_OUT.labels(name).set_function(pool.checkedout)
+        DB_POOL_SIZE.labels(name).set_function(pool.size)
+        DB_POOL_OVERFLOW.labels(name).set_function(lambda: max(pool.overflow(), 0))
+
+    # No pool event fires before a checkout starts waiting, so the pool's own getter is wrapped
+    do_get = pool._do_get
+    wait = DB_POOL_WAIT.labels(name)
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(name).inc()
+            raise
+        finally:
+            wait.observe(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+
+# Matched route template with any router prefix (route.path may or may not include it, depending on the
+# FastAPI version): the request path's leading segments in front of the route's own segments
+def route_template(scope):
+    route = scope.get('route')
+    if route is None:
+        return 'unmatched'
+    segments = scope['path'].rstrip('/').split('/')
+    depth = route.path.rstrip('/').count('/')
+    return '/'.join(segments[:len(segments) - depth]) + route.path
+
+# ASGI middleware recording REQUEST_LATENCY under the matched route template (e.g. /api/weather/{city}),
+# so per-city paths don't each become a series. Streams are timed to their first byte.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        recorded = False
+
+        def record(status):
+            nonlocal recorded
+            if not recorded:
+                recorded = True
+                REQUEST_LATENCY.labels(scope['method'], route_template(scope), str(status)).observe(time.perf_counter() - start)
+
+        async def send_with_metrics(message):
+            if message['type'] == 'http.response.start':
+                record(message['status'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            record(500)
+            raise
+
+def metrics_response():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,82 @@
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Monthly range partitions of weather_data are named weather_data_pYYYY_MM
+PARTITION_PREFIX = 'weather_data_p'
+
+def month_start(day: date):
+    return day.replace(day=1)
+
+def next_month(day: date):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def partition_name(month: date):
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+# Partitioning is Postgres-only; other dialects (e.g. SQLite in benchmarks) keep a plain table
+def is_partitioned_dialect(db: AsyncSession):
+    return db.bind.dialect.name == 'postgresql'
+
+# Create the current month's partition and the next `months_ahead` ones, if missing
+async def ensure_weather_partitions(db: AsyncSession, months_ahead: int = settings.WEATHER_PARTITIONS_AHEAD):
+    if not is_partitioned_dialect(db):
+        return []
+    created = []
+    month = month_start(datetime.utcnow().date())
+    for _ in range(months_ahead + 1):
+        name = partition_name(month)
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF weather_data "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+        ))
+        created.append(name)
+        month = next_month(month)
+    await db.commit()
+    return created
+
+# Drop whole partitions whose month ended before the retention cutoff (no row-by-row DELETE)
+async def drop_expired_weather_partitions(db: AsyncSession, retention_days: int = settings.WEATHER_RETENTION_DAYS):
+    if not is_partitioned_dialect(db):
+        return []
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+    result = await db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+        "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+        "WHERE parent.relname = 'weather_data'"
+    ))
+    dropped = []
+    for name in result.scalars().all():
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        try:
+            month = datetime.strptime(name[len(PARTITION_PREFIX):], '%Y_%m').date()
+        except ValueError:
+            continue
+        if next_month(month) <= cutoff:
+            await db.execute(text(f"ALTER TABLE weather_data DETACH PARTITION {name}"))
+            await db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    await db.commit()
+    return dropped
+
+# Daily maintenance job: keep partitions ahead of ingestion and apply the retention policy.
+# At worker startup only the missing partitions are created (drop_expired=False); dropping is left
+# to the daily job, which runs on the leader alone.
+async def maintain_weather_partitions(drop_expired: bool = True):
+    async with SessionLocal() as db:
+        try:
+            await ensure_weather_partitions(db)
+            if drop_expired:
+                dropped = await drop_expired_weather_partitions(db)
+                if dropped:
+                    logger.warning(f"Dropped expired weather partitions: {', '.join(dropped)}")
+        except Exception as e:
+            logger.error(f"Error maintaining weather partitions: {e}")
+            await db.rollback()
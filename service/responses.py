@@ -0,0 +1,60 @@
+import asyncio
+import gzip
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from config import settings
+
+# Brotli is only offered when the optional `brotli` package is installed; gzip otherwise
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Bodies this large are compressed in a thread rather than on the event loop
+THREAD_COMPRESS_BYTES = 256 * 1024
+
+def dumps(payload):
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+
+# Default response class: orjson serializes datetimes, dates and dataclasses natively
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+# Content-Encoding for a request: brotli when both sides support it, then gzip, else None
+def negotiate_encoding(request: Request):
+    accepted = request.headers.get('accept-encoding', '')
+    if BROTLI_AVAILABLE and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def compress(body: bytes, encoding: str):
+    if encoding == 'br':
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+
+# Response for already serialized JSON, compressed when it is large and the client accepts it.
+# `encoded` optionally caches compressed bodies per encoding (for payloads shared across requests).
+async def encoded_response(request: Request, body: bytes, headers: dict = None, encoded: dict = None):
+    headers = {**(headers or {}), 'Vary': 'Accept-Encoding'}
+    encoding = negotiate_encoding(request) if len(body) >= settings.COMPRESSION_MIN_BYTES else None
+    if encoding is not None:
+        compressed = encoded.get(encoding) if encoded is not None else None
+        if compressed is None:
+            if len(body) >= THREAD_COMPRESS_BYTES:
+                compressed = await asyncio.to_thread(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            if encoded is not None:
+                encoded[encoding] = compressed
+        body = compressed
+        headers['Content-Encoding'] = encoding
+    return Response(content=body, media_type='application/json', headers=headers)
+
+# Serialize a large list/forecast/history payload straight to (compressed) bytes, skipping jsonable_encoder
+async def json_response(request: Request, payload):
+    return await encoded_response(request, dumps(payload))
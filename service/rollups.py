@@ -0,0 +1,144 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import case, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models import WeatherRollup, WeatherRollupCondition
+from config import settings
+from database import SessionLocal, upsert_insert
+
+GRANULARITIES = ('hour', 'day')
+
+def period_start(timestamp: datetime, granularity: str):
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return datetime.combine(timestamp.date(), time.min)
+
+# Fold ingested weather_data rows into the hourly and daily running aggregates.
+# Rows are pre-aggregated per period so each upsert touches every key once; runs in the caller's transaction.
+async def apply_rollups(rows: list, db: AsyncSession):
+    totals = {}
+    condition_counts = defaultdict(int)
+    for row in rows:
+        temp = row['temp_celsius']
+        for granularity in GRANULARITIES:
+            key = (row['city'], granularity, period_start(row['timestamp'], granularity))
+            total = totals.get(key)
+            if total is None:
+                totals[key] = {'readings': 1, 'temp_sum': temp, 'temp_min': temp, 'temp_max': temp}
+            else:
+                total['readings'] += 1
+                total['temp_sum'] += temp
+                total['temp_min'] = min(total['temp_min'], temp)
+                total['temp_max'] = max(total['temp_max'], temp)
+            condition_counts[key + (row['main'],)] += 1
+
+    if not totals:
+        return
+
+    stmt = upsert_insert(db, WeatherRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WeatherRollup.city, WeatherRollup.granularity, WeatherRollup.period_start],
+        set_={
+            'readings': WeatherRollup.readings + stmt.excluded.readings,
+            'temp_sum': WeatherRollup.temp_sum + stmt.excluded.temp_sum,
+            'temp_min': case((stmt.excluded.temp_min < WeatherRollup.temp_min, stmt.excluded.temp_min), else_=WeatherRollup.temp_min),
+            'temp_max': case((stmt.excluded.temp_max > WeatherRollup.temp_max, stmt.excluded.temp_max), else_=WeatherRollup.temp_max),
+        },
+    )
+    await db.execute(stmt, [
+        {'city': city, 'granularity': granularity, 'period_start': start, **total}
+        for (city, granularity, start), total in totals.items()
+    ])
+
+    stmt = upsert_insert(db, WeatherRollupCondition)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WeatherRollupCondition.city, WeatherRollupCondition.granularity,
+                        WeatherRollupCondition.period_start, WeatherRollupCondition.main],
+        set_={'readings': WeatherRollupCondition.readings + stmt.excluded.readings},
+    )
+    await db.execute(stmt, [
+        {'city': city, 'granularity': granularity, 'period_start': start, 'main': main, 'readings': readings}
+        for (city, granularity, start, main), readings in condition_counts.items()
+    ])
+
+def rollup_summary(rollup: WeatherRollup, dominant_condition: str):
+    return {
+        'city': rollup.city,
+        'period_start': rollup.period_start,
+        'readings': rollup.readings,
+        'avg_temp': rollup.temp_sum / rollup.readings,
+        'max_temp': rollup.temp_max,
+        'min_temp': rollup.temp_min,
+        'dominant_condition': dominant_condition,
+    }
+
+# Most frequent condition for one rollup period (ties broken alphabetically)
+async def dominant_condition(db: AsyncSession, city: str, granularity: str, start: datetime):
+    result = await db.execute(
+        select(WeatherRollupCondition.main)
+        .filter(
+            WeatherRollupCondition.city == city,
+            WeatherRollupCondition.granularity == granularity,
+            WeatherRollupCondition.period_start == start,
+        )
+        .order_by(WeatherRollupCondition.readings.desc(), WeatherRollupCondition.main)
+        .limit(1)
+    )
+    return result.scalars().first()
+
+# Live summary for a city's day so far: a primary-key lookup, available at any point in the day.
+# Same shape as a stored DailySummary row (weatherSummary.SUMMARY_COLUMNS).
+async def get_daily_rollup(db: AsyncSession, city: str, day):
+    start = datetime.combine(day, time.min)
+    rollup = await db.get(WeatherRollup, (city, 'day', start))
+    if rollup is None:
+        return None
+    summary = rollup_summary(rollup, await dominant_condition(db, city, 'day', start))
+    return {
+        'city': city,
+        'date': day,
+        'avg_temp': summary['avg_temp'],
+        'max_temp': summary['max_temp'],
+        'min_temp': summary['min_temp'],
+        'dominant_condition': summary['dominant_condition'],
+    }
+
+async def get_hourly_rollups(db: AsyncSession, city: str, day):
+    start = datetime.combine(day, time.min)
+    result = await db.execute(
+        select(WeatherRollup)
+        .filter(
+            WeatherRollup.city == city,
+            WeatherRollup.granularity == 'hour',
+            WeatherRollup.period_start >= start,
+            WeatherRollup.period_start < start + timedelta(days=1),
+        )
+        .order_by(WeatherRollup.period_start)
+    )
+    rollups = result.scalars().all()
+
+    conditions = await db.execute(
+        select(WeatherRollupCondition)
+        .filter(
+            WeatherRollupCondition.city == city,
+            WeatherRollupCondition.granularity == 'hour',
+            WeatherRollupCondition.period_start >= start,
+            WeatherRollupCondition.period_start < start + timedelta(days=1),
+        )
+        .order_by(WeatherRollupCondition.readings.desc(), WeatherRollupCondition.main)
+    )
+    dominant = {}
+    for condition in conditions.scalars().all():
+        dominant.setdefault(condition.period_start, condition.main)
+
+    return [rollup_summary(rollup, dominant.get(rollup.period_start)) for rollup in rollups]
+
+# Daily job: delete rollup periods older than ROLLUP_RETENTION_DAYS. Past days live on as DailySummary rows;
+# the rollups are only read for today and by the day-close catch-up.
+async def purge_expired_rollups():
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=settings.ROLLUP_RETENTION_DAYS), time.min)
+    async with SessionLocal() as db:
+        await db.execute(delete(WeatherRollupCondition).where(WeatherRollupCondition.period_start < cutoff))
+        await db.execute(delete(WeatherRollup).where(WeatherRollup.period_start < cutoff))
+        await db.commit()
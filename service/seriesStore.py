@@ -0,0 +1,250 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.future import select
+from config import settings
+from database import ReadSessionLocal
+from models import WeatherData
+from service.cityCatalog import city_catalog
+from service.lazyImport import lazy_import
+
+np = lazy_import('numpy')  # Loaded when the store first holds a reading
+
+logger = logging.getLogger(__name__)
+
+# Numeric reading columns kept per city, in the order of the `values` array's second axis
+SERIES_FIELDS = ('temp_celsius', 'feels_like', 'humidity', 'wind_speed', 'pressure', 'visibility')
+
+# Weather conditions ("Clear", "Haze", ...) are stored as small integer codes, assigned on first sight
+CONDITIONS = []
+_condition_codes = {}
+
+def condition_code(main: str):
+    code = _condition_codes.get(main)
+    if code is None:
+        code = _condition_codes[main] = len(CONDITIONS)
+        CONDITIONS.append(main)
+    return code
+
+def series_capacity():
+    return settings.SERIES_RETENTION_DAYS * 24 * 60 // settings.INGEST_INTERVAL_MINUTES
+
+def epoch_seconds(timestamp: datetime):
+    return int((timestamp - datetime(1970, 1, 1)).total_seconds())
+
+# Ring buffer of one city's readings as typed columns: int64 epoch seconds, float32 values (NaN where a
+# reading had no value) and uint8 condition codes. Readings are appended in time order. The buffer starts
+# small and doubles up to max_capacity, so rarely refreshed cities stay small; once full, each append
+# overwrites the oldest reading.
+class CitySeries:
+    def __init__(self, max_capacity: int, initial_capacity: int = 64):
+        self.max_capacity = max_capacity
+        capacity = min(initial_capacity, max_capacity)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.full((capacity, len(SERIES_FIELDS)), np.nan, dtype=np.float32)
+        self.conditions = np.zeros(capacity, dtype=np.uint8)
+        self.head = 0  # Next slot to write
+        self.count = 0
+        self.checked_at = 0.0  # Last time the tail was topped up from the database
+
+    def _chronological(self):
+        start = (self.head - self.count) % self.capacity
+        return (np.arange(self.count) + start) % self.capacity
+
+    def _grow(self, capacity: int):
+        order = self._chronological()
+        timestamps = np.zeros(capacity, dtype=np.int64)
+        values = np.full((capacity, len(SERIES_FIELDS)), np.nan, dtype=np.float32)
+        conditions = np.zeros(capacity, dtype=np.uint8)
+        timestamps[:self.count] = self.timestamps[order]
+        values[:self.count] = self.values[order]
+        conditions[:self.count] = self.conditions[order]
+        self.timestamps, self.values, self.conditions = timestamps, values, conditions
+        self.head = self.count
+
+    @property
+    def capacity(self):
+        return len(self.timestamps)
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[self.head - 1]) if self.count else None
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + self.values.nbytes + self.conditions.nbytes
+
+    def append(self, timestamp: int, values: tuple, condition: int):
+        # Out-of-order readings (late retries, backfills) would break the sorted order range queries rely on
+        if self.count and timestamp <= self.last_timestamp:
+            return False
+        if self.count == self.capacity and self.capacity < self.max_capacity:
+            self._grow(min(self.capacity * 2, self.max_capacity))
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = [np.nan if value is None else value for value in values]
+        self.conditions[self.head] = condition
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    # Chronological (timestamps, values, conditions) with since <= timestamp < until
+    def window(self, since: int, until: int):
+        order = self._chronological()
+        timestamps = self.timestamps[order]
+        lo, hi = np.searchsorted(timestamps, [since, until])
+        order = order[lo:hi]
+        return timestamps[lo:hi], self.values[order], self.conditions[order]
+
+# In-process store of recent readings for every city this worker has seen, fed by ingestion and warmed from the DB
+class SeriesStore:
+    def __init__(self):
+        self.series = {}
+
+    def append_rows(self, rows: list):
+        for row in rows:
+            series = self.series.get(row['city'])
+            if series is None:
+                series = self.series[row['city']] = CitySeries(series_capacity())
+            series.append(
+                epoch_seconds(row['timestamp']),
+                tuple(row.get(field) for field in SERIES_FIELDS),
+                condition_code(row.get('main') or ''),
+            )
+
+    # Rebuild a city from database rows (city, timestamp, *SERIES_FIELDS, main) in timestamp order,
+    # keeping any readings ingested meanwhile that are newer than what the database returned
+    def load_rows(self, city: str, rows: list):
+        previous = self.series.get(city)
+        series = CitySeries(series_capacity())
+        append_db_rows(series, rows)
+        if previous is not None and previous.count:
+            timestamps, values, conditions = previous.window(series.last_timestamp or 0, 2 ** 62)
+            for timestamp, reading, condition in zip(timestamps, values, conditions):
+                series.append(int(timestamp), tuple(reading), int(condition))
+        series.checked_at = time.time()
+        self.series[city] = series
+
+    def stats(self):
+        nbytes = sum(series.nbytes for series in self.series.values())
+        return {
+            'cities': len(self.series),
+            'readings': sum(series.count for series in self.series.values()),
+            'max_capacity_per_city': series_capacity(),
+            'bytes': nbytes,
+            'bytes_per_city': nbytes // len(self.series) if self.series else 0,
+        }
+
+series_store = SeriesStore()
+
+def append_db_rows(series: CitySeries, rows: list):
+    for row in rows:
+        series.append(epoch_seconds(row[1]), row[2:-1], condition_code(row[-1] or ''))
+
+def series_query(cities: list, since: datetime):
+    return (
+        select(WeatherData.city, WeatherData.timestamp, *(getattr(WeatherData, field) for field in SERIES_FIELDS), WeatherData.main)
+        .filter(WeatherData.city.in_(cities), WeatherData.timestamp >= since)
+        .order_by(WeatherData.city, WeatherData.timestamp)
+    )
+
+async def load_series(db, cities: list, since: datetime):
+    result = await db.stream(series_query(cities, since).execution_options(yield_per=10000))
+    city, rows = None, []
+    async for row in result:
+        if row[0] != city:
+            if city is not None:
+                series_store.load_rows(city, rows)
+            city, rows = row[0], []
+        rows.append(row)
+    if city is not None:
+        series_store.load_rows(city, rows)
+
+# Fill the store with the retention window for every catalog city, streamed in chunks of cities.
+# Runs once as a background job after startup, so the app serves requests meanwhile.
+async def warm_series_store():
+    since = datetime.utcnow() - timedelta(days=settings.SERIES_RETENTION_DAYS)
+    names = city_catalog.names
+    async with ReadSessionLocal() as db:
+        for i in range(0, len(names), 500):
+            await load_series(db, names[i:i + 500], since)
+    logger.info(f"Warmed series store: {series_store.stats()}")
+
+# Load a city that isn't in the store yet (not warmed, or only seen through ingestion) with its full
+# retention window. With sharded ingestion this worker only ingests its own shard, so every city's tail
+# is also topped up from the database (newest readings only), at most once per ingest interval.
+async def refresh_series(db, city: str):
+    series = series_store.series.get(city)
+    now = time.time()
+    if series is None or not series.checked_at:
+        since = datetime.utcnow() - timedelta(days=settings.SERIES_RETENTION_DAYS)
+        result = await db.execute(series_query([city], since))
+        series_store.load_rows(city, result.all())
+    elif settings.INGEST_SHARDING_ENABLED and now - series.checked_at >= settings.INGEST_INTERVAL_MINUTES * 60:
+        since = datetime.utcfromtimestamp(series.last_timestamp + 1) if series.count else datetime.utcnow() - timedelta(days=settings.SERIES_RETENTION_DAYS)
+        result = await db.execute(series_query([city], since))
+        append_db_rows(series, result.all())
+        series.checked_at = now
+
+# Series for a catalog city: from the store, or (with the store disabled) built from the database per request
+async def get_city_series(db, city: str):
+    if not settings.SERIES_STORE_ENABLED:
+        since = datetime.utcnow() - timedelta(days=settings.SERIES_RETENTION_DAYS)
+        result = await db.execute(series_query([city], since))
+        series = CitySeries(series_capacity())
+        append_db_rows(series, result.all())
+        return series
+    await refresh_series(db, city)
+    return series_store.series[city]
+
+def _json_floats(values):
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+# Readings of one city between since and until: raw when bucket_minutes is 0, otherwise downsampled
+# to min/max/avg per bucket plus the bucket's reading count and dominant condition. Empty buckets are omitted.
+def query_series(series: CitySeries, city: str, since: datetime, until: datetime, bucket_minutes: int = 0, fields: tuple = SERIES_FIELDS):
+    timestamps, values, conditions = series.window(epoch_seconds(since), epoch_seconds(until))
+    columns = [SERIES_FIELDS.index(field) for field in fields]
+    values = values[:, columns]
+
+    if not bucket_minutes or not len(timestamps):
+        return {
+            'city': city,
+            'bucket_minutes': 0,
+            'timestamps': [datetime.utcfromtimestamp(int(ts)).isoformat() for ts in timestamps],
+            'main': [CONDITIONS[code] for code in conditions],
+            **{field: _json_floats(values[:, i]) for i, field in enumerate(fields)},
+        }
+
+    # Buckets are aligned to multiples of bucket_minutes since the epoch. Timestamps are sorted,
+    # so bucket members are contiguous and reduceat works on each run.
+    bucket_seconds = bucket_minutes * 60
+    buckets = timestamps // bucket_seconds
+    starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0])
+    counts = np.diff(np.r_[starts, len(timestamps)])
+
+    present = ~np.isnan(values)
+    mins = np.fmin.reduceat(values, starts, axis=0)
+    maxs = np.fmax.reduceat(values, starts, axis=0)
+    sums = np.add.reduceat(np.where(present, values, 0), starts, axis=0)
+    present_counts = np.add.reduceat(present, starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avgs = sums / present_counts
+
+    bucket_ids = np.repeat(np.arange(len(starts)), counts)
+    condition_counts = np.zeros((len(starts), max(len(CONDITIONS), 1)), dtype=np.int32)
+    np.add.at(condition_counts, (bucket_ids, conditions), 1)
+
+    return {
+        'city': city,
+        'bucket_minutes': bucket_minutes,
+        'timestamps': [
+            datetime.utcfromtimestamp(int(bucket) * bucket_seconds).isoformat()
+            for bucket in buckets[starts]
+        ],
+        'count': counts.tolist(),
+        'main': [CONDITIONS[code] for code in condition_counts.argmax(axis=1)],
+        **{
+            field: {'min': _json_floats(mins[:, i]), 'max': _json_floats(maxs[:, i]), 'avg': _json_floats(avgs[:, i])}
+            for i, field in enumerate(fields)
+        },
+    }
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from config import settings
+from database import ReadSessionLocal
+from service.cache import cache_get
+from service.cityCatalog import city_catalog, demanded_cities
+from service.forecast import FORECAST_CACHE_PREFIX
+from service.latestSnapshot import latest_snapshot
+from service.seriesStore import load_series
+from service.weatherFetch import get_latest_readings
+
+logger = logging.getLogger(__name__)
+
+# Top cities to warm before a worker reports ready: recently requested ones first, then the hot tier
+async def warmup_cities(limit: int):
+    try:
+        demanded = await demanded_cities()
+    except Exception as e:
+        logger.warning(f"Could not read city demand for warmup: {e}")
+        demanded = set()
+    cities = [name for name in city_catalog.names if name in demanded]
+    cities += [city.name for city in city_catalog.cities if city.tier == 'hot' and city.name not in demanded]
+    return cities[:limit]
+
+# Pre-populate this worker's caches without calling upstream: the GET /api/weather snapshot, current weather
+# and forecasts for the top cities (Redis -> in-process cache) and their recent series. Returns per-step timings.
+async def warm_caches():
+    timings = {}
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    cities = await warmup_cities(settings.STARTUP_WARMUP_CITIES)
+    timings['select_cities'] = loop.time() - start
+
+    if settings.LATEST_SNAPSHOT_ENABLED:
+        start = loop.time()
+        async with ReadSessionLocal() as db:
+            latest_snapshot.update({"weather": await get_latest_readings(db, city_catalog.names)})
+        timings['latest_snapshot'] = loop.time() - start
+
+    start = loop.time()
+    await asyncio.gather(
+        *(cache_get(f"weather_data_{city}") for city in cities),
+        *(cache_get(f"{FORECAST_CACHE_PREFIX}{city}", compressed=True) for city in cities),
+    )
+    timings['local_cache'] = loop.time() - start
+
+    if settings.SERIES_STORE_ENABLED and cities:
+        start = loop.time()
+        async with ReadSessionLocal() as db:
+            await load_series(db, cities, datetime.utcnow() - timedelta(days=settings.SERIES_RETENTION_DAYS))
+        timings['series_store'] = loop.time() - start
+
+    logger.info(f"Warmed caches for {len(cities)} cities", extra={'timings': timings})
+    return timings
@@ -1,135 +1,208 @@
 import asyncio
-import httpx
-import redis
+import logging
 from datetime import datetime
-from models import WeatherData
+from models import WeatherData, LatestWeather
 from config import settings
-from database import SessionLocal
-import json
-from sqlalchemy import func
+from database import SessionLocal, in_chunks, upsert_insert
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError, StatementError
 from sqlalchemy.ext.asyncio import AsyncSession
-from apscheduler.schedulers.background import BackgroundScheduler
 from sqlalchemy.future import select
-from fastapi import APIRouter, HTTPException
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from fastapi import HTTPException
+from service.httpClient import upstream_get
+from service.cache import cache_get_many, cache_set_many, get_or_load
+from service.latestSnapshot import latest_snapshot
+from service.rollups import apply_rollups
+from service.ingestSharding import owned_city_shard, claim_cities
+from service.cityCatalog import city_catalog, refresh_scheduler, demanded_cities
+from service.seriesStore import series_store
+from service.liveStream import publish_readings
+
+logger = logging.getLogger(__name__)
 
-router = APIRouter()
-
-CITIES = ['Delhi', 'Mumbai', 'Chennai', 'Bengaluru', 'Kolkata', 'Hyderabad']
 REDIS_EXPIRY_TIME = 299  # Cache expiry time in seconds (5 minutes)
-
-scheduler = BackgroundScheduler()
-
-# Initialize Redis client
-redis_client = redis.StrictRedis.from_url(settings.REDIS_URL, decode_responses=True)
+GROUP_BATCH_SIZE = 20  # The group endpoint accepts at most 20 city IDs per request
 
 # Fetch current weather data from OpenWeatherMap API
 async def fetch_weather_data(city: str):
     cache_key = f"weather_data_{city}"
-    cached_data = redis_client.get(cache_key)
-
-    if cached_data:
-        return json.loads(cached_data)  # Return cached data if available
-
-    url = f'http://pro.openweathermap.org/data/2.5/weather?q={city}&appid={settings.OPENWEATHER_API_KEY}'
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Error fetching data from OpenWeatherMap.")
-        weather_data = response.json()
-
-        # Cache the weather data
-        redis_client.setex(cache_key, REDIS_EXPIRY_TIME, json.dumps(weather_data))
-        return weather_data
-
-lock = asyncio.Lock()
-
-# Process and store weather data in DB with temperature conversion based on user preference
-async def process_weather_data(data, db: AsyncSession, user_pref_celsius=True):
+    return await get_or_load(cache_key, REDIS_EXPIRY_TIME, lambda: fetch_weather_from_api(city))
+
+# Catalog cities are looked up by ID, which avoids ambiguous free-text matches upstream
+async def fetch_weather_from_api(city: str):
+    url = f'{settings.OPENWEATHER_BASE_URL}/data/2.5/weather'
+    city_id = city_catalog.id_for(city)
+    params = {'id': city_id} if city_id is not None else {'q': city}
+    response = await upstream_get(url, params={**params, 'appid': settings.OPENWEATHER_API_KEY})
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Error fetching data from OpenWeatherMap.")
+    return response.json()
+
+# Fetch one group-endpoint batch and split the response back per city
+async def fetch_weather_group(cities: list):
+    ids_to_city = {city_catalog.id_for(city): city for city in cities}
+    url = f'{settings.OPENWEATHER_BASE_URL}/data/2.5/group'
+    params = {'id': ','.join(str(city_id) for city_id in ids_to_city), 'appid': settings.OPENWEATHER_API_KEY}
+    response = await upstream_get(url, params=params)
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Error fetching group data from OpenWeatherMap.")
+
+    return {
+        ids_to_city[item['id']]: item
+        for item in response.json().get('list', [])
+        if item.get('id') in ids_to_city
+    }
+
+# Fetch current weather for many cities, batching cache misses through the group endpoint
+async def fetch_weather_data_bulk(cities: list):
+    results = {}
+    cached_values = await cache_get_many([f"weather_data_{city}" for city in cities])
+    missing = []
+    for city, cached_data in zip(cities, cached_values):
+        if cached_data is not None:
+            results[city] = cached_data
+        else:
+            missing.append(city)
+
+    grouped = [city for city in missing if city_catalog.id_for(city) is not None]
+    batches = [grouped[i:i + GROUP_BATCH_SIZE] for i in range(0, len(grouped), GROUP_BATCH_SIZE)]
+    batch_results = await asyncio.gather(*(fetch_weather_group(batch) for batch in batches), return_exceptions=True)
+
+    fetched = {}
+    for batch, batch_result in zip(batches, batch_results):
+        if isinstance(batch_result, Exception):
+            logger.error(f"Error fetching weather group {batch}: {batch_result}")
+            continue
+        fetched.update(batch_result)
+
+    # Cities without a known ID, or dropped from a failed batch, fall back to the single-city endpoint
+    fallback = [city for city in missing if city not in fetched]
+    fallback_results = await asyncio.gather(*(fetch_weather_data(city) for city in fallback), return_exceptions=True)
+    for city, data in zip(fallback, fallback_results):
+        if isinstance(data, Exception):
+            logger.error(f"Error fetching weather data for {city}: {data}")
+            continue
+        results[city] = data
+
+    if fetched:
+        await cache_set_many({f"weather_data_{city}": data for city, data in fetched.items()}, REDIS_EXPIRY_TIME)
+        results.update(fetched)
+
+    return results
+
+# Convert an OpenWeatherMap payload into a weather_data row, with temperature conversion based on user preference.
+# `city` overrides the upstream name, which can differ from ours for ID-based lookups (e.g. Bengaluru/Bangalore).
+def parse_weather_data(data, user_pref_celsius=True, city=None):
+    temp_kelvin = data['main']['temp']
+    feels_like_kelvin = data['main']['feels_like']
+
+    temp_celsius = temp_kelvin - 273.15 if user_pref_celsius else (temp_kelvin - 273.15) * 9 / 5 + 32
+    feels_like = feels_like_kelvin - 273.15 if user_pref_celsius else (feels_like_kelvin - 273.15) * 9 / 5 + 32
+
+    return {
+        'city': city or data['name'],
+        'main': data['weather'][0]['main'],
+        'description': data['weather'][0]['description'],
+        'temp_celsius': temp_celsius,
+        'feels_like': feels_like,
+        'humidity': data['main']['humidity'],
+        'wind_speed': data['wind']['speed'],
+        'pressure': data['main']['pressure'],
+        'visibility': data.get('visibility'),  # Absent from some payloads, e.g. history entries
+        'timestamp': datetime.utcnow(),
+    }
+
+# Errors caused by the values of particular rows (constraint violations, out-of-range or unbindable values).
+# Drivers map these to different DBAPI classes (asyncpg: InterfaceError or plain DBAPIError, SQLite: ProgrammingError),
+# so any statement error counts unless the connection itself is gone; pool timeouts aren't statement errors at all.
+def is_row_error(e: Exception):
+    if isinstance(e, DBAPIError):
+        return not (e.connection_invalidated or isinstance(e, OperationalError))
+    return isinstance(e, StatementError)
+
+# Write a whole cycle of readings as one executemany insert in a single transaction,
+# together with the latest_weather upsert and the hourly/daily rollups, then feed the in-memory series store.
+# If the batch fails on bad rows it is bisected and retried, so only the offending rows are dropped; any other
+# error (connection, pool timeout, ...) is raised after one rollback, failing the whole cycle.
+# Returns the rows actually stored.
+async def store_weather_batch(rows: list, db: AsyncSession):
+    if not rows:
+        return []
     try:
-        
-        temp_kelvin = data['main']['temp']
-        feels_like_kelvin = data['main']['feels_like']
-        humidity = data['main']['humidity']
-        wind_speed = data['wind']['speed']
-        main_condition = data['weather'][0]['main']
-        description = data['weather'][0]['description']
-        pressure = data['main']['pressure']
-        visibility = data['visibility']
-        
-        
-        temp_celsius = temp_kelvin - 273.15 if user_pref_celsius else (temp_kelvin - 273.15) * 9 / 5 + 32
-        feels_like = feels_like_kelvin - 273.15 if user_pref_celsius else (feels_like_kelvin - 273.15) * 9 / 5 + 32
-
-        
-        weather_data = WeatherData(
-            city=data['name'],
-            main=main_condition,
-            description=description,
-            temp_celsius=temp_celsius,
-            feels_like=feels_like,
-            humidity=humidity,
-            wind_speed=wind_speed,
-            pressure=pressure,
-            visibility=visibility,
-            timestamp=datetime.utcnow() 
-        )
-        db.add(weather_data)  # Add the new weather data entry to the session
-        await db.commit() 
-        return weather_data  
-
+        await db.execute(insert(WeatherData), rows)
+        await upsert_latest_weather(rows, db)
+        await apply_rollups(rows, db)
+        await db.commit()
+        series_store.append_rows(rows)
+        return rows
     except Exception as e:
-        print(f"Error processing weather data: {e}")
         await db.rollback()
-
-
-
-async def get_weather_data_from_db(db: AsyncSession, cities: list):
-    subquery = (
-        select(
-            WeatherData.city,
-            func.max(WeatherData.timestamp).label('latest_timestamp')
-        )
-        .filter(WeatherData.city.in_(cities))
-        .group_by(WeatherData.city)
-        .subquery()
+        if not is_row_error(e):
+            raise
+        if len(rows) == 1:
+            logger.warning(f"Dropping weather reading for {rows[0]['city']}: {e}")
+            return []
+        middle = len(rows) // 2
+        return await store_weather_batch(rows[:middle], db) + await store_weather_batch(rows[middle:], db)
+
+# Keep latest_weather pointing at each city's newest reading (older readings never overwrite newer ones)
+async def upsert_latest_weather(rows: list, db: AsyncSession):
+    stmt = upsert_insert(db, LatestWeather)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LatestWeather.city],
+        set_={column: stmt.excluded[column] for column in rows[0] if column != 'city'},
+        where=LatestWeather.timestamp <= stmt.excluded.timestamp,
     )
+    await db.execute(stmt, rows)
 
-    query = (
-        select(WeatherData)
-        .join(subquery, (WeatherData.city == subquery.c.city) & (WeatherData.timestamp == subquery.c.latest_timestamp))
-    )
+# Latest reading per city: a primary-key read of latest_weather, independent of history size
+LATEST_COLUMNS = ('city', 'main', 'description', 'temp_celsius', 'feels_like', 'humidity', 'wind_speed', 'pressure', 'visibility', 'timestamp')
 
-    result = await db.execute(query)  
-    return result.scalars().all() 
+# Latest reading per city as plain dicts, selected column-wise (no ORM objects); timestamps stay datetimes for orjson
+async def get_latest_readings(db: AsyncSession, cities: list):
+    readings = []
+    for names in in_chunks(cities):
+        result = await db.execute(
+            select(*(getattr(LatestWeather, column) for column in LATEST_COLUMNS)).filter(LatestWeather.city.in_(names))
+        )
+        readings.extend(dict(zip(LATEST_COLUMNS, row)) for row in result.all())
+    return readings
 
-scheduler = AsyncIOScheduler()
 
+# Cities one ingest cycle may fetch: INGEST_QUOTA_SHARE of the upstream quota over the interval, as group calls
+def ingest_budget(worker_count: int = 1):
+    calls = settings.OPENWEATHER_RATE_LIMIT_PER_MINUTE * settings.INGEST_INTERVAL_MINUTES * settings.INGEST_QUOTA_SHARE
+    return max(1, int(calls / worker_count)) * GROUP_BATCH_SIZE
 
-async def fetch_and_process_city_weather(city: str):
-    async with SessionLocal() as db:  
+# Main scheduled task: fetch the catalog cities that are due (hot first, within the quota budget),
+# store the cycle in one batch and push what changed to live subscribers
+async def scheduled_fetch_weather():
+    cities, worker_count = city_catalog.names, 1
+    # With several workers, each schedules only its ring shard and fetches the cities it claimed for this interval
+    if settings.INGEST_SHARDING_ENABLED:
+        cities, worker_count = await owned_city_shard(cities, city_catalog.ids)
+    cities = refresh_scheduler.select_due(cities, await demanded_cities(), ingest_budget(worker_count))
+    if settings.INGEST_SHARDING_ENABLED:
+        cities = await claim_cities(cities)
+    weather_by_city = await fetch_weather_data_bulk(cities)
+    refresh_scheduler.mark_refreshed(weather_by_city)
+
+    rows = []
+    for city, data in weather_by_city.items():
         try:
-            weather_data = await fetch_weather_data(city)
-            await process_weather_data(weather_data, db) 
+            rows.append(parse_weather_data(data, city=city))
         except Exception as e:
-            print(f"Error processing weather data for {city}: {e}")
-        finally:
-            await db.close() 
-
-# Main scheduled task to fetch weather data for all cities
-async def scheduled_fetch_weather():
-    tasks = [fetch_and_process_city_weather(city) for city in CITIES]
-    await asyncio.gather(*tasks)  # Running all the fetch and process tasks concurrently
-
-# Start the scheduler
-scheduler.add_job(scheduled_fetch_weather, 'interval', minutes=5)
-scheduler.start()
-
-# To keep the event loop running
-if __name__ == "__main__":
-    loop = asyncio.get_event_loop()
-    try:
-        loop.run_forever()
-    except (KeyboardInterrupt, SystemExit):
-        pass
+            logger.error(f"Error processing weather data for {city}: {e}")
 
+    async with SessionLocal() as db:
+        try:
+            stored = await store_weather_batch(rows, db)
+        except Exception as e:
+            logger.error(f"Giving up on storing this cycle's {len(rows)} weather readings: {e}")
+            raise
+    latest_snapshot.invalidate()
+    # Only what was stored goes out, so subscribers never see readings that bisection dropped
+    if stored:
+        await publish_readings(stored)
+    if len(stored) < len(rows):
+        logger.info(f"Stored {len(stored)} of {len(rows)} weather readings")
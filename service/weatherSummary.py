@@ -1,73 +1,160 @@
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from datetime import datetime
-from models import WeatherData, DailySummary
-from sqlalchemy import func
-import json
-from service.weatherFetch import CITIES, redis_client
-from database import get_db
+from datetime import datetime, time, timedelta
+from models import WeatherData, DailySummary, WeatherRollup, WeatherRollupCondition
+from sqlalchemy import func, and_
+from service.cityCatalog import city_catalog
+from database import SessionLocal, in_chunks, upsert_insert
+from service.rollups import rollup_summary
 
-async def calculate_daily_summaries(db: AsyncSession):
-    try:
-        today = datetime.utcnow().date()
-        for city in CITIES:
-            cache_key = f"daily_summary_{city}_{today}"
-            cached_summary = redis_client.get(cache_key)
+logger = logging.getLogger(__name__)
+
+DAILY_SUMMARY_CATCHUP_DAYS = 7  # Closed days checked for missing summaries after a restart
 
-            if cached_summary:
-                continue  
+# Build the daily aggregates for every city in one range-scan query:
+# avg/max/min temperature per city, joined to the most frequent condition (ties broken alphabetically)
+def daily_summary_query(day, cities: list):
+    day_start = datetime.combine(day, time.min)
+    in_day = and_(
+        WeatherData.city.in_(cities),
+        WeatherData.timestamp >= day_start,
+        WeatherData.timestamp < day_start + timedelta(days=1),
+    )
 
-            result = await db.execute(
-                select(
-                    func.avg(WeatherData.temp_celsius).label('avg_temp'),
-                    func.max(WeatherData.temp_celsius).label('max_temp'),
-                    func.min(WeatherData.temp_celsius).label('min_temp'),
-                    WeatherData.main
-                ).filter(
-                    WeatherData.city == city,
-                    func.date(WeatherData.timestamp) == today
-                ).group_by(WeatherData.main) 
-            )
-            results = result.all()
+    stats = (
+        select(
+            WeatherData.city,
+            func.avg(WeatherData.temp_celsius).label('avg_temp'),
+            func.max(WeatherData.temp_celsius).label('max_temp'),
+            func.min(WeatherData.temp_celsius).label('min_temp'),
+        )
+        .filter(in_day)
+        .group_by(WeatherData.city)
+        .subquery()
+    )
+    condition_counts = (
+        select(WeatherData.city, WeatherData.main, func.count().label('readings'))
+        .filter(in_day)
+        .group_by(WeatherData.city, WeatherData.main)
+        .subquery()
+    )
+    ranked_conditions = select(
+        condition_counts.c.city,
+        condition_counts.c.main,
+        func.row_number().over(
+            partition_by=condition_counts.c.city,
+            order_by=(condition_counts.c.readings.desc(), condition_counts.c.main),
+        ).label('rank'),
+    ).subquery()
 
-            if not results:
-                continue  # Skip if no results
+    return (
+        select(stats.c.city, stats.c.avg_temp, stats.c.max_temp, stats.c.min_temp, ranked_conditions.c.main)
+        .join(ranked_conditions, and_(ranked_conditions.c.city == stats.c.city, ranked_conditions.c.rank == 1))
+    )
 
-            # average, max, min temperatures
-            avg_temp, max_temp, min_temp, _ = results[0]
+# Shape of a daily summary, shared with the live rollup (rollups.get_daily_rollup)
+SUMMARY_COLUMNS = ('city', 'date', 'avg_temp', 'max_temp', 'min_temp', 'dominant_condition')
 
-            # dominant condition based on most frequent weather condition during the day
-            weather_conditions_result = await db.execute(
-                select(WeatherData.main).filter(
-                    WeatherData.city == city,
-                    func.date(WeatherData.timestamp) == today
-                )
-            )
-            weather_conditions = weather_conditions_result.scalars().all()
-            
-            if weather_conditions:
-                dominant_condition = max(set(weather_conditions), key=weather_conditions.count)
-            else:
-                dominant_condition = None  # case with no weather data
+# Stored summary of one city and day as a plain dict, or None
+async def get_daily_summary_row(db: AsyncSession, city: str, day):
+    result = await db.execute(
+        select(*(getattr(DailySummary, column) for column in SUMMARY_COLUMNS))
+        .filter(DailySummary.city == city, DailySummary.date == day)
+    )
+    row = result.first()
+    return dict(zip(SUMMARY_COLUMNS, row)) if row is not None else None
 
-            summary = DailySummary(
-                city=city,
-                date=today,
-                avg_temp=avg_temp,
-                max_temp=max_temp,
-                min_temp=min_temp,
-                dominant_condition=dominant_condition
-            )
-            db.add(summary)
+# Upsert summaries keyed on (city, date), so reruns for the same day overwrite instead of duplicating
+async def upsert_daily_summaries(db: AsyncSession, summaries: list):
+    if not summaries:
+        return
+    stmt = upsert_insert(db, DailySummary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySummary.city, DailySummary.date],
+        set_={column: stmt.excluded[column] for column in ('avg_temp', 'max_temp', 'min_temp', 'dominant_condition')},
+    )
+    await db.execute(stmt, summaries)
 
+async def calculate_daily_summaries(db: AsyncSession, day=None):
+    try:
+        day = day or datetime.utcnow().date()
+        rows = []
+        for names in in_chunks(city_catalog.names):
+            rows.extend((await db.execute(daily_summary_query(day, names))).all())
+        summaries = [
+            {
+                'city': city,
+                'date': day,
+                'avg_temp': avg_temp,
+                'max_temp': max_temp,
+                'min_temp': min_temp,
+                'dominant_condition': dominant_condition,
+            }
+            for city, avg_temp, max_temp, min_temp, dominant_condition in rows
+        ]
+        await upsert_daily_summaries(db, summaries)
         await db.commit()  
     except Exception as e:
-        print(f"Error in calculate_daily_summaries: {e}")
+        logger.error(f"Error in calculate_daily_summaries: {e}")
         await db.rollback()  
 
 
+# Day-close step: turn every city's daily rollup for `day` into its DailySummary row
+async def finalize_daily_summaries(db: AsyncSession, day):
+    start = datetime.combine(day, time.min)
+    rollups = (await db.execute(
+        select(WeatherRollup).filter(WeatherRollup.granularity == 'day', WeatherRollup.period_start == start)
+    )).scalars().all()
+    conditions = (await db.execute(
+        select(WeatherRollupCondition)
+        .filter(WeatherRollupCondition.granularity == 'day', WeatherRollupCondition.period_start == start)
+        .order_by(WeatherRollupCondition.readings.desc(), WeatherRollupCondition.main)
+    )).scalars().all()
+    dominant = {}
+    for condition in conditions:
+        dominant.setdefault(condition.city, condition.main)
+
+    summaries = []
+    for rollup in rollups:
+        summary = rollup_summary(rollup, dominant.get(rollup.city))
+        summaries.append({
+            'city': rollup.city,
+            'date': day,
+            'avg_temp': summary['avg_temp'],
+            'max_temp': summary['max_temp'],
+            'min_temp': summary['min_temp'],
+            'dominant_condition': summary['dominant_condition'],
+        })
+    await upsert_daily_summaries(db, summaries)
+    await db.commit()
+    return len(summaries)
 
+# Closed days with rollups but fewer DailySummary rows than rollups, between first_day and last_day
+async def unfinalized_days(db: AsyncSession, first_day, last_day):
+    rollup_counts = (await db.execute(
+        select(WeatherRollup.period_start, func.count())
+        .filter(
+            WeatherRollup.granularity == 'day',
+            WeatherRollup.period_start >= datetime.combine(first_day, time.min),
+            WeatherRollup.period_start <= datetime.combine(last_day, time.min),
+        )
+        .group_by(WeatherRollup.period_start)
+    )).all()
+    summary_counts = dict((await db.execute(
+        select(DailySummary.date, func.count())
+        .filter(DailySummary.date >= first_day, DailySummary.date <= last_day)
+        .group_by(DailySummary.date)
+    )).all())
+    return {start.date() for start, count in rollup_counts if summary_counts.get(start.date(), 0) < count}
 
+# Runs after midnight UTC (and on startup): finalize the day that just closed from its rollups, plus any of
+# the previous DAILY_SUMMARY_CATCHUP_DAYS missed while no worker was running at day close
 async def schedule_daily_summaries():
-    async with get_db() as db: 
-        await calculate_daily_summaries(db)
\ No newline at end of file
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    async with SessionLocal() as db:
+        missed = await unfinalized_days(db, yesterday - timedelta(days=DAILY_SUMMARY_CATCHUP_DAYS), yesterday - timedelta(days=1))
+        for day in sorted(missed | {yesterday}):
+            finalized = await finalize_daily_summaries(db, day)
+            if day != yesterday:
+                logger.info(f"Finalized {finalized} missed daily summaries for {day}")